@@ -0,0 +1,41 @@
+"""add created_at index to weather_cache
+
+Revision ID: 3c7e91a4d2f0
+Revises: 6165e6314722
+Create Date: 2026-10-16 10:12:41.208733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7e91a4d2f0'
+down_revision = '6165e6314722'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('weather_cache'):
+        # b64c09fcbccd はテーブルを作成していないため、未作成の環境ではここで作成する
+        op.create_table(
+            'weather_cache',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('cache_key', sa.String(length=100), nullable=False, comment='キャッシュキー'),
+            sa.Column('weather_data', sa.Text(), nullable=False, comment='天気情報（JSON文字列）'),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True, comment='作成日時'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True, comment='更新日時'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_weather_cache_id'), 'weather_cache', ['id'], unique=False)
+        op.create_index(op.f('ix_weather_cache_cache_key'), 'weather_cache', ['cache_key'], unique=True)
+    elif 'ix_weather_cache_created_at' in [ix['name'] for ix in inspector.get_indexes('weather_cache')]:
+        return
+    # クリーンアップの一括DELETE（created_atによる範囲削除・古い順の削除）用インデックス
+    op.create_index(op.f('ix_weather_cache_created_at'), 'weather_cache', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_weather_cache_created_at'), table_name='weather_cache')
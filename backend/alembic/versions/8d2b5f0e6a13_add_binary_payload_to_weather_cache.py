@@ -0,0 +1,31 @@
+"""add binary payload to weather_cache
+
+Revision ID: 8d2b5f0e6a13
+Revises: 3c7e91a4d2f0
+Create Date: 2026-10-16 13:27:05.516420
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2b5f0e6a13'
+down_revision = '3c7e91a4d2f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('weather_cache', sa.Column('payload', sa.LargeBinary(), nullable=True, comment='天気情報（エンコード済み）'))
+    op.add_column('weather_cache', sa.Column('payload_format', sa.String(length=16), nullable=True, comment='payloadのエンコード形式'))
+    # 既存のJSON文字列レコードはそのまま読めるため変換しない（次回の更新でpayloadに置き換わる）
+    op.alter_column('weather_cache', 'weather_data', existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    # payloadのみのレコードは旧形式で読めないため削除する（キャッシュなので再取得される）
+    op.execute("DELETE FROM weather_cache WHERE weather_data IS NULL")
+    op.alter_column('weather_cache', 'weather_data', existing_type=sa.Text(), nullable=False)
+    op.drop_column('weather_cache', 'payload_format')
+    op.drop_column('weather_cache', 'payload')
@@ -0,0 +1,37 @@
+"""add geocode_cache table
+
+Revision ID: a41f6c2d9b37
+Revises: 8d2b5f0e6a13
+Create Date: 2026-10-16 15:02:18.730164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f6c2d9b37'
+down_revision = '8d2b5f0e6a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'geocode_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('address_key', sa.String(length=255), nullable=False, comment='正規化した住所'),
+        sa.Column('latitude', sa.Float(), nullable=True, comment='緯度'),
+        sa.Column('longitude', sa.Float(), nullable=True, comment='経度'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True, comment='作成日時'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True, comment='更新日時'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_geocode_cache_id'), 'geocode_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_geocode_cache_address_key'), 'geocode_cache', ['address_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_geocode_cache_address_key'), table_name='geocode_cache')
+    op.drop_index(op.f('ix_geocode_cache_id'), table_name='geocode_cache')
+    op.drop_table('geocode_cache')
@@ -0,0 +1,42 @@
+"""add field_image_renditions table
+
+Revision ID: a7d3e5c81b92
+Revises: f2c9a7e1b304
+Create Date: 2026-10-17 00:18:27.503146
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e5c81b92'
+down_revision = 'f2c9a7e1b304'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 既存の画像のレンディションは backfill_image_renditions.py で生成する（生成前は原寸を返す）
+    op.create_table(
+        'field_image_renditions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('field_id', sa.Integer(), nullable=False, comment='畑ID'),
+        sa.Column('size', sa.String(length=16), nullable=False, comment='サイズ（thumbnail / medium / original）'),
+        sa.Column('content_type', sa.String(length=32), nullable=False, comment='Content-Type'),
+        sa.Column('width', sa.Integer(), nullable=True, comment='幅（px）'),
+        sa.Column('height', sa.Integer(), nullable=True, comment='高さ（px）'),
+        sa.Column('byte_size', sa.Integer(), nullable=False, comment='サイズ（バイト）'),
+        sa.Column('sha256', sa.String(length=64), nullable=False, comment='画像のSHA-256（ETag）'),
+        sa.Column('data', sa.LargeBinary(), nullable=False, comment='画像バイナリ'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True, comment='作成日時'),
+        sa.ForeignKeyConstraint(['field_id'], ['fields.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('field_id', 'size', name='uq_field_image_renditions_field_id_size')
+    )
+    op.create_index(op.f('ix_field_image_renditions_id'), 'field_image_renditions', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_field_image_renditions_id'), table_name='field_image_renditions')
+    op.drop_table('field_image_renditions')
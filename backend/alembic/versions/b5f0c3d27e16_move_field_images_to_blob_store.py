@@ -0,0 +1,106 @@
+"""move field images and renditions to the blob store
+
+Revision ID: b5f0c3d27e16
+Revises: a7d3e5c81b92
+Create Date: 2026-10-17 00:41:12.908417
+
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.blob_store import get_blob_store
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5f0c3d27e16'
+down_revision = 'a7d3e5c81b92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 画像本体をブロブストア（BLOB_STORE / BLOB_STORE_DIR）に書き出してから列を削除する
+    # メモリに載るのが画像1枚分で済むよう、IDを先に取得して1件ずつ読み込む
+    bind = op.get_bind()
+
+    field_ids = [row[0] for row in bind.execute(sa.text(
+        "SELECT id FROM fields WHERE image IS NOT NULL AND octet_length(image) > 0 ORDER BY id"
+    ))]
+    rendition_ids = [row[0] for row in bind.execute(sa.text("SELECT id FROM field_image_renditions ORDER BY id"))]
+    if (field_ids or rendition_ids) and not os.getenv("BLOB_STORE_DIR"):
+        # 既定の保存先（backend/storage/blobs）はコンテナ内にあり、再デプロイで消えると画像を失うため、
+        # 永続化した保存先が明示されていない環境では列を削除しない
+        raise RuntimeError(
+            "畑の画像をブロブストアに移すには、永続化したディレクトリ（ボリュームなど）を"
+            "BLOB_STORE_DIRに指定してからマイグレーションを実行してください"
+        )
+    store = get_blob_store()
+
+    for field_id in field_ids:
+        image = bind.execute(sa.text("SELECT image FROM fields WHERE id = :id"), {"id": field_id}).scalar()
+        key = _put_verified(store, bytes(image))
+        bind.execute(
+            sa.text("UPDATE fields SET image_sha256 = :key, image_size = :size WHERE id = :id"),
+            {"key": key, "size": len(image), "id": field_id}
+        )
+
+    for rendition_id in rendition_ids:
+        data = bind.execute(
+            sa.text("SELECT data FROM field_image_renditions WHERE id = :id"), {"id": rendition_id}
+        ).scalar()
+        key = _put_verified(store, bytes(data))
+        bind.execute(
+            sa.text("UPDATE field_image_renditions SET sha256 = :key WHERE id = :id"),
+            {"key": key, "id": rendition_id}
+        )
+    print(f"[migration] 画像 {len(field_ids)}件・レンディション {len(rendition_ids)}件をブロブストアに移しました")
+
+    op.drop_column('field_image_renditions', 'data')
+    op.drop_column('fields', 'image')
+    op.alter_column('fields', 'image_sha256', existing_type=sa.String(length=64), comment='画像のSHA-256（ETag・ブロブのキー）')
+    op.alter_column('field_image_renditions', 'sha256', existing_type=sa.String(length=64), comment='画像のSHA-256（ETag・ブロブのキー）')
+
+
+def _put_verified(store, data: bytes) -> str:
+    """ブロブを保存し、読み戻して内容が一致することを確認する（列を削除する前に書き出しを確かめる）"""
+    key = store.put(data)
+    if store.read(key) != data:
+        raise RuntimeError(f"ブロブストアに保存した画像を読み戻せません: {key}")
+    return key
+
+
+def downgrade() -> None:
+    op.add_column('fields', sa.Column('image', sa.LargeBinary(), nullable=True, comment='畑の図面画像（バイナリ）'))
+    op.add_column('field_image_renditions', sa.Column('data', sa.LargeBinary(), nullable=True, comment='画像バイナリ'))
+    op.alter_column('fields', 'image_sha256', existing_type=sa.String(length=64), comment='画像のSHA-256（ETag）')
+    op.alter_column('field_image_renditions', 'sha256', existing_type=sa.String(length=64), comment='画像のSHA-256（ETag）')
+
+    # ブロブストアから読み戻す（ブロブストアのファイルは削除しない）
+    # 画像のブロブがない場合は画像を失わないよう中止する（保存先のBLOB_STORE_DIRを確認して実行し直す）
+    bind = op.get_bind()
+    store = get_blob_store()
+    for field_id, key in bind.execute(sa.text(
+        "SELECT id, image_sha256 FROM fields WHERE image_sha256 IS NOT NULL ORDER BY id"
+    )).fetchall():
+        try:
+            image = store.read(key)
+        except FileNotFoundError:
+            raise RuntimeError(f"畑 {field_id} の画像がブロブストアにありません（BLOB_STORE_DIRを確認してください）: {key}")
+        bind.execute(sa.text("UPDATE fields SET image = :image WHERE id = :id"), {"image": image, "id": field_id})
+
+    for rendition_id, key in bind.execute(sa.text(
+        "SELECT id, sha256 FROM field_image_renditions ORDER BY id"
+    )).fetchall():
+        try:
+            data = store.read(key)
+        except FileNotFoundError:
+            # レンディションは backfill_image_renditions.py で作り直せる
+            bind.execute(sa.text("DELETE FROM field_image_renditions WHERE id = :id"), {"id": rendition_id})
+            continue
+        bind.execute(
+            sa.text("UPDATE field_image_renditions SET data = :data WHERE id = :id"),
+            {"data": data, "id": rendition_id}
+        )
+    op.alter_column('field_image_renditions', 'data', existing_type=sa.LargeBinary(), nullable=False)
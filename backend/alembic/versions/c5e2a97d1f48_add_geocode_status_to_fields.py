@@ -0,0 +1,30 @@
+"""add geocode_status to fields
+
+Revision ID: c5e2a97d1f48
+Revises: a41f6c2d9b37
+Create Date: 2026-10-16 15:48:36.092517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2a97d1f48'
+down_revision = 'a41f6c2d9b37'
+branch_labels = None
+depends_on = None
+
+geocode_status = sa.Enum('pending', 'done', 'failed', name='geocodestatus')
+
+
+def upgrade() -> None:
+    geocode_status.create(op.get_bind(), checkfirst=True)
+    op.add_column('fields', sa.Column('geocode_status', geocode_status, server_default='done', nullable=False, comment='住所→緯度経度変換の状態'))
+    # 緯度経度が未設定の既存の畑は定期ジョブで変換する
+    op.execute("UPDATE fields SET geocode_status = 'pending' WHERE latitude IS NULL OR longitude IS NULL")
+
+
+def downgrade() -> None:
+    op.drop_column('fields', 'geocode_status')
+    geocode_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,50 @@
+"""add daily_weather table and weather reference to histories
+
+Revision ID: e3b8d4a61f25
+Revises: c5e2a97d1f48
+Create Date: 2026-10-16 23:31:05.214873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b8d4a61f25'
+down_revision = 'c5e2a97d1f48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 日付の範囲で月別にパーティションを分ける親テーブル（各月のパーティションは記録ジョブが作成）
+    op.create_table(
+        'daily_weather',
+        sa.Column('bucket', sa.String(length=64), nullable=False, comment='地点バケットID'),
+        sa.Column('date', sa.Date(), nullable=False, comment='日付'),
+        sa.Column('latitude', sa.Float(), nullable=False, comment='緯度'),
+        sa.Column('longitude', sa.Float(), nullable=False, comment='経度'),
+        sa.Column('weather', sa.String(length=16), nullable=True, comment='天気（12時時点）'),
+        sa.Column('rain_mm', sa.Float(), nullable=False, comment='降雨量（mm）'),
+        sa.Column('temperature', sa.Float(), nullable=True, comment='気温（12時時点）'),
+        sa.Column('humidity', sa.Integer(), nullable=True, comment='湿度（12時時点）'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True, comment='作成日時'),
+        sa.PrimaryKeyConstraint('bucket', 'date'),
+        postgresql_partition_by='RANGE (date)'
+    )
+    op.add_column('histories', sa.Column('weather_bucket', sa.String(length=64), nullable=True, comment='地点バケットID'))
+    op.add_column('histories', sa.Column('weather_date', sa.Date(), nullable=True, comment='天気の対象日'))
+    op.create_index('ix_histories_weather_bucket_date', 'histories', ['weather_bucket', 'weather_date'], unique=False)
+    # 対象日は当番日。地点バケットは設定（WEATHER_CACHE_BUCKET_MODE）に依存するため記録ジョブが埋める
+    op.execute(
+        "UPDATE histories SET weather_date = schedules.date "
+        "FROM schedules WHERE schedules.id = histories.schedule_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_histories_weather_bucket_date', table_name='histories')
+    op.drop_column('histories', 'weather_date')
+    op.drop_column('histories', 'weather_bucket')
+    # パーティションは親テーブルと一緒に削除される
+    op.drop_table('daily_weather')
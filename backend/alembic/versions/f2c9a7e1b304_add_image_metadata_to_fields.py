@@ -0,0 +1,31 @@
+"""add image_sha256 and image_size to fields
+
+Revision ID: f2c9a7e1b304
+Revises: e3b8d4a61f25
+Create Date: 2026-10-16 23:52:40.618290
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c9a7e1b304'
+down_revision = 'e3b8d4a61f25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('fields', sa.Column('image_sha256', sa.String(length=64), nullable=True, comment='画像のSHA-256（ETag）'))
+    op.add_column('fields', sa.Column('image_size', sa.Integer(), nullable=True, comment='画像のサイズ（バイト）'))
+    # 既存の画像はDB側でハッシュとサイズを計算する（画像本体をアプリに転送しない）
+    op.execute(
+        "UPDATE fields SET image_sha256 = encode(sha256(image), 'hex'), image_size = octet_length(image) "
+        "WHERE image IS NOT NULL AND octet_length(image) > 0"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('fields', 'image_size')
+    op.drop_column('fields', 'image_sha256')
@@ -3,29 +3,67 @@
 畑のCRUD操作と画像管理を提供するAPIエンドポイント
 """
 
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Response
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Query, Header
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import BinaryIO, List, Optional, Tuple
 from datetime import datetime
 import base64
-import requests
-from urllib.parse import quote
+import os
 
 from app.database import get_db
-from app.models import Field as FieldModel, User as UserModel
+from app.models import Field as FieldModel, FieldImageRendition, User as UserModel, GeocodeStatus
+from app.services.geocoding_service import enqueue_geocode_field
+from app.services.blob_store import get_blob_store
+from app.services.field_image_service import (
+    IMAGE_CACHE_CONTROL_REVALIDATE,
+    IMAGE_SIZES,
+    SIZE_ORIGINAL,
+    ImageFormatError,
+    ImageTooLargeError,
+    ImageUpload,
+    apply_field_image,
+    check_declared_content_type,
+    check_image_size,
+    decode_base64_chunks,
+    detect_image_content_type,
+    etag_matches,
+    image_cache_control,
+    image_etag,
+    image_metadata,
+    read_field_image,
+    set_field_image
+)
 
 router = APIRouter()
 
+# multipartで受け取ったファイルを読み込む1回分のバイト数
+UPLOAD_CHUNK_BYTES = 64 * 1024
+# multipartの本体のうち、画像以外（境界・ヘッダ）に見込むバイト数
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
 class FieldBase(BaseModel):
     """畑基本情報のモデル"""
     name: str
     location_text: str
     image: Optional[str] = None  # Base64文字列
 
-class Field(FieldBase):
-    """畑情報のレスポンスモデル"""
+class FieldSummary(BaseModel):
+    """畑一覧用の軽量なレスポンスモデル（画像本体は含めず、/api/fields/{id}/image で取得する）"""
     id: int
+    name: str
+    location_text: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    geocode_status: str = GeocodeStatus.DONE.value  # pending: 緯度経度の取得待ち、failed: 取得失敗
+    image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None  # 一覧表示用の縮小画像（WebP）
+    image_etag: Optional[str] = None
+    image_size: Optional[int] = None
     created_by: int
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -33,6 +71,10 @@ class Field(FieldBase):
     class Config:
         from_attributes = True
 
+class Field(FieldSummary):
+    """畑情報のレスポンスモデル（画像本体をBase64で含む）"""
+    image: Optional[str] = None  # Base64文字列
+
 class FieldCreate(FieldBase):
     """畑作成リクエストのモデル"""
     pass
@@ -43,100 +85,127 @@ class FieldUpdate(BaseModel):
     location_text: Optional[str] = None
     image: Optional[str] = None  # Base64文字列
 
-def geocode_address(address: str) -> tuple[Optional[float], Optional[float]]:
+def _convert_image_to_base64(image_bytes: Optional[bytes]) -> Optional[str]:
     """
-    住所から緯度経度を取得
+    画像バイナリをBase64文字列に変換
     
     Args:
-        address: 住所文字列
+        image_bytes: 画像バイナリデータ
         
     Returns:
-        tuple: (緯度, 経度) 取得失敗時は (None, None)
+        str: Base64文字列、Noneの場合はNone
+    """
+    if image_bytes:
+        return base64.b64encode(image_bytes).decode()
+    return None
+
+def _image_http_exception(e: ValueError) -> HTTPException:
+    """
+    画像の確認エラーをHTTPエラーに変換
+    
+    Args:
+        e: ImageTooLargeError または ImageFormatError
+        
+    Returns:
+        HTTPException: 大きすぎる場合は413、画像として扱えない場合は415
+    """
+    if isinstance(e, ImageTooLargeError):
+        return HTTPException(status_code=413, detail=str(e))
+    return HTTPException(status_code=415, detail=str(e))
+
+def _apply_field_image(field: FieldModel, image_base64: Optional[str]) -> None:
+    """
+    畑にBase64の画像を設定（少しずつデコードしてブロブストアに保存し、レンディションも生成する）
+    
+    Args:
+        field: 畑
+        image_base64: Base64文字列（Noneまたは空の場合は画像なし）
+        
+    Raises:
+        HTTPException: 画像が大きすぎる場合（413）、画像として扱えない場合（415）
     """
-    encoded_address = quote(address)
-    url = f"https://nominatim.openstreetmap.org/search?format=json&q={encoded_address}"
     try:
-        resp = requests.get(url, timeout=10, headers={"User-Agent": "mizukake-toban-app"})
-        resp.raise_for_status()
-        data = resp.json()
-        if data and len(data) > 0:
-            return float(data[0]["lat"]), float(data[0]["lon"])
-        else:
-            print(f"[geocode_address] 住所が見つかりませんでした: {address}")
-            return None, None
-    except requests.exceptions.RequestException as e:
-        print(f"[geocode_address] APIリクエスト失敗: {e}")
-        return None, None
-    except Exception as e:
-        print(f"[geocode_address] 予期せぬエラー: {e}")
-        return None, None
+        if not image_base64:
+            set_field_image(field, None)
+            return
+        with ImageUpload() as upload:
+            for chunk in decode_base64_chunks(image_base64):
+                upload.write(chunk)
+            image_key, image_size = upload.commit()
+        apply_field_image(field, image_key, image_size)
+    except (ImageFormatError, ImageTooLargeError) as e:
+        raise _image_http_exception(e)
 
-def _convert_image_to_base64(image_bytes: Optional[bytes]) -> Optional[str]:
+def _to_field_summary(f: FieldModel) -> FieldSummary:
     """
-    画像バイナリをBase64文字列に変換
+    畑を一覧用のレスポンスに変換（画像本体は読み込まない）
     
     Args:
-        image_bytes: 画像バイナリデータ
+        f: 畑
         
     Returns:
-        str: Base64文字列、Noneの場合はNone
+        FieldSummary: 畑一覧用のレスポンス
     """
-    if image_bytes:
-        return base64.b64encode(image_bytes).decode()
-    return None
+    return FieldSummary(
+        id=f.id,
+        name=f.name,
+        location_text=f.location_text,
+        latitude=f.latitude,
+        longitude=f.longitude,
+        geocode_status=f.geocode_status.value,
+        **image_metadata(f),
+        created_by=f.created_by,
+        created_at=f.created_at,
+        updated_at=f.updated_at
+    )
 
-@router.get("/api/fields", response_model=List[Field])
+def _to_field(f: FieldModel) -> Field:
+    """
+    畑を画像本体（Base64）付きのレスポンスに変換
+    
+    Args:
+        f: 畑
+        
+    Returns:
+        Field: 畑情報のレスポンス
+    """
+    return Field(
+        **_to_field_summary(f).model_dump(),
+        image=_convert_image_to_base64(read_field_image(f))
+    )
+
+@router.get("/api/fields", response_model=List[FieldSummary])
 def list_fields(db: Session = Depends(get_db)):
     """
     畑一覧を取得
+    画像本体は読み込まず、画像のURL・ETag・サイズのみ返す
     
     Args:
         db: データベースセッション
         
     Returns:
-        List[Field]: 畑一覧
+        List[FieldSummary]: 畑一覧
     """
-    fields = db.query(FieldModel).all()
-    result = []
-    for f in fields:
-        image_b64 = _convert_image_to_base64(f.image)
-        result.append(Field(
-            id=f.id,
-            name=f.name,
-            location_text=f.location_text,
-            image=image_b64,
-            created_by=f.created_by,
-            created_at=f.created_at,
-            updated_at=f.updated_at
-        ))
-    return result
+    fields = db.query(FieldModel).order_by(FieldModel.id).all()
+    return [_to_field_summary(f) for f in fields]
 
-@router.get("/api/fields/user/{user_id}", response_model=List[Field])
+@router.get("/api/fields/user/{user_id}", response_model=List[FieldSummary])
 def get_user_fields(user_id: int, db: Session = Depends(get_db)):
     """
     指定ユーザーが作成した畑一覧を取得
+    画像本体は読み込まず、画像のURL・ETag・サイズのみ返す
     
     Args:
         user_id: ユーザーID
         db: データベースセッション
         
     Returns:
-        List[Field]: ユーザーが作成した畑一覧
+        List[FieldSummary]: ユーザーが作成した畑一覧
     """
-    fields = db.query(FieldModel).filter(FieldModel.created_by == user_id).all()
-    result = []
-    for f in fields:
-        image_b64 = _convert_image_to_base64(f.image)
-        result.append(Field(
-            id=f.id,
-            name=f.name,
-            location_text=f.location_text,
-            image=image_b64,
-            created_by=f.created_by,
-            created_at=f.created_at,
-            updated_at=f.updated_at
-        ))
-    return result
+    fields = db.query(FieldModel).filter(
+        FieldModel.created_by == user_id
+    ).order_by(FieldModel.id).all()
+    return [_to_field_summary(f) for f in fields]
 
 @router.get("/api/fields/{field_id}", response_model=Field)
 def get_field(field_id: int, db: Session = Depends(get_db)):
@@ -157,21 +226,17 @@ def get_field(field_id: int, db: Session = Depends(get_db)):
     if f is None:
         raise HTTPException(status_code=404, detail="Field not found")
     
-    image_b64 = _convert_image_to_base64(f.image)
-    return Field(
-        id=f.id,
-        name=f.name,
-        location_text=f.location_text,
-        image=image_b64,
-        created_by=f.created_by,
-        created_at=f.created_at,
-        updated_at=f.updated_at
-    )
+    return _to_field(f)
 
 @router.post("/api/fields", response_model=Field)
-def create_field(field: FieldCreate, created_by: int, db: Session = Depends(get_db)):
+def create_field(
+    field: FieldCreate,
+    created_by: int,
+    db: Session = Depends(get_db)
+):
     """
     畑を作成
+    緯度経度は作成後にバックグラウンドで取得する（取得中はgeocode_statusがpending）
     
     Args:
         field: 作成する畑情報
@@ -194,43 +259,31 @@ def create_field(field: FieldCreate, created_by: int, db: Session = Depends(get_
     if existing_field:
         raise HTTPException(status_code=400, detail="Field with this name already exists")
     
-    # 画像データの処理
-    image_bytes = base64.b64decode(field.image) if field.image else None
-    
-    # 住所から緯度経度を取得
-    lat, lon = geocode_address(field.location_text)
-    if lat is None or lon is None:
-        raise HTTPException(status_code=400, detail="住所から緯度経度の取得に失敗しました")
-    
-    # 畑の作成
+    # 畑の作成（緯度経度はレスポンス後に取得する）
     db_field = FieldModel(
         name=field.name,
         location_text=field.location_text,
-        latitude=lat,
-        longitude=lon,
-        image=image_bytes,
+        geocode_status=GeocodeStatus.PENDING,
         created_by=created_by
     )
+    _apply_field_image(db_field, field.image)
     
     db.add(db_field)
     db.commit()
     db.refresh(db_field)
+    enqueue_geocode_field(db_field.id)
     
-    image_b64 = _convert_image_to_base64(db_field.image)
-    return Field(
-        id=db_field.id,
-        name=db_field.name,
-        location_text=db_field.location_text,
-        image=image_b64,
-        created_by=db_field.created_by,
-        created_at=db_field.created_at,
-        updated_at=db_field.updated_at
-    )
+    return _to_field(db_field)
 
 @router.patch("/api/fields/{field_id}", response_model=Field)
-def update_field(field_id: int, field_update: FieldUpdate, db: Session = Depends(get_db)):
+def update_field(
+    field_id: int,
+    field_update: FieldUpdate,
+    db: Session = Depends(get_db)
+):
     """
     畑を更新
+    住所が変更された場合、緯度経度はバックグラウンドで取得し直す
     
     Args:
         field_id: 更新する畑ID
@@ -259,35 +312,26 @@ def update_field(field_id: int, field_update: FieldUpdate, db: Session = Depends
         db_field.name = field_update.name
     
     # 住所の更新
+    geocode_needed = False
     if field_update.location_text is not None:
-        # 既存の住所と異なる場合のみ緯度経度をnullにする
+        # 既存の住所と異なる場合のみ緯度経度をnullにして取得し直す
         if db_field.location_text != field_update.location_text:
             db_field.latitude = None
             db_field.longitude = None
+            db_field.geocode_status = GeocodeStatus.PENDING
+            geocode_needed = True
         db_field.location_text = field_update.location_text
-        lat, lon = geocode_address(field_update.location_text)
-        if lat is None or lon is None:
-            raise HTTPException(status_code=400, detail="住所から緯度経度の取得に失敗しました")
-        db_field.latitude = lat
-        db_field.longitude = lon
     
     # 画像の更新
     if field_update.image is not None:
-        db_field.image = base64.b64decode(field_update.image)
+        _apply_field_image(db_field, field_update.image)
     
     db.commit()
     db.refresh(db_field)
+    if geocode_needed:
+        enqueue_geocode_field(db_field.id)
     
-    image_b64 = _convert_image_to_base64(db_field.image)
-    return Field(
-        id=db_field.id,
-        name=db_field.name,
-        location_text=db_field.location_text,
-        image=image_b64,
-        created_by=db_field.created_by,
-        created_at=db_field.created_at,
-        updated_at=db_field.updated_at
-    )
+    return _to_field(db_field)
 
 @router.delete("/api/fields/{field_id}")
 def delete_field(field_id: int, db: Session = Depends(get_db)):
@@ -312,49 +356,201 @@ def delete_field(field_id: int, db: Session = Depends(get_db)):
     db.commit()
     return {"message": "Field deleted successfully"}
 
-@router.put("/api/fields/{field_id}/image")
-def upload_field_image(field_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+def _store_upload_file(file: BinaryIO, content_type: Optional[str]) -> Tuple[str, int]:
+    """
+    multipartで受け取ったファイル（一時ファイル）を少しずつブロブストアに保存
+    
+    Args:
+        file: 受け取ったファイル
+        content_type: ファイルのContent-Type
+        
+    Returns:
+        Tuple[str, int]: (ブロブのキー, サイズ)
+        
+    Raises:
+        ImageTooLargeError: 画像が上限より大きい場合
+        ImageFormatError: 画像として扱えない場合
+    """
+    with ImageUpload(content_type) as upload:
+        while True:
+            chunk = file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            upload.write(chunk)
+        return upload.commit()
+
+def _apply_uploaded_image(db: Session, field: FieldModel, image_key: str, image_size: int) -> None:
+    """保存済みの画像を畑に設定してコミット（スレッドプールで実行する）"""
+    apply_field_image(field, image_key, image_size)
+    db.commit()
+
+@router.put(
+    "/api/fields/{field_id}/image",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "image/*": {"schema": {"type": "string", "format": "binary"}},
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"]
+                    }
+                }
+            }
+        }
+    }
+)
+async def upload_field_image(field_id: int, request: Request, db: Session = Depends(get_db)):
     """
     画像ファイルをアップロードして保存
+    本体（Content-Type: image/*）は受け取りながらブロブストアに書き込み、全体をメモリに溜めない。
+    申告されたサイズ・形式で本体を読む前に拒否し、上限を超えた時点や先頭バイトが画像でない時点で打ち切る。
+    multipart/form-data（fileフィールド）も受け付ける。
+    保存後に形式を判定し、サムネイル・中サイズ・原寸のレンディションを生成する
     
     Args:
         field_id: 畑ID
-        file: アップロードする画像ファイル
+        request: リクエスト（本体を少しずつ読み込む）
         db: データベースセッション
         
     Returns:
         dict: アップロード完了メッセージ
         
     Raises:
-        HTTPException: 畑が見つからない場合
+        HTTPException: 畑が見つからない場合、multipartでContent-Lengthがない場合、
+            画像が大きすぎる場合（413）、または画像として扱えない場合（415）
     """
-    db_field = db.query(FieldModel).filter(FieldModel.id == field_id).first()
+    content_type = request.headers.get("content-type", "")
+    multipart = content_type.startswith("multipart/form-data")
+    content_length = request.headers.get("content-length")
+    try:
+        if content_length is not None and content_length.isdigit():
+            check_image_size(int(content_length) - (MULTIPART_OVERHEAD_BYTES if multipart else 0))
+        elif multipart:
+            # multipartは解析中に一時ファイルへ書き出されるため、サイズを申告しないものは受け付けない
+            raise HTTPException(status_code=411, detail="Content-Length is required for multipart uploads")
+        if not multipart:
+            check_declared_content_type(content_type)
+    except (ImageFormatError, ImageTooLargeError) as e:
+        raise _image_http_exception(e)
+    
+    db_field = await run_in_threadpool(
+        lambda: db.query(FieldModel).filter(FieldModel.id == field_id).first()
+    )
     if db_field is None:
         raise HTTPException(status_code=404, detail="Field not found")
     
-    content = file.file.read()
-    db_field.image = content
-    db.commit()
+    try:
+        if multipart:
+            form = await request.form(max_files=1)
+            try:
+                file = form.get("file")
+                if not isinstance(file, UploadFile):
+                    raise HTTPException(status_code=422, detail="file is required")
+                image_key, image_size = await run_in_threadpool(_store_upload_file, file.file, file.content_type)
+            finally:
+                await form.close()
+        else:
+            upload = await run_in_threadpool(ImageUpload, content_type)
+            with upload:
+                async for chunk in request.stream():
+                    await run_in_threadpool(upload.write, chunk)
+                image_key, image_size = await run_in_threadpool(upload.commit)
+        await run_in_threadpool(_apply_uploaded_image, db, db_field, image_key, image_size)
+    except (ImageFormatError, ImageTooLargeError) as e:
+        raise _image_http_exception(e)
     return {"message": "Image uploaded successfully"}
 
+def _blob_response(key: str, content_type: Optional[str], cache_control: str) -> Response:
+    """
+    ブロブストアの画像をレスポンスにする
+    ローカルファイルに保存されている場合は、ファイルをそのまま送信する（アプリのメモリに読み込まない）
+    
+    Args:
+        key: ブロブのキー（SHA-256）
+        content_type: Content-Type（Noneの場合は先頭バイトから判定する）
+        cache_control: Cache-Controlヘッダ
+        
+    Returns:
+        Response: 画像レスポンス
+        
+    Raises:
+        HTTPException: ブロブが見つからない場合
+    """
+    store = get_blob_store()
+    try:
+        if content_type is None:
+            with store.open(key) as f:
+                content_type = detect_image_content_type(f.read(16)) or "application/octet-stream"
+        headers = {"ETag": image_etag(key), "Cache-Control": cache_control}
+        path = store.local_path(key)
+        if path is not None:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            return FileResponse(path, media_type=content_type, headers=headers)
+        return Response(content=store.read(key), media_type=content_type, headers=headers)
+    except FileNotFoundError:
+        print(f"[fields] ブロブストアに画像がありません: {key}")
+        raise HTTPException(status_code=404, detail="Image not found")
+
 @router.get("/api/fields/{field_id}/image")
-def get_field_image(field_id: int, db: Session = Depends(get_db)):
+def get_field_image(
+    field_id: int,
+    size: str = Query(SIZE_ORIGINAL, description="thumbnail / medium / original"),
+    v: Optional[str] = Query(None, description="画像のバージョン（image_urlに付く値）"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """
     画像バイナリを直接返す（imgタグsrcで利用可）
+    指定サイズのレンディションがない場合（生成前の画像など）は原寸を返す（長期間キャッシュさせない）
+    畑と指定サイズ・原寸のレンディションは1回の問い合わせで取得し、
+    If-None-MatchがETagに一致すれば画像を読まずに304を返す
     
     Args:
         field_id: 畑ID
+        size: 画像のサイズ（thumbnail / medium / original）
+        v: 画像のバージョン（現在の画像と一致すれば長期間キャッシュさせる）
+        if_none_match: If-None-Matchヘッダ
         db: データベースセッション
         
     Returns:
-        Response: 画像バイナリレスポンス
+        Response: 画像レスポンス（変更がなければ304）
         
     Raises:
-        HTTPException: 畑または画像が見つからない場合
+        HTTPException: サイズが不正な場合、または畑・画像が見つからない場合
     """
-    db_field = db.query(FieldModel).filter(FieldModel.id == field_id).first()
-    if db_field is None or not db_field.image:
+    if size not in IMAGE_SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {', '.join(IMAGE_SIZES)}")
+    
+    # fieldsの主キーとfield_image_renditionsの(field_id, size)の一意インデックスで引く
+    rows = db.query(
+        FieldModel.image_sha256,
+        FieldImageRendition.size,
+        FieldImageRendition.sha256,
+        FieldImageRendition.content_type
+    ).outerjoin(
+        FieldImageRendition,
+        and_(
+            FieldImageRendition.field_id == FieldModel.id,
+            FieldImageRendition.size.in_({size, SIZE_ORIGINAL})
+        )
+    ).filter(FieldModel.id == field_id).all()
+    if not rows or not rows[0].image_sha256:
         raise HTTPException(status_code=404, detail="Image not found")
     
-    # Content-Typeは仮にpng固定（必要に応じて判定可）
-    return Response(content=db_field.image, media_type="image/png") 
\ No newline at end of file
+    image_sha256 = rows[0].image_sha256
+    renditions = {row.size: (row.sha256, row.content_type) for row in rows if row.size is not None}
+    # レンディションがない画像は、アップロードされた画像をそのまま返す
+    key, content_type = renditions.get(size) or renditions.get(SIZE_ORIGINAL) or (image_sha256, None)
+    if size in renditions:
+        cache_control = image_cache_control(v, image_sha256)
+    else:
+        # 代わりに返した画像は、レンディションの生成後に同じURLで内容が変わるため毎回確認させる
+        cache_control = IMAGE_CACHE_CONTROL_REVALIDATE
+    
+    if etag_matches(if_none_match, image_etag(key)):
+        return Response(status_code=304, headers={"ETag": image_etag(key), "Cache-Control": cache_control})
+    return _blob_response(key, content_type, cache_control)
@@ -7,10 +7,17 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 
 from app.database import get_db
-from app.models import History as HistoryModel, Schedule as ScheduleModel, User as UserModel
+from app.models import (
+    History as HistoryModel,
+    Schedule as ScheduleModel,
+    User as UserModel,
+    Field as FieldModel,
+    DailyWeather as DailyWeatherModel
+)
+from app.services.daily_weather_service import history_weather_reference, DAILY_WEATHER_RAINY_MM
 
 router = APIRouter()
 
@@ -49,6 +56,19 @@ class HistoryWithUserName(HistoryBase):
     class Config:
         orm_mode = True
 
+class HistoryWeather(BaseModel):
+    """日別天気付き履歴のモデル（天気が未記録の日はNone）"""
+    id: int
+    schedule_id: int
+    field_id: int
+    user_id: int
+    date: Optional[date]
+    status: str
+    rain_mm: Optional[float] = None
+    weather: Optional[str] = None
+    temperature: Optional[float] = None
+    humidity: Optional[int] = None
+
 @router.get("/api/histories", response_model=List[HistoryWithUserName])
 def list_histories(
     schedule_id: Optional[int] = Query(None),
@@ -90,6 +110,65 @@ def list_histories(
         })
     return result
 
+@router.get("/api/histories/weather", response_model=List[HistoryWeather])
+def list_histories_with_weather(
+    field_id: Optional[int] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    rainy_only: bool = Query(False),
+    db: Session = Depends(get_db)
+):
+    """
+    履歴一覧を日別天気（daily_weather）付きで取得
+    天気は記録済みの実績をDBから結合するだけで、上流APIは呼び出さない
+    
+    Args:
+        field_id: 畑ID（フィルタ用）
+        start_date: 対象日の開始（フィルタ用）
+        end_date: 対象日の終了（フィルタ用）
+        rainy_only: 降雨量がDAILY_WEATHER_RAINY_MM以上の日のみ
+        db: データベースセッション
+        
+    Returns:
+        List[HistoryWeather]: 日別天気付き履歴一覧（対象日の降順）
+    """
+    query = db.query(
+        HistoryModel,
+        ScheduleModel.field_id,
+        DailyWeatherModel
+    ).join(
+        ScheduleModel, ScheduleModel.id == HistoryModel.schedule_id
+    ).outerjoin(
+        DailyWeatherModel,
+        (DailyWeatherModel.bucket == HistoryModel.weather_bucket) &
+        (DailyWeatherModel.date == HistoryModel.weather_date)
+    )
+    
+    if field_id:
+        query = query.filter(ScheduleModel.field_id == field_id)
+    if start_date:
+        query = query.filter(HistoryModel.weather_date >= start_date)
+    if end_date:
+        query = query.filter(HistoryModel.weather_date <= end_date)
+    if rainy_only:
+        query = query.filter(DailyWeatherModel.rain_mm >= DAILY_WEATHER_RAINY_MM)
+    
+    result = []
+    for h, history_field_id, daily in query.order_by(HistoryModel.weather_date.desc(), HistoryModel.id.desc()):
+        result.append({
+            "id": h.id,
+            "schedule_id": h.schedule_id,
+            "field_id": history_field_id,
+            "user_id": h.user_id,
+            "date": h.weather_date,
+            "status": h.status,
+            "rain_mm": daily.rain_mm if daily else None,
+            "weather": daily.weather if daily else None,
+            "temperature": daily.temperature if daily else None,
+            "humidity": daily.humidity if daily else None
+        })
+    return result
+
 @router.get("/api/histories/{history_id}", response_model=History)
 def get_history(history_id: int, db: Session = Depends(get_db)):
     """
@@ -143,13 +222,23 @@ def create_history(history: HistoryCreate, db: Session = Depends(get_db)):
     if existing_history:
         raise HTTPException(status_code=400, detail="History already exists for this schedule")
     
+    # 日別天気の参照キー（実施時の畑の地点バケットと当番日）
+    field = db.query(FieldModel.latitude, FieldModel.longitude).filter(FieldModel.id == schedule.field_id).first()
+    weather_bucket, weather_date = history_weather_reference(
+        field.latitude if field else None,
+        field.longitude if field else None,
+        schedule.date
+    )
+    
     # 履歴の作成
     db_history = HistoryModel(
         schedule_id=history.schedule_id,
         user_id=history.user_id,
         executed_at=history.executed_at,
         status=history.status,
-        comment=history.comment
+        comment=history.comment,
+        weather_bucket=weather_bucket,
+        weather_date=weather_date
     )
     
     db.add(db_history)
@@ -11,6 +11,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, date, timedelta, timezone
 
+from app.core.http_client import get_http_client
 from app.database import get_db
 from app.models import Schedule as ScheduleModel, User as UserModel, Field as FieldModel, ScheduleStatus, History as HistoryModel
 
@@ -41,7 +42,7 @@ def send_line_notification(group_id: str, message: str):
         ]
     }
     try:
-        response = requests.post("https://api.line.me/v2/bot/message/push", headers=headers, json=payload)
+        response = get_http_client().post("https://api.line.me/v2/bot/message/push", headers=headers, json=payload)
         response.raise_for_status() # HTTPエラーがあれば例外を発生させる
         print(f"LINE notification sent successfully: {response.json()}")
     except requests.exceptions.RequestException as e:
@@ -4,77 +4,31 @@
 """
 
 import os
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, BackgroundTasks
+from sqlalchemy.orm import Session, load_only
 from pydantic import BaseModel
-from typing import Optional
-from datetime import date, datetime
-import requests
+from starlette.concurrency import run_in_threadpool
+from typing import Optional, List, Dict
+from datetime import date, datetime, timedelta
 
 from app.database import get_db
-from app.models import Field as FieldModel
-from app.services.weather_service import (
-    get_weather_by_latlon, 
-    get_weather_forecast_by_latlon, 
-    get_yesterday_weather, 
-    get_accurate_daily_rainfall
+from app.models import Field as FieldModel, GeocodeStatus
+from app.services.forecast_service import get_or_fetch_forecast, build_daily_forecast
+from app.services.geocoding_service import geocode_address, GEOCODE_REQUEST_MAX_WAIT_SECONDS
+from app.services.upstream_guard import weather_upstream_guard
+from app.services.weather_context import WeatherContext, AsyncWeatherContext
+from app.services.weather_cache_service import (
+    get_or_fetch_weather_async,
+    get_or_fetch_weather_many,
+    generate_cache_key,
+    get_memory_cache_stats,
+    get_single_flight_stats,
+    get_bucket_stats,
+    get_upstream_stats
 )
-from app.services.weather_cache_service import get_cached_weather, set_cached_weather, clear_expired_cache, cleanup_cache
 
 router = APIRouter()
 
-def simplify_weather_description(description: str) -> str:
-    """
-    OpenWeatherMapの天気説明を簡潔な一言に変換
-    
-    Args:
-        description: OpenWeatherMapの天気説明
-        
-    Returns:
-        str: 簡潔な天気説明
-    """
-    weather_map = {
-        # 晴れ系
-        "晴れ": "晴れ",
-        "晴天": "晴れ",
-        "快晴": "晴れ",
-        # 曇り系
-        "曇り": "曇り",
-        "薄い雲": "曇り",
-        "厚い雲": "曇り",
-        "雲": "曇り",
-        # 雨系
-        "雨": "雨",
-        "小雨": "雨",
-        "大雨": "雨",
-        "にわか雨": "雨",
-        "霧雨": "雨",
-        "雷雨": "雷雨",
-        "雷": "雷雨",
-        # 雪系
-        "雪": "雪",
-        "小雪": "雪",
-        "大雪": "雪",
-        "みぞれ": "雪",
-        # 霧・もや系
-        "霧": "霧",
-        "もや": "霧",
-        # その他
-        "不明": "不明"
-    }
-    
-    # 完全一致を優先
-    if description in weather_map:
-        return weather_map[description]
-    
-    # 部分一致で判定
-    for key, value in weather_map.items():
-        if key in description:
-            return value
-    
-    # デフォルト
-    return "曇り" if "雲" in description else "晴れ"
-
 class Weather(BaseModel):
     """天気情報のレスポンスモデル"""
     date: str
@@ -84,50 +38,47 @@ class Weather(BaseModel):
     temperature: Optional[float] = None
     humidity: Optional[float] = None
     icon: Optional[str] = None
+    degraded: bool = False  # History APIの一部スロットが欠損した場合True
 
-def geocode_address(address: str) -> tuple[Optional[float], Optional[float]]:
-    """
-    住所から緯度経度を取得（Nominatim）
-    
-    Args:
-        address: 住所文字列
-        
-    Returns:
-        tuple: (緯度, 経度) 取得失敗時は (None, None)
-    """
-    url = f"https://nominatim.openstreetmap.org/search?format=json&q={address}"
-    try:
-        resp = requests.get(url, timeout=5, headers={"User-Agent": "mizukake-toban-app"})
-        resp.raise_for_status()
-        data = resp.json()
-        if data and len(data) > 0:
-            return float(data[0]["lat"]), float(data[0]["lon"])
-    except Exception as e:
-        print(f"[geocode_address] 住所→緯度経度変換失敗: {e}")
-    return None, None
+class FieldWeather(Weather):
+    """畑ごとの天気情報（一括取得のレスポンス要素）"""
+    field_id: int
+
+class BatchWeatherError(BaseModel):
+    """一括取得で天気情報を返せなかった畑・日付"""
+    field_id: int
+    date: Optional[str] = None
+    detail: str
+
+class BatchWeatherResponse(BaseModel):
+    """天気情報一括取得のレスポンスモデル"""
+    items: List[FieldWeather]
+    errors: List[BatchWeatherError]
+
+# 一括取得で指定できる最大日数
+BATCH_MAX_DAYS = 14
 
 @router.get("/api/weather", response_model=Weather)
-def get_weather(
+async def get_weather(
+    background_tasks: BackgroundTasks,
     field_id: int = Query(...),
     date: str = Query(...),
     db: Session = Depends(get_db)
 ):
     """
     指定された畑の天気情報を取得（外部API連携）
+    今日までは現在の天気と実績・予報の降雨量、明日以降はその日の予報の集計（一括取得と同じ値）を返す
+    上流APIの待ち時間はイベントループ上で待ち、DB処理だけをスレッドプールで実行する
     """
-    # 定期的に古いキャッシュを削除（確率ベースで実行）
-    import random
-    if random.random() < 0.05:  # 5%の確率で包括的クリーンアップ実行
-        cleanup_result = cleanup_cache(
-            db, 
-            cache_duration_minutes=15, 
-            days_to_keep=7, 
-            max_cache_size=1000
-        )
-        print(f"[Weather Cache Cleanup] 削除されたキャッシュ: {cleanup_result}")
+    try:
+        target_date = datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
     
     # 畑の存在確認
-    field = db.query(FieldModel).filter(FieldModel.id == field_id).first()
+    field = await run_in_threadpool(
+        lambda: db.query(FieldModel).filter(FieldModel.id == field_id).first()
+    )
     if field is None:
         raise HTTPException(status_code=404, detail="Field not found")
     
@@ -139,72 +90,169 @@ def get_weather(
     # DBに緯度・経度が保存されていればそれを使う。なければジオコーディングAPIを呼ぶ
     lat, lon = field.latitude, field.longitude
     if lat is None or lon is None:
-        lat, lon = geocode_address(field.location_text)
+        lat, lon = await run_in_threadpool(
+            geocode_address, field.location_text, GEOCODE_REQUEST_MAX_WAIT_SECONDS
+        )
         if lat is None or lon is None:
             raise HTTPException(status_code=502, detail="住所から緯度経度の取得に失敗しました")
     
-    # キャッシュから天気情報を取得（15分間有効）
-    cached_weather = get_cached_weather(db, lat, lon, date, cache_duration_minutes=15)
-    if cached_weather:
-        return Weather(**cached_weather)
-    
-    # 現在の天気データを取得
-    current_weather = get_weather_by_latlon(lat, lon, api_key)
-    if not current_weather:
+    # キャッシュから天気情報を取得（15分間有効、60分までは古いデータを返して裏で更新）
+    # キャッシュミス時の上流取得は同じキャッシュキーの同時リクエスト間で1回にまとめる
+    weather_data = await get_or_fetch_weather_async(
+        db,
+        lat,
+        lon,
+        date,
+        # 現在の天気・予報・History APIは同時に取得し、リクエスト内で共有する
+        lambda: AsyncWeatherContext(lat, lon, api_key).build_weather_data_async(date),
+        cache_duration_minutes=15,
+        stale_ttl_minutes=60,
+        schedule_refresh=background_tasks.add_task
+    )
+    if weather_data is None:
+        if not weather_upstream_guard.available():
+            raise HTTPException(status_code=503, detail="外部天気APIの呼び出しを一時停止中です")
+        if target_date > datetime.now().date():
+            raise HTTPException(status_code=404, detail="指定日の天気予報はありません")
         raise HTTPException(status_code=502, detail="外部天気API取得失敗")
+    return Weather(**weather_data)
+
+@router.get("/api/weather/batch", response_model=BatchWeatherResponse)
+def get_weather_batch(
+    background_tasks: BackgroundTasks,
+    field_ids: str = Query("all", description="カンマ区切りの畑ID、または all"),
+    start_date: str = Query(...),
+    end_date: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    複数の畑・日付の天気情報を一括取得
+    今日は現在の天気と実績・予報の降雨量、明日以降は予報（日別の集計）から組み立てる
+    過去の日付や予報のない日付、緯度経度が未取得の畑はerrorsに入れる（ジオコーディングはここでは行わない）
+    
+    Args:
+        field_ids: カンマ区切りの畑ID（例: 1,2,3）、allの場合は全畑
+        start_date: 開始日（YYYY-MM-DD形式）
+        end_date: 終了日（YYYY-MM-DD形式、省略時は開始日のみ）
+        db: データベースセッション
+        
+    Returns:
+        BatchWeatherResponse: 畑・日付ごとの天気情報と取得できなかった畑・日付の一覧
+        
+    Raises:
+        HTTPException: パラメータが不正な場合、またはAPIキーが未設定の場合
+    """
+    # 日付範囲の検証
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else start
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    if end < start or (end - start).days >= BATCH_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"日付範囲は{BATCH_MAX_DAYS}日以内で指定してください")
+    today = datetime.now().date()
+    dates = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    # 過去の日付は予報・現在の天気から組み立てられないため取得しない
+    past_dates = [date_str for date_str in dates if date.fromisoformat(date_str) < today]
+    dates = [date_str for date_str in dates if date.fromisoformat(date_str) >= today]
     
-    # 予報データを取得して今日の降水確率を取得
-    forecast_data = get_weather_forecast_by_latlon(lat, lon, api_key)
+    # 天気APIキーの取得
+    api_key = os.environ.get("WEATHER_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=400, detail=f"Weather APIキー未設定:{api_key}")
     
-    # 天気情報の抽出
-    weather_raw = current_weather.get("weather", [{}])[0].get("description", "不明")
-    weather = simplify_weather_description(weather_raw)
+    # 畑を1回のクエリで取得（画像などの大きな列は読み込まない）
+    query = db.query(FieldModel).options(
+        load_only(FieldModel.id, FieldModel.latitude, FieldModel.longitude, FieldModel.geocode_status)
+    )
+    if field_ids != "all":
+        try:
+            ids = [int(field_id) for field_id in field_ids.split(",") if field_id.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="field_idsはカンマ区切りの整数またはallで指定してください")
+        query = query.filter(FieldModel.id.in_(ids))
+    else:
+        ids = None
+    fields = query.order_by(FieldModel.id).all()
     
-    # 今日の累積降雨量を取得（より正確な計算）
-    current_rain_mm = get_accurate_daily_rainfall(lat, lon, api_key)
+    errors = []
+    if ids is not None:
+        found_ids = {field.id for field in fields}
+        errors.extend(
+            BatchWeatherError(field_id=field_id, detail="Field not found")
+            for field_id in dict.fromkeys(ids) if field_id not in found_ids
+        )
     
-    # 今日の降水確率を取得（予報データから）
-    pop = 0.0
-    if forecast_data:
-        today = datetime.now().date()
-        for forecast in forecast_data:
-            dt_txt = forecast.get("dt_txt")
-            if dt_txt:
-                forecast_date = datetime.strptime(dt_txt, "%Y-%m-%d %H:%M:%S").date()
-                if forecast_date == today:
-                    pop = forecast.get("pop", 0.0) * 100  # 0-1の値をパーセントに変換
-                    break
+    # 畑ごとの登録済みの緯度経度（未取得の畑は1件ずつ待つとリクエスト全体が止まるため、ここでは取得しない）
+    locations = {}
+    for field in fields:
+        if field.latitude is None or field.longitude is None:
+            if field.geocode_status == GeocodeStatus.PENDING:
+                errors.append(BatchWeatherError(field_id=field.id, detail="住所から緯度経度を取得中です"))
+            else:
+                errors.append(BatchWeatherError(field_id=field.id, detail="住所から緯度経度の取得に失敗しました"))
+            continue
+        locations[field.id] = (field.latitude, field.longitude)
+        errors.extend(
+            BatchWeatherError(field_id=field.id, date=date_str, detail="過去の日付の天気は取得できません")
+            for date_str in past_dates
+        )
     
-    # その他の天気情報
-    temperature = current_weather.get("main", {}).get("temp")
-    humidity = current_weather.get("main", {}).get("humidity")
-    icon = current_weather.get("weather", [{}])[0].get("icon")
+    def fetch_location(lat: float, lon: float, location_dates: List[str]) -> Dict[str, Optional[dict]]:
+        # 1地点につき上流APIは1セットだけ呼び、日付ごとの値を/api/weatherと同じ方法で組み立てる
+        ctx = WeatherContext(lat, lon, api_key)
+        return {date_str: ctx.build_weather_data_for_date(date_str) for date_str in location_dates}
     
-    weather_response = Weather(
-        date=date,
-        weather=weather,
-        rain_mm=current_rain_mm,
-        pop=pop,
-        temperature=temperature,
-        humidity=humidity,
-        icon=icon
+    # キャッシュの一括参照と、ミスした地点の並列取得（同じバケットの畑は1回の取得を共有）
+    weather_by_key = get_or_fetch_weather_many(
+        db,
+        [(lat, lon, date_str) for lat, lon in locations.values() for date_str in dates],
+        fetch_location,
+        cache_duration_minutes=15,
+        stale_ttl_minutes=60,
+        schedule_refresh=background_tasks.add_task
     )
     
-    # 天気情報をキャッシュに保存
-    set_cached_weather(db, lat, lon, date, weather_response.dict())
+    items = []
+    for field_id, (lat, lon) in locations.items():
+        for date_str in dates:
+            weather_data = weather_by_key.get(generate_cache_key(lat, lon, date_str))
+            if weather_data is None:
+                errors.append(BatchWeatherError(field_id=field_id, date=date_str, detail="予報の範囲外、または外部天気API取得失敗"))
+                continue
+            items.append(FieldWeather(field_id=field_id, **weather_data))
     
-    return weather_response
+    return BatchWeatherResponse(items=items, errors=errors)
+
+@router.get("/api/weather/cache/stats")
+def get_weather_cache_stats():
+    """
+    天気キャッシュ（プロセス内L1・取得合流・バケット別ヒット率）と上流APIの保護状態の統計情報を取得
+    
+    Returns:
+        dict: ヒット数・ミス数・削除数・上流APIの予算とブレーカーの状態などの統計情報
+    """
+    return {
+        "memory": get_memory_cache_stats(),
+        "single_flight": get_single_flight_stats(),
+        "buckets": get_bucket_stats(),
+        "upstream": get_upstream_stats()
+    }
 
 @router.get("/api/weather/forecast", response_model=list[Weather])
 def get_weather_forecast(
+    background_tasks: BackgroundTasks,
     field_id: int = Query(...),
     days: int = Query(7, ge=1, le=14),
     db: Session = Depends(get_db)
 ):
     """
     指定された畑の天気予報を取得
+    地点ごとにキャッシュした1件の予報データから日別の予報を組み立てる
+    （上流の予報データは5日間分のため、daysが大きくても返るのは予報のある日まで）
     
     Args:
+        background_tasks: 古いキャッシュの更新を登録するバックグラウンドタスク
         field_id: 畑ID
         days: 予報日数（1-14日）
         db: データベースセッション
@@ -213,52 +261,36 @@ def get_weather_forecast(
         list[Weather]: 天気予報一覧
         
     Raises:
-        HTTPException: 畑が見つからない場合、または天気API取得に失敗した場合
+        HTTPException: 畑が見つからない場合、緯度経度が未取得の場合、または天気API取得に失敗した場合
     """
     # 畑の存在確認
-    field = db.query(FieldModel).filter(FieldModel.id == field_id).first()
+    field = db.query(FieldModel).options(
+        load_only(FieldModel.id, FieldModel.latitude, FieldModel.longitude, FieldModel.geocode_status)
+    ).filter(FieldModel.id == field_id).first()
     if field is None:
         raise HTTPException(status_code=404, detail="Field not found")
     
-    # 天気APIキーの確認
-    if not field.weather_api_key:
+    # 天気APIキーの取得
+    api_key = os.environ.get("WEATHER_API_KEY")
+    if not api_key:
         raise HTTPException(status_code=400, detail="Weather APIキー未設定")
     
-    # 住所から緯度経度取得
-    lat, lon = geocode_address(field.location_text)
-    if lat is None or lon is None:
+    # 登録済みの緯度経度を使う
+    if field.latitude is None or field.longitude is None:
+        if field.geocode_status == GeocodeStatus.PENDING:
+            raise HTTPException(status_code=409, detail="住所から緯度経度を取得中です")
         raise HTTPException(status_code=502, detail="住所から緯度経度の取得に失敗しました")
     
-    # 天気予報データを取得
-    forecast_list = get_weather_forecast_by_latlon(lat, lon, field.weather_api_key)
+    forecast_list = get_or_fetch_forecast(
+        db,
+        field.latitude,
+        field.longitude,
+        api_key,
+        schedule_refresh=background_tasks.add_task
+    )
     if not forecast_list:
+        if not weather_upstream_guard.available():
+            raise HTTPException(status_code=503, detail="外部天気APIの呼び出しを一時停止中です")
         raise HTTPException(status_code=502, detail="外部天気API取得失敗")
     
-    # 日付ごとに1件（昼12時）を抽出、最大days件返す
-    result = []
-    seen_dates = set()
-    for item in forecast_list:
-        dt_txt = item.get("dt_txt")
-        if not dt_txt:
-            continue
-        
-        dt = datetime.strptime(dt_txt, "%Y-%m-%d %H:%M:%S")
-        date_str = dt.date().isoformat()
-        
-        if dt.hour == 12 and date_str not in seen_dates:
-            weather_raw = item.get("weather", [{}])[0].get("description", "不明")
-            weather = simplify_weather_description(weather_raw)
-            
-            result.append(Weather(
-                date=date_str,
-                weather=weather,
-                rain_mm=item.get("rain", {}).get("3h", 0.0) or 0.0,
-                temperature=item.get("main", {}).get("temp"),
-                humidity=item.get("main", {}).get("humidity")
-            ))
-            seen_dates.add(date_str)
-        
-        if len(result) >= days:
-            break
-    
-    return result 
\ No newline at end of file
+    return [Weather(**item) for item in build_daily_forecast(forecast_list, days)]
@@ -0,0 +1,300 @@
+"""
+外部HTTPクライアント
+外部API（天気・ジオコーディング・LINE通知）への通信で共有する、接続プール付きHTTPクライアント
+"""
+
+import asyncio
+import os
+import random
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 接続タイムアウト・読み取りタイムアウト（秒）の既定値
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "3.05"))
+HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "5"))
+# ホストごとの同時リクエスト数の上限（接続プールのサイズも同じ値にする）
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "16"))
+# 接続エラー・429/5xx時の再試行回数と、指数バックオフの係数・ジッター（秒）
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.2"))
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", "0.2"))
+# 再試行までの待ち時間の上限（秒）。Retry-Afterがこれより長い場合は従わず、通常のバックオフで待つ
+# （同期の呼び出しがリクエスト処理のスレッドを長く塞がないようにする）
+HTTP_BACKOFF_MAX_SECONDS = float(os.getenv("HTTP_BACKOFF_MAX_SECONDS", "2"))
+
+# 再試行対象のHTTPステータスと、再試行してよい（冪等な）メソッド
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+class _BoundedRetry(Retry):
+    """Retry-Afterの待ち時間がHTTP_BACKOFF_MAX_SECONDSを超える場合は従わないRetry"""
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is not None and retry_after > HTTP_BACKOFF_MAX_SECONDS:
+            return None
+        return retry_after
+
+class HttpClient:
+    """
+    接続プールとKeep-Aliveを使い回すHTTPクライアント
+
+    requests.Sessionを共有し、ホストごとに同時リクエスト数を制限する。
+    再試行は冪等なメソッド（GETなど）のみ、ジッター付き指数バックオフで行う。
+    POSTと、呼び出し元が再試行を管理する（retry=False）リクエストは再試行しないセッションで送る。
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT_SECONDS,
+        read_timeout: float = HTTP_READ_TIMEOUT_SECONDS,
+        retries: int = HTTP_RETRIES,
+        backoff_factor: float = HTTP_BACKOFF_FACTOR,
+        backoff_jitter: float = HTTP_BACKOFF_JITTER
+    ):
+        """
+        Args:
+            max_connections_per_host: ホストごとの同時リクエスト数の上限
+            connect_timeout: 接続タイムアウト（秒）
+            read_timeout: 読み取りタイムアウト（秒）
+            retries: 再試行回数
+            backoff_factor: 指数バックオフの係数（秒）
+            backoff_jitter: バックオフに加えるランダムな揺らぎの上限（秒）
+        """
+        self.max_connections_per_host = max_connections_per_host
+        self.default_timeout = (connect_timeout, read_timeout)
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_limits_lock = threading.Lock()
+
+        retry = _BoundedRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            backoff_max=HTTP_BACKOFF_MAX_SECONDS,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.session = self._create_session(max_connections_per_host, retry)
+        self.no_retry_session = self._create_session(max_connections_per_host, Retry(total=0, raise_on_status=False))
+
+    @staticmethod
+    def _create_session(max_connections_per_host: int, retry: Retry) -> requests.Session:
+        """再試行の設定ごとの接続プール付きセッションを作成"""
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=max_connections_per_host,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @contextmanager
+    def _host_slot(self, url: str) -> Iterator[None]:
+        """ホストごとの同時リクエスト数の枠を確保する"""
+        host = urlsplit(url).netloc
+        with self._host_limits_lock:
+            semaphore = self._host_limits.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_connections_per_host)
+                self._host_limits[host] = semaphore
+        with semaphore:
+            yield
+
+    def request(self, method: str, url: str, retry: bool = True, **kwargs) -> requests.Response:
+        """
+        HTTPリクエストを送信
+
+        Args:
+            method: HTTPメソッド
+            url: リクエスト先URL
+            retry: 接続エラー・429/5xx時に再試行するかどうか（冪等なメソッドのみ再試行する。
+                呼び出し回数の予算やレート制限を呼び出し元で管理する場合はFalse）
+            **kwargs: requests.Session.requestに渡す引数（timeout省略時は既定値）
+
+        Returns:
+            requests.Response: レスポンス
+        """
+        kwargs.setdefault("timeout", self.default_timeout)
+        session = self.session if retry and method.upper() in IDEMPOTENT_METHODS else self.no_retry_session
+        with self._host_slot(url):
+            return session.request(method, url, **kwargs)
+
+    def get(self, url: str, retry: bool = True, **kwargs) -> requests.Response:
+        """GETリクエストを送信"""
+        return self.request("GET", url, retry=retry, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """POSTリクエストを送信（接続エラーも含めて再試行はしない）"""
+        return self.request("POST", url, retry=False, **kwargs)
+
+    def close(self) -> None:
+        """接続プールを閉じる"""
+        self.session.close()
+        self.no_retry_session.close()
+
+class AsyncHttpClient:
+    """
+    非同期版の共有HTTPクライアント（httpx.AsyncClient）
+
+    HttpClientと同じく接続プール・ホストごとの同時リクエスト数制限・
+    ジッター付き指数バックオフの再試行を行う。イベントループをブロックしない。
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT_SECONDS,
+        read_timeout: float = HTTP_READ_TIMEOUT_SECONDS,
+        retries: int = HTTP_RETRIES,
+        backoff_factor: float = HTTP_BACKOFF_FACTOR,
+        backoff_jitter: float = HTTP_BACKOFF_JITTER
+    ):
+        """
+        Args:
+            max_connections_per_host: ホストごとの同時リクエスト数の上限
+            connect_timeout: 接続タイムアウト（秒）
+            read_timeout: 読み取りタイムアウト（秒）
+            retries: 再試行回数
+            backoff_factor: 指数バックオフの係数（秒）
+            backoff_jitter: バックオフに加えるランダムな揺らぎの上限（秒）
+        """
+        self.max_connections_per_host = max_connections_per_host
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_keepalive_connections=max_connections_per_host)
+        )
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str) -> AsyncIterator[None]:
+        """ホストごとの同時リクエスト数の枠を確保する"""
+        host = urlsplit(url).netloc
+        semaphore = self._host_limits.get(host)
+        if semaphore is None:
+            semaphore = self._host_limits.setdefault(host, asyncio.Semaphore(self.max_connections_per_host))
+        async with semaphore:
+            yield
+
+    def _backoff_seconds(self, attempt: int) -> float:
+        """再試行までの待ち時間（秒、HTTP_BACKOFF_MAX_SECONDSまで）"""
+        return min(self.backoff_factor * (2 ** attempt), HTTP_BACKOFF_MAX_SECONDS) + random.uniform(0, self.backoff_jitter)
+
+    async def request(self, method: str, url: str, retry: bool = True, **kwargs) -> httpx.Response:
+        """
+        HTTPリクエストを送信
+
+        Args:
+            method: HTTPメソッド
+            url: リクエスト先URL
+            retry: 接続エラー・429/5xx時に再試行するかどうか（冪等なメソッドのみ再試行する）
+            **kwargs: httpx.AsyncClient.requestに渡す引数
+
+        Returns:
+            httpx.Response: レスポンス
+        """
+        retryable = retry and method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                async with self._host_slot(url):
+                    resp = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if not retryable or attempt >= self.retries:
+                    raise
+            else:
+                if not (retryable and resp.status_code in RETRY_STATUSES and attempt < self.retries):
+                    return resp
+            await asyncio.sleep(self._backoff_seconds(attempt))
+            attempt += 1
+
+    async def get(self, url: str, retry: bool = True, **kwargs) -> httpx.Response:
+        """GETリクエストを送信"""
+        return await self.request("GET", url, retry=retry, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        """POSTリクエストを送信（再試行はしない）"""
+        return await self.request("POST", url, retry=False, **kwargs)
+
+    async def aclose(self) -> None:
+        """接続プールを閉じる"""
+        await self.client.aclose()
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+_async_client: Optional[AsyncHttpClient] = None
+
+def init_http_client() -> HttpClient:
+    """
+    共有HTTPクライアントを作成（アプリケーション起動時に呼ぶ）
+
+    Returns:
+        HttpClient: 共有HTTPクライアント
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+def get_http_client() -> HttpClient:
+    """
+    共有HTTPクライアントを取得（未作成の場合は作成する）
+
+    Returns:
+        HttpClient: 共有HTTPクライアント
+    """
+    return _client or init_http_client()
+
+def close_http_client() -> None:
+    """共有HTTPクライアントを閉じる（アプリケーション終了時に呼ぶ）"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+def init_async_http_client() -> AsyncHttpClient:
+    """
+    非同期版の共有HTTPクライアントを作成（アプリケーション起動時に呼ぶ）
+
+    Returns:
+        AsyncHttpClient: 非同期版の共有HTTPクライアント
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncHttpClient()
+    return _async_client
+
+def get_async_http_client() -> AsyncHttpClient:
+    """
+    非同期版の共有HTTPクライアントを取得（未作成の場合は作成する）
+
+    Returns:
+        AsyncHttpClient: 非同期版の共有HTTPクライアント
+    """
+    return _async_client or init_async_http_client()
+
+async def close_async_http_client() -> None:
+    """非同期版の共有HTTPクライアントを閉じる（アプリケーション終了時に呼ぶ）"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
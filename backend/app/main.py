@@ -8,9 +8,21 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 
 from app.core.config import DATABASE_URL
+from app.core.http_client import (
+    init_http_client,
+    close_http_client,
+    init_async_http_client,
+    close_async_http_client
+)
 from app.api import schedules, histories, weather, users, fields, auth
 from app.models import Base
 from app.database import engine
+from app.services.scheduler import scheduler, ENABLE_BACKGROUND_JOBS
+from app.services.weather_prefetch import prefetch_scheduled_weather, WEATHER_PREFETCH_INTERVAL_MINUTES
+from app.services.weather_cache_service import run_cache_maintenance, WEATHER_CACHE_CLEANUP_INTERVAL_MINUTES
+from app.services.geocoding_service import geocode_pending_fields, GEOCODE_PENDING_INTERVAL_MINUTES
+from app.services.daily_weather_service import record_daily_weather, DAILY_WEATHER_INTERVAL_MINUTES
+from app.services.field_image_service import collect_unreferenced_blobs, FIELD_IMAGE_BLOB_GC_INTERVAL_MINUTES
 
 # FastAPIアプリケーションのインスタンス作成
 app = FastAPI(
@@ -35,8 +47,56 @@ app.add_middleware(
 # アプリケーション起動時の処理
 @app.on_event("startup")
 async def startup_event():
-    """アプリケーション起動時にデータベーステーブルを作成"""
+    """アプリケーション起動時にデータベーステーブルを作成し、外部HTTPクライアントと定期ジョブを開始"""
     Base.metadata.create_all(bind=engine)
+    init_http_client()
+    init_async_http_client()
+    
+    if ENABLE_BACKGROUND_JOBS:
+        # 当番予定のある畑の天気情報を事前にキャッシュ
+        scheduler.register(
+            "weather_prefetch",
+            WEATHER_PREFETCH_INTERVAL_MINUTES * 60,
+            prefetch_scheduled_weather,
+            initial_delay_seconds=30
+        )
+        # 天気キャッシュのクリーンアップ（リクエスト処理の外で実行）
+        scheduler.register(
+            "weather_cache_cleanup",
+            WEATHER_CACHE_CLEANUP_INTERVAL_MINUTES * 60,
+            run_cache_maintenance,
+            initial_delay_seconds=60
+        )
+        # 緯度経度の取得待ちのまま残った畑の再処理
+        scheduler.register(
+            "field_geocode",
+            GEOCODE_PENDING_INTERVAL_MINUTES * 60,
+            geocode_pending_fields,
+            initial_delay_seconds=90
+        )
+        # 前日までの日別天気の記録（記録済みの日は取得しない）
+        scheduler.register(
+            "daily_weather",
+            DAILY_WEATHER_INTERVAL_MINUTES * 60,
+            record_daily_weather,
+            initial_delay_seconds=120
+        )
+        # どの畑からも参照されなくなった画像ブロブの削除
+        scheduler.register(
+            "image_blob_gc",
+            FIELD_IMAGE_BLOB_GC_INTERVAL_MINUTES * 60,
+            collect_unreferenced_blobs,
+            initial_delay_seconds=150
+        )
+        scheduler.start()
+
+# アプリケーション終了時の処理
+@app.on_event("shutdown")
+async def shutdown_event():
+    """アプリケーション終了時に定期ジョブを停止し、外部HTTPクライアントを閉じる"""
+    scheduler.stop()
+    close_http_client()
+    await close_async_http_client()
 
 # ヘルスチェックエンドポイント
 @app.get("/health/db")
@@ -47,6 +107,13 @@ def db_health_check():
     return {"db": result}
 
 
+# 定期ジョブの実行状況
+@app.get("/health/jobs")
+def jobs_health_check():
+    """定期ジョブの実行状況を返す"""
+    return scheduler.stats()
+
+
 # warmup用エンドポイント
 @app.get("/api/warmup")
 def warmup():
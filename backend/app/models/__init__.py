@@ -5,10 +5,13 @@ SQLAlchemyを使用したデータベースモデルの定義
 
 from .base import Base
 from .user import User, UserRole
-from .field import Field
+from .field import Field, GeocodeStatus
+from .field_image_rendition import FieldImageRendition
 from .schedule import Schedule, ScheduleStatus
 from .history import History
 from .weather_cache import WeatherCache
+from .geocode_cache import GeocodeCache
+from .daily_weather import DailyWeather
 
 # 外部からインポート可能なモデルクラス
 __all__ = [
@@ -16,8 +19,12 @@ __all__ = [
     "User",
     "UserRole", 
     "Field",
+    "GeocodeStatus",
+    "FieldImageRendition",
     "Schedule",
     "ScheduleStatus",
     "History",
-    "WeatherCache"
+    "WeatherCache",
+    "GeocodeCache",
+    "DailyWeather"
 ] 
\ No newline at end of file
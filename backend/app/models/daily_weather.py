@@ -0,0 +1,34 @@
+"""
+日別天気モデル
+地点バケットごとの日別の天気実績を蓄積するデータベースモデル（追記のみ・日付で月別パーティション）
+"""
+
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime
+from sqlalchemy.sql import func
+
+from .base import Base
+
+class DailyWeather(Base):
+    """日別天気テーブルのモデル"""
+    __tablename__ = "daily_weather"
+    # PostgreSQLでは日付の範囲で月別のパーティションに分ける（パーティションはdaily_weather_serviceが作成）
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+
+    # 地点バケット（geo_bucket.location_bucket）と日付の組で一意
+    bucket = Column(String(64), primary_key=True, comment="地点バケットID")
+    date = Column(Date, primary_key=True, comment="日付")
+    
+    # 取得に使った地点
+    latitude = Column(Float, nullable=False, comment="緯度")
+    longitude = Column(Float, nullable=False, comment="経度")
+    
+    # 天気実績
+    weather = Column(String(16), nullable=True, comment="天気（12時時点）")
+    rain_mm = Column(Float, nullable=False, comment="降雨量（mm）")
+    temperature = Column(Float, nullable=True, comment="気温（12時時点）")
+    humidity = Column(Integer, nullable=True, comment="湿度（12時時点）")
+    
+    # タイムスタンプ
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="作成日時")
@@ -3,12 +3,19 @@
 畑の情報を管理するデータベースモデル
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, LargeBinary
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+import enum
 
 from .base import Base
 
+class GeocodeStatus(enum.Enum):
+    """住所→緯度経度変換の状態の列挙型"""
+    PENDING = "pending"  # 変換待ち
+    DONE = "done"        # 変換済み
+    FAILED = "failed"    # 変換失敗
+
 class Field(Base):
     """畑テーブルのモデル"""
     __tablename__ = "fields"
@@ -21,9 +28,16 @@ class Field(Base):
     # 位置情報
     latitude = Column(Float, nullable=True, comment="緯度")
     longitude = Column(Float, nullable=True, comment="経度")
+    geocode_status = Column(
+        Enum(GeocodeStatus, values_callable=lambda x: [e.value for e in x]),
+        server_default=GeocodeStatus.DONE.value,
+        nullable=False,
+        comment="住所→緯度経度変換の状態"
+    )
     
-    # 画像データ
-    image = Column(LargeBinary, nullable=True, comment="畑の図面画像（バイナリ）")
+    # 画像（本体はブロブストアにSHA-256をキーにして保存する）
+    image_sha256 = Column(String(64), nullable=True, comment="画像のSHA-256（ETag・ブロブのキー）")
+    image_size = Column(Integer, nullable=True, comment="画像のサイズ（バイト）")
     
     # 作成者情報
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False, comment="作成者ID")
@@ -34,4 +48,9 @@ class Field(Base):
 
     # リレーション
     creator = relationship("User", back_populates="fields")
-    schedules = relationship("Schedule", back_populates="field") 
\ No newline at end of file
+    schedules = relationship("Schedule", back_populates="field")
+    image_renditions = relationship(
+        "FieldImageRendition",
+        back_populates="field",
+        cascade="all, delete-orphan"
+    ) 
\ No newline at end of file
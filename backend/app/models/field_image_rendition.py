@@ -0,0 +1,37 @@
+"""
+畑画像レンディションモデル
+アップロードされた畑の図面画像から生成した、サイズ別の画像（サムネイル・中サイズ・原寸）を管理するデータベースモデル
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+
+from .base import Base
+
+class FieldImageRendition(Base):
+    """畑画像レンディションテーブルのモデル"""
+    __tablename__ = "field_image_renditions"
+    __table_args__ = (
+        # 畑ごとに各サイズ1件
+        UniqueConstraint("field_id", "size", name="uq_field_image_renditions_field_id_size"),
+    )
+
+    # 基本情報
+    id = Column(Integer, primary_key=True, index=True)
+    field_id = Column(Integer, ForeignKey("fields.id", ondelete="CASCADE"), nullable=False, comment="畑ID")
+    size = Column(String(16), nullable=False, comment="サイズ（thumbnail / medium / original）")
+    
+    # 画像情報
+    content_type = Column(String(32), nullable=False, comment="Content-Type")
+    width = Column(Integer, nullable=True, comment="幅（px）")
+    height = Column(Integer, nullable=True, comment="高さ（px）")
+    byte_size = Column(Integer, nullable=False, comment="サイズ（バイト）")
+    # 画像本体はブロブストアにSHA-256をキーにして保存する
+    sha256 = Column(String(64), nullable=False, comment="画像のSHA-256（ETag・ブロブのキー）")
+    
+    # タイムスタンプ
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="作成日時")
+
+    # リレーション
+    field = relationship("Field", back_populates="image_renditions")
@@ -0,0 +1,27 @@
+"""
+ジオコーディングキャッシュモデル
+住所から取得した緯度経度をキャッシュするためのデータベースモデル
+"""
+
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy.sql import func
+
+from .base import Base
+
+class GeocodeCache(Base):
+    """ジオコーディングキャッシュテーブルのモデル"""
+    __tablename__ = "geocode_cache"
+
+    # 基本情報
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # キャッシュキー（正規化した住所）
+    address_key = Column(String(255), nullable=False, unique=True, index=True, comment="正規化した住所")
+    
+    # 位置情報（住所が見つからなかった場合はNULL）
+    latitude = Column(Float, nullable=True, comment="緯度")
+    longitude = Column(Float, nullable=True, comment="経度")
+    
+    # タイムスタンプ
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="作成日時")
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), comment="更新日時")
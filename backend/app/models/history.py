@@ -3,7 +3,7 @@
 水かけ実行履歴を管理するデータベースモデル
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -12,6 +12,9 @@ from .base import Base
 class History(Base):
     """履歴テーブルのモデル"""
     __tablename__ = "histories"
+    __table_args__ = (
+        Index("ix_histories_weather_bucket_date", "weather_bucket", "weather_date"),
+    )
 
     # 基本情報
     id = Column(Integer, primary_key=True, index=True)
@@ -23,6 +26,10 @@ class History(Base):
     status = Column(String(16), nullable=False, default='完了', comment="実行状態")
     comment = Column(String(300), nullable=True, comment="実行コメント")
     
+    # 日別天気（daily_weather）の参照キー（実施時の畑の地点バケットと当番日）
+    weather_bucket = Column(String(64), nullable=True, comment="地点バケットID")
+    weather_date = Column(Date, nullable=True, comment="天気の対象日")
+    
     # タイムスタンプ
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="作成日時")
 
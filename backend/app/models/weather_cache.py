@@ -3,7 +3,7 @@
 天気情報をキャッシュするためのデータベースモデル
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, LargeBinary
 from sqlalchemy.sql import func
 
 from .base import Base
@@ -18,9 +18,13 @@ class WeatherCache(Base):
     # キャッシュキー（緯度_経度_日付）
     cache_key = Column(String(100), nullable=False, unique=True, index=True, comment="キャッシュキー")
     
-    # 天気情報（JSON文字列）
-    weather_data = Column(Text, nullable=False, comment="天気情報（JSON文字列）")
+    # 天気情報（旧形式のJSON文字列。新しいキャッシュはpayloadに保存する）
+    weather_data = Column(Text, nullable=True, comment="天気情報（JSON文字列）")
+    
+    # 天気情報（payload_formatのシリアライザでエンコードしたバイト列）
+    payload = Column(LargeBinary, nullable=True, comment="天気情報（エンコード済み）")
+    payload_format = Column(String(16), nullable=True, comment="payloadのエンコード形式")
     
     # タイムスタンプ
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="作成日時")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True, comment="作成日時")
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), comment="更新日時") 
\ No newline at end of file
@@ -0,0 +1,388 @@
+"""
+ブロブストア
+畑の画像などのバイナリをデータベースの外に保存する（内容のSHA-256をキーにし、同じ内容は1つにまとめる）
+保存先は切り替え可能にし、標準ではローカルのファイルシステムに保存する
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+# 使用するブロブストア（local）
+BLOB_STORE = os.getenv("BLOB_STORE", "local")
+# ローカルブロブストアの保存先ディレクトリ
+BLOB_STORE_DIR = os.getenv(
+    "BLOB_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "storage", "blobs")
+)
+
+# キー（SHA-256の16進）の形式
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+class BlobWriter:
+    """
+    ブロブを少しずつ書き込むライター（アップロードをメモリに溜めずに保存する）
+
+    write() で書き込みながらSHA-256を計算し、commit() で内容に応じたキーで保存する。
+    commit() せずに close() / abort() した場合は何も保存しない。
+    with文で使うと、例外で抜けたときに書きかけのデータを破棄する。
+    """
+
+    def __init__(self):
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        """
+        データを書き込む
+
+        Args:
+            chunk: 書き込むデータ
+        """
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        self._write(chunk)
+
+    def hexdigest(self) -> str:
+        """これまでに書き込んだデータのSHA-256（16進）"""
+        return self._hash.hexdigest()
+
+    def commit(self) -> str:
+        """
+        書き込んだデータをブロブとして保存（保存済みの内容なら何もしない）
+
+        Returns:
+            str: キー
+        """
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        """書き込んだデータを破棄する（commit済みなら何もしない）"""
+        raise NotImplementedError
+
+    def _write(self, chunk: bytes) -> None:
+        """保存先への書き込み（ハッシュとサイズの計算は write() が行う）"""
+        raise NotImplementedError
+
+    def __enter__(self) -> "BlobWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.abort()
+
+class _BufferedBlobWriter(BlobWriter):
+    """メモリに溜めてから BlobStore.put() で保存するライター（ストリーミング書き込みに対応しない保存先用）"""
+
+    def __init__(self, store: "BlobStore"):
+        super().__init__()
+        self._store = store
+        self._buffer: Optional[bytearray] = bytearray()
+
+    def _write(self, chunk: bytes) -> None:
+        self._buffer.extend(chunk)
+
+    def commit(self) -> str:
+        key = self._store.put(bytes(self._buffer))
+        self._buffer = None
+        return key
+
+    def abort(self) -> None:
+        self._buffer = None
+
+def _validate_key(key: str) -> str:
+    """キーの形式を確認する（パスに使うため、SHA-256の16進以外は受け付けない）"""
+    if not isinstance(key, str) or not _KEY_PATTERN.match(key):
+        raise ValueError(f"不正なブロブのキーです: {key!r}")
+    return key
+
+class BlobStore:
+    """
+    ブロブストアの基底クラス
+
+    キーは内容のSHA-256（16進）。同じ内容は同じキーになり、保存は1回で済む。
+    保存したブロブは書き換えない（内容が変わればキーも変わる）。
+    """
+
+    # BLOB_STOREで指定する識別名
+    name = ""
+
+    def put(self, data: bytes) -> str:
+        """
+        ブロブを保存（保存済みの内容なら何もしない）
+
+        Args:
+            data: バイナリ
+
+        Returns:
+            str: キー
+        """
+        raise NotImplementedError
+
+    def open(self, key: str) -> BinaryIO:
+        """
+        ブロブを読み込み用に開く
+
+        Args:
+            key: キー
+
+        Returns:
+            BinaryIO: 読み込み用のファイルオブジェクト（呼び出し元で閉じる）
+
+        Raises:
+            FileNotFoundError: ブロブがない場合
+        """
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        """
+        ブロブがあるかどうか
+
+        Args:
+            key: キー
+
+        Returns:
+            bool: ある場合はTrue
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """
+        ブロブを削除（ない場合は何もしない）
+
+        Args:
+            key: キー
+        """
+        raise NotImplementedError
+
+    def list_blobs(self) -> Iterator[Tuple[str, float]]:
+        """
+        保存されているブロブを列挙
+
+        Returns:
+            Iterator[Tuple[str, float]]: (キー, 最終保存時刻のUNIX時間)
+        """
+        raise NotImplementedError
+
+    def delete_temporary_files(self, older_than: float) -> int:
+        """
+        書き込み途中で残った一時ファイル（プロセスの異常終了などでcommit/abortされなかったもの）を削除
+
+        Args:
+            older_than: この時刻（UNIX時間）より前に最後に書き込まれた一時ファイルを削除する
+
+        Returns:
+            int: 削除した件数（一時ファイルを使わない保存先では0）
+        """
+        return 0
+
+    def writer(self) -> BlobWriter:
+        """
+        ブロブを少しずつ書き込むライターを取得
+
+        Returns:
+            BlobWriter: ライター（標準ではメモリに溜めてからput()する。保存先ごとに置き換える）
+        """
+        return _BufferedBlobWriter(self)
+
+    def read(self, key: str) -> bytes:
+        """
+        ブロブの内容を取得
+
+        Args:
+            key: キー
+
+        Returns:
+            bytes: バイナリ
+
+        Raises:
+            FileNotFoundError: ブロブがない場合
+        """
+        with self.open(key) as f:
+            return f.read()
+
+    def local_path(self, key: str) -> Optional[str]:
+        """
+        ブロブのローカルファイルのパスを取得（ファイルをそのまま送信できる場合に使う）
+
+        Args:
+            key: キー
+
+        Returns:
+            Optional[str]: パス、ローカルファイルでない保存先ではNone
+        """
+        return None
+
+class LocalBlobStore(BlobStore):
+    """
+    ローカルのファイルシステムに保存するブロブストア
+
+    {root}/{キーの先頭2桁}/{次の2桁}/{キー} に保存する（1ディレクトリのファイル数を抑える）。
+    一時ファイル（{root}/.tmp/）に書いてから移すため、書き込み途中のファイルが読まれることはない。
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = BLOB_STORE_DIR):
+        """
+        Args:
+            root: 保存先ディレクトリ（なければ作成する）
+        """
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        """キーに対応するファイルのパス"""
+        _validate_key(key)
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data: bytes) -> str:
+        with self.writer() as writer:
+            writer.write(data)
+            return writer.commit()
+
+    def writer(self) -> BlobWriter:
+        return _LocalBlobWriter(self)
+
+    def _store_file(self, tmp_path: str, key: str) -> None:
+        """書き込み済みの一時ファイルをキーのパスに移す（保存済みの内容なら一時ファイルを消す）"""
+        path = self._path(key)
+        if os.path.exists(path):
+            # 保存済みでも、参照されていないブロブの削除で消されないよう保存時刻を更新する
+            os.utime(path)
+            os.unlink(tmp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list_blobs(self) -> Iterator[Tuple[str, float]]:
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not _KEY_PATTERN.match(filename):
+                    continue
+                try:
+                    modified_at = os.path.getmtime(os.path.join(directory, filename))
+                except FileNotFoundError:
+                    continue
+                yield filename, modified_at
+
+    def delete_temporary_files(self, older_than: float) -> int:
+        deleted = 0
+        tmp_dir = os.path.join(self.root, ".tmp")
+        if not os.path.isdir(tmp_dir):
+            return 0
+        for filename in os.listdir(tmp_dir):
+            path = os.path.join(tmp_dir, filename)
+            try:
+                if os.path.getmtime(path) >= older_than:
+                    continue
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            deleted += 1
+        return deleted
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+class _LocalBlobWriter(BlobWriter):
+    """
+    ローカルブロブストアのライター
+
+    {root}/.tmp/ の一時ファイルに書き込み、commit() でキーのパスに移す（同じファイルシステム内の移動）。
+    """
+
+    def __init__(self, store: LocalBlobStore):
+        super().__init__()
+        self._store = store
+        tmp_dir = os.path.join(store.root, ".tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+
+    def _write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+
+    def commit(self) -> str:
+        key = self.hexdigest()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._store._store_file(self._tmp_path, key)
+        self._tmp_path = None
+        return key
+
+    def abort(self) -> None:
+        if self._tmp_path is None:
+            return
+        self._file.close()
+        try:
+            os.unlink(self._tmp_path)
+        except FileNotFoundError:
+            pass
+        self._tmp_path = None
+
+_STORE_CLASSES = {
+    LocalBlobStore.name: LocalBlobStore
+}
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+def create_blob_store(name: str) -> BlobStore:
+    """
+    識別名からブロブストアを生成
+
+    Args:
+        name: ブロブストアの識別名（local）
+
+    Returns:
+        BlobStore: ブロブストア
+
+    Raises:
+        ValueError: 未知の識別名の場合
+    """
+    store_class = _STORE_CLASSES.get(name)
+    if store_class is None:
+        raise ValueError(f"使用できないブロブストアです: {name}")
+    return store_class()
+
+def get_blob_store() -> BlobStore:
+    """
+    使用中のブロブストアを取得（初回はBLOB_STOREから生成）
+
+    Returns:
+        BlobStore: ブロブストア
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_blob_store(BLOB_STORE)
+                print(f"[blob_store] ブロブストア: {_store.name}")
+    return _store
+
+def set_blob_store(store: Optional[BlobStore]) -> None:
+    """
+    使用するブロブストアを差し替える（移行スクリプトやベンチマークなどから使う。NoneならBLOB_STOREに戻す）
+
+    Args:
+        store: ブロブストア
+    """
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,118 @@
+"""
+キャッシュシリアライザ
+キャッシュに保存するデータのエンコード・デコード方式を切り替え可能にする
+"""
+
+import json
+import os
+from typing import Any, Dict
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson未インストール環境
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack未インストール環境
+    msgpack = None
+
+class CacheSerializer:
+    """シリアライザの基底クラス"""
+
+    # weather_cache.payload_format に保存する識別名
+    name = ""
+
+    def encode(self, data: Any) -> bytes:
+        """
+        データをバイト列に変換
+
+        Args:
+            data: 変換するデータ
+
+        Returns:
+            bytes: エンコード済みデータ
+        """
+        raise NotImplementedError
+
+    def decode(self, payload: bytes) -> Any:
+        """
+        バイト列をデータに復元
+
+        Args:
+            payload: エンコード済みデータ
+
+        Returns:
+            Any: 復元したデータ
+        """
+        raise NotImplementedError
+
+class JsonSerializer(CacheSerializer):
+    """標準ライブラリのjsonによるUTF-8 JSON"""
+
+    name = "json"
+
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, payload: bytes) -> Any:
+        return json.loads(payload)
+
+class OrjsonSerializer(CacheSerializer):
+    """orjsonによるUTF-8 JSON（標準のjsonより高速）"""
+
+    name = "orjson"
+
+    def encode(self, data: Any) -> bytes:
+        return orjson.dumps(data)
+
+    def decode(self, payload: bytes) -> Any:
+        return orjson.loads(payload)
+
+class MsgpackSerializer(CacheSerializer):
+    """MessagePackによるバイナリ形式（JSONよりサイズが小さい）"""
+
+    name = "msgpack"
+
+    def encode(self, data: Any) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def decode(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload, raw=False)
+
+def available_serializers() -> Dict[str, CacheSerializer]:
+    """
+    この環境で使用可能なシリアライザを取得
+
+    Returns:
+        Dict[str, CacheSerializer]: 識別名ごとのシリアライザ
+    """
+    serializers = {JsonSerializer.name: JsonSerializer()}
+    if orjson is not None:
+        serializers[OrjsonSerializer.name] = OrjsonSerializer()
+    if msgpack is not None:
+        serializers[MsgpackSerializer.name] = MsgpackSerializer()
+    return serializers
+
+_SERIALIZERS = available_serializers()
+
+def get_serializer(name: str) -> CacheSerializer:
+    """
+    識別名からシリアライザを取得
+
+    Args:
+        name: シリアライザの識別名（json / orjson / msgpack）
+
+    Returns:
+        CacheSerializer: シリアライザ
+
+    Raises:
+        ValueError: 未知の識別名、または必要なライブラリが未インストールの場合
+    """
+    serializer = _SERIALIZERS.get(name)
+    if serializer is None:
+        raise ValueError(f"使用できないキャッシュ形式です: {name}")
+    return serializer
+
+# 新しく書き込むキャッシュの形式（orjsonが使えればorjson）
+WEATHER_CACHE_FORMAT = os.getenv("WEATHER_CACHE_FORMAT", "orjson" if orjson is not None else "json")
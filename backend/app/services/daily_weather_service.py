@@ -0,0 +1,254 @@
+"""
+日別天気の蓄積サービス
+畑のある地点バケットごとに前日までの天気実績をdaily_weatherへ1日1行ずつ追記し、
+水かけ履歴から参照できるようにする（分析時に上流APIを呼び直さない）
+"""
+
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import (
+    DailyWeather,
+    Field as FieldModel,
+    History as HistoryModel,
+    Schedule as ScheduleModel
+)
+from app.services.geo_bucket import location_bucket
+from app.services.upstream_guard import weather_upstream_guard
+from app.services.weather_service import get_history_weather_at, simplify_weather_description
+
+# 記録ジョブの実行間隔（分）。記録済みの日は取得しないため、失敗した日の再試行間隔になる
+DAILY_WEATHER_INTERVAL_MINUTES = int(os.getenv("DAILY_WEATHER_INTERVAL_MINUTES", "60"))
+# 何日前までの未記録の日を埋めるか（History APIで取得できる範囲内にする）
+DAILY_WEATHER_BACKFILL_DAYS = int(os.getenv("DAILY_WEATHER_BACKFILL_DAYS", "3"))
+# 1回の実行で呼び出すHistory APIの上限（1地点1日あたり8回）。ユーザーのリクエストと共有する
+# 呼び出し回数の予算（WEATHER_QUOTA_PER_MINUTE）を使い切らないよう、残りは次回以降の実行に回す
+DAILY_WEATHER_MAX_CALLS_PER_RUN = int(os.getenv("DAILY_WEATHER_MAX_CALLS_PER_RUN", "24"))
+# 雨の日とみなす降雨量（mm）
+DAILY_WEATHER_RAINY_MM = float(os.getenv("DAILY_WEATHER_RAINY_MM", "1.0"))
+# 1回の実行で地点バケットを紐づける履歴の最大件数
+DAILY_WEATHER_ATTACH_LIMIT = 1000
+
+# 実績を取得する時刻（/api/weatherのHistory API集計と同じ3時間ごと）と、天気・気温の代表時刻
+SLOT_HOURS = tuple(range(0, 24, 3))
+REPRESENTATIVE_HOUR = 12
+
+def history_weather_reference(
+    lat: Optional[float],
+    lon: Optional[float],
+    target_date: date
+) -> Tuple[Optional[str], date]:
+    """
+    履歴に保存する日別天気の参照キーを取得
+
+    Args:
+        lat: 畑の緯度
+        lon: 畑の経度
+        target_date: 当番日
+
+    Returns:
+        Tuple[Optional[str], date]: (地点バケットID（緯度経度が未取得ならNone）, 対象日)
+    """
+    if lat is None or lon is None:
+        return None, target_date
+    return location_bucket(lat, lon), target_date
+
+def partition_name(month_start: date) -> str:
+    """
+    月別パーティションのテーブル名を取得
+
+    Args:
+        month_start: 月の初日
+
+    Returns:
+        str: テーブル名（例: daily_weather_y2026m10）
+    """
+    return f"daily_weather_y{month_start.year}m{month_start.month:02d}"
+
+def ensure_partitions(db: Session, dates: Iterable[date]) -> None:
+    """
+    指定日を含む月のパーティションがなければ作成（PostgreSQL以外では何もしない）
+
+    Args:
+        db: データベースセッション
+        dates: 書き込む日付
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    months = sorted({d.replace(day=1) for d in dates})
+    for month_start in months:
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month_start)} PARTITION OF daily_weather "
+            f"FOR VALUES FROM ('{month_start.isoformat()}') TO ('{next_month.isoformat()}')"
+        ))
+
+def fetch_daily_weather(lat: float, lon: float, api_key: str, target_date: date) -> Optional[Dict[str, Any]]:
+    """
+    History APIから指定日の天気実績を取得
+    降雨量は3時間ごとの各時刻の1時間降雨量の合計（/api/weatherと同じ集計）、
+    天気・気温・湿度は12時の値
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        api_key: OpenWeatherMap APIキー
+        target_date: 対象日
+
+    Returns:
+        Optional[Dict[str, Any]]: weather・rain_mm・temperature・humidity、1時刻でも取得できなければNone
+    """
+    slots = {}
+    for hour in SLOT_HOURS:
+        timestamp = int(datetime.combine(target_date, time(hour)).timestamp())
+        hourly = get_history_weather_at(lat, lon, api_key, timestamp)
+        if hourly is None:
+            # 欠けた日は記録せず、次回の実行で取り直す
+            return None
+        slots[hour] = hourly
+
+    representative = slots[REPRESENTATIVE_HOUR]
+    description = (representative.get("weather") or [{}])[0].get("description")
+    return {
+        "weather": simplify_weather_description(description) if description else None,
+        "rain_mm": sum((hourly.get("rain") or {}).get("1h", 0.0) or 0.0 for hourly in slots.values()),
+        "temperature": representative.get("temp"),
+        "humidity": representative.get("humidity")
+    }
+
+def insert_daily_weather(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    日別天気を追記（記録済みの地点バケット・日付は上書きしない。コミットは呼び出し元で行う）
+
+    Args:
+        db: データベースセッション
+        rows: daily_weatherの列を持つ行の一覧
+    """
+    if not rows:
+        return
+    ensure_partitions(db, [row["date"] for row in rows])
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        db.execute(insert(DailyWeather).values(rows).on_conflict_do_nothing(
+            index_elements=[DailyWeather.bucket, DailyWeather.date]
+        ))
+        return
+
+    for row in rows:
+        if db.get(DailyWeather, (row["bucket"], row["date"])) is None:
+            db.add(DailyWeather(**row))
+
+def attach_histories(db: Session, limit: int = DAILY_WEATHER_ATTACH_LIMIT) -> int:
+    """
+    地点バケットが未設定の履歴に、畑の緯度経度から参照キーを設定（コミットは呼び出し元で行う）
+    作成時に畑の緯度経度が未取得だった履歴や、追加前からある履歴が対象
+
+    Args:
+        db: データベースセッション
+        limit: 1回で処理する最大件数
+
+    Returns:
+        int: 設定した履歴の件数
+    """
+    rows = db.query(HistoryModel, FieldModel.latitude, FieldModel.longitude, ScheduleModel.date).join(
+        ScheduleModel, ScheduleModel.id == HistoryModel.schedule_id
+    ).join(
+        FieldModel, FieldModel.id == ScheduleModel.field_id
+    ).filter(
+        HistoryModel.weather_bucket.is_(None),
+        FieldModel.latitude.isnot(None),
+        FieldModel.longitude.isnot(None)
+    ).order_by(HistoryModel.id).limit(limit).all()
+
+    for history, lat, lon, schedule_date in rows:
+        history.weather_bucket, weather_date = history_weather_reference(lat, lon, schedule_date)
+        if history.weather_date is None:
+            history.weather_date = weather_date
+    return len(rows)
+
+def record_daily_weather(backfill_days: int = None, max_calls: int = None) -> Dict[str, int]:
+    """
+    畑のある地点バケットごとに、前日からbackfill_days日前までの未記録の天気実績を記録（定期ジョブ）
+    上流APIを呼び出せない（遮断中・予算切れ）間や、1回の実行の呼び出し上限に達した場合は
+    取得を打ち切り、次回の実行で続きを取得する（新しい日から順に取得する）
+
+    Args:
+        backfill_days: 何日前まで埋めるか（省略時はDAILY_WEATHER_BACKFILL_DAYS）
+        max_calls: 1回の実行で呼び出すHistory APIの上限（省略時はDAILY_WEATHER_MAX_CALLS_PER_RUN）
+
+    Returns:
+        Dict[str, int]: 地点バケット数・記録数・取得失敗数・次回に回した件数・参照キーを設定した履歴数
+    """
+    if backfill_days is None:
+        backfill_days = DAILY_WEATHER_BACKFILL_DAYS
+    if max_calls is None:
+        max_calls = DAILY_WEATHER_MAX_CALLS_PER_RUN
+    api_key = os.environ.get("WEATHER_API_KEY")
+    today = datetime.now().date()
+    target_dates = [today - timedelta(days=offset) for offset in range(1, backfill_days + 1)]
+
+    db = SessionLocal()
+    try:
+        result = {"buckets": 0, "recorded": 0, "failed": 0, "deferred": 0, "attached": attach_histories(db)}
+        db.commit()
+        if not api_key or not target_dates:
+            return result
+
+        # 同じバケットに属する畑は1地点の取得でまとめて賄う
+        buckets = {}
+        for lat, lon in db.query(FieldModel.latitude, FieldModel.longitude).filter(
+            FieldModel.latitude.isnot(None),
+            FieldModel.longitude.isnot(None)
+        ).order_by(FieldModel.id):
+            buckets.setdefault(location_bucket(lat, lon), (lat, lon))
+        result["buckets"] = len(buckets)
+        if not buckets:
+            return result
+
+        recorded = set(db.query(DailyWeather.bucket, DailyWeather.date).filter(
+            DailyWeather.bucket.in_(list(buckets)),
+            DailyWeather.date.in_(target_dates)
+        ))
+
+        missing = [
+            (bucket, target_date, lat, lon)
+            for target_date in target_dates
+            for bucket, (lat, lon) in buckets.items()
+            if (bucket, target_date) not in recorded
+        ]
+        rows = []
+        calls = 0
+        for index, (bucket, target_date, lat, lon) in enumerate(missing):
+            if calls + len(SLOT_HOURS) > max_calls:
+                result["deferred"] = len(missing) - index
+                break
+            if not weather_upstream_guard.available("history"):
+                print("[daily_weather_service] 上流APIを呼び出せないため記録を中断します")
+                result["deferred"] = len(missing) - index
+                break
+            calls += len(SLOT_HOURS)
+            weather = fetch_daily_weather(lat, lon, api_key, target_date)
+            if weather is None:
+                result["failed"] += 1
+                continue
+            rows.append({"bucket": bucket, "date": target_date, "latitude": lat, "longitude": lon, **weather})
+
+        insert_daily_weather(db, rows)
+        db.commit()
+        result["recorded"] = len(rows)
+        return result
+    finally:
+        db.close()
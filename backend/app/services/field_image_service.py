@@ -0,0 +1,547 @@
+"""
+畑画像サービス
+畑の図面画像の保存と、一覧などで画像本体の代わりに返すメタデータ（URL・ETag・サイズ）を扱う
+アップロード時に形式を判定し、サイズ別のレンディション（サムネイル・中サイズ・原寸）をWebPで生成する
+画像本体はブロブストアに保存し、データベースにはキー（SHA-256）とメタデータのみ持つ
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import os
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from app.database import SessionLocal
+from app.models import Field as FieldModel, FieldImageRendition
+from app.services.blob_store import get_blob_store
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow未インストール環境
+    Image = None
+    ImageOps = None
+
+# 画像URLに付けるバージョン（SHA-256の先頭）の桁数
+IMAGE_VERSION_LENGTH = 16
+
+# バージョン付きURL（内容が変わるとURLも変わる）の画像は、ブラウザ・CDNに1年間キャッシュさせる
+IMAGE_CACHE_CONTROL_IMMUTABLE = "public, max-age=31536000, immutable"
+# バージョンなし（または古いバージョン）のURLは、毎回ETagで確認させる
+IMAGE_CACHE_CONTROL_REVALIDATE = "no-cache"
+
+# レンディションのサイズ
+SIZE_THUMBNAIL = "thumbnail"
+SIZE_MEDIUM = "medium"
+SIZE_ORIGINAL = "original"
+IMAGE_SIZES = (SIZE_THUMBNAIL, SIZE_MEDIUM, SIZE_ORIGINAL)
+
+# サムネイル・中サイズの長辺（px）とWebPの画質
+FIELD_IMAGE_THUMBNAIL_PX = int(os.getenv("FIELD_IMAGE_THUMBNAIL_PX", "256"))
+FIELD_IMAGE_MEDIUM_PX = int(os.getenv("FIELD_IMAGE_MEDIUM_PX", "1024"))
+FIELD_IMAGE_THUMBNAIL_QUALITY = int(os.getenv("FIELD_IMAGE_THUMBNAIL_QUALITY", "70"))
+FIELD_IMAGE_MEDIUM_QUALITY = int(os.getenv("FIELD_IMAGE_MEDIUM_QUALITY", "80"))
+# サムネイル・中サイズのWebPの圧縮の手間（0〜6。大きいほど小さくなるがエンコードが遅い）
+FIELD_IMAGE_WEBP_METHOD = int(os.getenv("FIELD_IMAGE_WEBP_METHOD", "4"))
+# サムネイルのサイズ上限（バイト）。超える場合は画質を下げて作り直す
+FIELD_IMAGE_THUMBNAIL_MAX_BYTES = int(os.getenv("FIELD_IMAGE_THUMBNAIL_MAX_BYTES", str(20 * 1024)))
+# 受け付ける画像の最大画素数（展開すると巨大になる画像を拒否する）
+FIELD_IMAGE_MAX_PIXELS = int(os.getenv("FIELD_IMAGE_MAX_PIXELS", str(50_000_000)))
+# 受け付ける画像の最大サイズ（バイト）
+FIELD_IMAGE_MAX_BYTES = int(os.getenv("FIELD_IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+# 同時にレンディションを生成する画像の数（画像の展開に使うメモリの上限になる）
+FIELD_IMAGE_PROCESSING_CONCURRENCY = int(os.getenv("FIELD_IMAGE_PROCESSING_CONCURRENCY", "2"))
+# 参照されなくなったブロブを削除するジョブの実行間隔（分）
+FIELD_IMAGE_BLOB_GC_INTERVAL_MINUTES = int(os.getenv("FIELD_IMAGE_BLOB_GC_INTERVAL_MINUTES", "1440"))
+# 保存から削除対象にするまでの猶予（分）。保存直後でまだコミットされていない画像を消さないため
+FIELD_IMAGE_BLOB_GC_GRACE_MINUTES = int(os.getenv("FIELD_IMAGE_BLOB_GC_GRACE_MINUTES", "60"))
+
+# サムネイルの画質を下げるときの刻みと下限
+_THUMBNAIL_QUALITY_STEP = 15
+_THUMBNAIL_MIN_QUALITY = 30
+# 原寸の可逆WebPの圧縮の手間（qualityとmethod）。最大にしてもサイズはほとんど変わらずエンコードが数倍遅くなる
+_ORIGINAL_LOSSLESS_QUALITY = 50
+_ORIGINAL_LOSSLESS_METHOD = 2
+# 原寸の非可逆WebP（元がJPEG）の画質
+_ORIGINAL_LOSSY_QUALITY = 90
+
+# 形式の判定に使う先頭のバイト数
+_SIGNATURE_BYTES = 12
+# Base64を少しずつデコードするときの1回分の文字数（4の倍数）
+_BASE64_CHUNK_CHARS = 64 * 1024
+
+_processing_semaphore = threading.BoundedSemaphore(FIELD_IMAGE_PROCESSING_CONCURRENCY)
+
+# 先頭バイトで判定する画像形式（Pillowがない環境でも判定できるようにする）
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+# Pillowの形式名とContent-Typeの対応
+_PIL_CONTENT_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "GIF": "image/gif",
+    "WEBP": "image/webp",
+}
+
+class ImageFormatError(ValueError):
+    """画像として扱えないデータがアップロードされた場合の例外"""
+
+class ImageTooLargeError(ValueError):
+    """画像が上限（FIELD_IMAGE_MAX_BYTES）より大きい場合の例外"""
+
+def detect_image_content_type(image_bytes: bytes) -> Optional[str]:
+    """
+    先頭バイトから画像のContent-Typeを判定
+
+    Args:
+        image_bytes: 画像バイナリ
+
+    Returns:
+        Optional[str]: Content-Type（PNG / JPEG / GIF / WebP）、判定できない場合はNone
+    """
+    for signature, content_type in _IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return content_type
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+def check_declared_content_type(content_type: Optional[str]) -> None:
+    """
+    クライアントが申告したContent-Typeを確認（本体を読む前に対応していない形式を拒否する）
+    申告がない場合やapplication/octet-streamの場合は、本体の先頭バイトで判定する
+
+    Args:
+        content_type: Content-Type（パラメータ付きでもよい）
+
+    Raises:
+        ImageFormatError: 対応していない形式の場合
+    """
+    if not content_type:
+        return
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type in ("", "application/octet-stream") or media_type in _PIL_CONTENT_TYPES.values():
+        return
+    raise ImageFormatError(f"対応していない画像形式です: {media_type}")
+
+def check_image_size(size: int) -> None:
+    """
+    画像のサイズが上限以下か確認
+
+    Args:
+        size: サイズ（バイト）
+
+    Raises:
+        ImageTooLargeError: 上限を超える場合
+    """
+    if size > FIELD_IMAGE_MAX_BYTES:
+        raise ImageTooLargeError(f"画像が大きすぎます（上限 {FIELD_IMAGE_MAX_BYTES} バイト）")
+
+def decode_base64_chunks(text: str) -> Iterator[bytes]:
+    """
+    Base64文字列を少しずつデコード（デコード後の画像全体をメモリに持たない）
+
+    Args:
+        text: Base64文字列
+
+    Returns:
+        Iterator[bytes]: デコードしたデータ
+
+    Raises:
+        ImageTooLargeError: デコード後のサイズが上限を超える場合（デコード前に判定する）
+        ImageFormatError: Base64として読み込めない場合
+    """
+    check_image_size(len(text) * 3 // 4 - text[-2:].count("="))
+    for start in range(0, len(text), _BASE64_CHUNK_CHARS):
+        try:
+            yield base64.b64decode(text[start:start + _BASE64_CHUNK_CHARS], validate=True)
+        except binascii.Error:
+            raise ImageFormatError("画像をBase64として読み込めません")
+
+class ImageUpload:
+    """
+    アップロードされた画像を少しずつ確認しながらブロブストアに書き込む
+
+    先頭バイトで形式を判定し、上限を超えた時点で書き込みを打ち切る（全体をメモリに溜めない）。
+    with文で使うと、例外で抜けたときに書きかけのデータを破棄する。
+    """
+
+    def __init__(self, content_type: Optional[str] = None):
+        """
+        Args:
+            content_type: クライアントが申告したContent-Type
+
+        Raises:
+            ImageFormatError: 申告された形式に対応していない場合
+        """
+        check_declared_content_type(content_type)
+        self._writer = get_blob_store().writer()
+        self._head = b""
+
+    @property
+    def size(self) -> int:
+        """これまでに書き込んだサイズ（バイト）"""
+        return self._writer.size
+
+    def write(self, chunk: bytes) -> None:
+        """
+        データを書き込む
+
+        Args:
+            chunk: 書き込むデータ
+
+        Raises:
+            ImageTooLargeError: 上限を超えた場合
+            ImageFormatError: 先頭バイトが対応している画像形式でない場合
+        """
+        if not chunk:
+            return
+        check_image_size(self._writer.size + len(chunk))
+        if len(self._head) < _SIGNATURE_BYTES:
+            self._head += chunk[:_SIGNATURE_BYTES - len(self._head)]
+            if len(self._head) >= _SIGNATURE_BYTES and detect_image_content_type(self._head) is None:
+                raise ImageFormatError("対応していない画像形式です")
+        self._writer.write(chunk)
+
+    def commit(self) -> Tuple[str, int]:
+        """
+        書き込んだ画像をブロブとして保存
+
+        Returns:
+            Tuple[str, int]: (ブロブのキー, サイズ)
+
+        Raises:
+            ImageFormatError: 空、または対応している画像形式でない場合
+        """
+        if self._writer.size == 0 or detect_image_content_type(self._head) is None:
+            raise ImageFormatError("対応していない画像形式です")
+        size = self._writer.size
+        return self._writer.commit(), size
+
+    def abort(self) -> None:
+        """書き込んだデータを破棄する（commit済みなら何もしない）"""
+        self._writer.abort()
+
+    def __enter__(self) -> "ImageUpload":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.abort()
+
+def _encode_webp(image: Any, quality: int, lossless: bool = False, method: int = FIELD_IMAGE_WEBP_METHOD) -> bytes:
+    """画像をWebPにエンコード（可逆の場合、qualityは圧縮の手間）"""
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=quality, lossless=lossless, method=method)
+    return buffer.getvalue()
+
+def _resized(image: Any, max_px: int) -> Any:
+    """長辺がmax_px以下になるよう縮小した画像を返す（元より大きくはしない）"""
+    if max(image.size) <= max_px:
+        return image
+    resized = image.copy()
+    resized.thumbnail((max_px, max_px), Image.LANCZOS)
+    return resized
+
+def _rendition(size: str, content_type: str, data: bytes, width: Optional[int], height: Optional[int]) -> Dict[str, Any]:
+    """レンディション1件分の列を作る"""
+    return {
+        "size": size,
+        "content_type": content_type,
+        "width": width,
+        "height": height,
+        "byte_size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "data": data
+    }
+
+def _source_rendition(
+    size: str,
+    content_type: str,
+    source_key: str,
+    source_size: int,
+    width: Optional[int],
+    height: Optional[int]
+) -> Dict[str, Any]:
+    """元の画像（保存済みのブロブ）をそのまま使うレンディション1件分の列を作る"""
+    return {
+        "size": size,
+        "content_type": content_type,
+        "width": width,
+        "height": height,
+        "byte_size": source_size,
+        "sha256": source_key,
+        "data": None
+    }
+
+def build_renditions(source: BinaryIO, source_key: str, source_size: int) -> List[Dict[str, Any]]:
+    """
+    画像からサイズ別のレンディションを生成
+    サムネイル・中サイズはWebP（非可逆）、原寸は可逆（JPEGは非可逆）のWebPにする。
+    アップロードのリクエスト内で生成するため、圧縮の手間は最大にせず速さを優先する。
+    原寸のWebPが元の画像より大きくなる場合は元の画像をそのまま使う。
+    Pillowがない環境では、形式の判定だけ行い原寸（元の画像）のみ返す。
+
+    Args:
+        source: 元の画像（読み込み用のファイルオブジェクト）
+        source_key: 元の画像のブロブのキー
+        source_size: 元の画像のサイズ（バイト）
+
+    Returns:
+        List[Dict[str, Any]]: field_image_renditionsの列を持つ行の一覧
+            （dataは保存するバイナリ。元の画像をそのまま使う場合はNone）
+
+    Raises:
+        ImageFormatError: 画像として読み込めない場合、または画素数が上限を超える場合
+    """
+    source_type = detect_image_content_type(source.read(_SIGNATURE_BYTES))
+    source.seek(0)
+    if Image is None:
+        if source_type is None:
+            raise ImageFormatError("対応していない画像形式です")
+        return [_source_rendition(SIZE_ORIGINAL, source_type, source_key, source_size, None, None)]
+
+    try:
+        with Image.open(source) as opened:
+            source_type = _PIL_CONTENT_TYPES.get(opened.format)
+            if source_type is None:
+                raise ImageFormatError(f"対応していない画像形式です: {opened.format}")
+            if opened.width * opened.height > FIELD_IMAGE_MAX_PIXELS:
+                raise ImageFormatError(f"画像の画素数が多すぎます: {opened.width}x{opened.height}")
+            # スマートフォンで撮影した画像の向きを反映し、アニメーションは先頭のフレームのみ使う
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+    except ImageFormatError:
+        raise
+    except Exception as e:
+        print(f"[field_image_service] 画像の読み込みに失敗: {e}")
+        raise ImageFormatError("画像を読み込めません")
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+    renditions = []
+    # サムネイルは中サイズから縮小する（原寸から縮小するより速い）
+    medium = _resized(image, FIELD_IMAGE_MEDIUM_PX)
+    thumbnail = _resized(medium, FIELD_IMAGE_THUMBNAIL_PX)
+    quality = FIELD_IMAGE_THUMBNAIL_QUALITY
+    data = _encode_webp(thumbnail, quality)
+    while len(data) > FIELD_IMAGE_THUMBNAIL_MAX_BYTES and quality > _THUMBNAIL_MIN_QUALITY:
+        quality = max(quality - _THUMBNAIL_QUALITY_STEP, _THUMBNAIL_MIN_QUALITY)
+        data = _encode_webp(thumbnail, quality)
+    renditions.append(_rendition(SIZE_THUMBNAIL, "image/webp", data, *thumbnail.size))
+
+    # 図面は線が多いため原寸は可逆で圧縮する（元が非可逆のJPEGは高画質の非可逆にする）
+    if source_type == "image/jpeg":
+        data = _encode_webp(image, _ORIGINAL_LOSSY_QUALITY)
+    else:
+        data = _encode_webp(image, _ORIGINAL_LOSSLESS_QUALITY, lossless=True, method=_ORIGINAL_LOSSLESS_METHOD)
+    if len(data) < source_size:
+        original = _rendition(SIZE_ORIGINAL, "image/webp", data, *image.size)
+    else:
+        original = _source_rendition(SIZE_ORIGINAL, source_type, source_key, source_size, *image.size)
+
+    data = _encode_webp(medium, FIELD_IMAGE_MEDIUM_QUALITY)
+    if medium is image and len(data) >= original["byte_size"]:
+        # 中サイズより小さい画像は、縮小しても原寸より小さくならなければ原寸と同じものを使う
+        renditions.append({**original, "size": SIZE_MEDIUM})
+    else:
+        renditions.append(_rendition(SIZE_MEDIUM, "image/webp", data, *medium.size))
+    renditions.append(original)
+    return renditions
+
+def apply_field_image(field: FieldModel, image_key: str, image_size: int) -> None:
+    """
+    ブロブストアに保存済みの画像を畑に設定し、レンディションを生成する（コミットは呼び出し元で行う）
+    レンディションの生成は同時にFIELD_IMAGE_PROCESSING_CONCURRENCY件までに制限する
+    （コミットされずに参照されなかったブロブは collect_unreferenced_blobs が削除する）
+
+    Args:
+        field: 畑
+        image_key: 画像のブロブのキー（ImageUpload.commit() の戻り値）
+        image_size: 画像のサイズ（バイト）
+
+    Raises:
+        ImageFormatError: 画像として扱えない場合（畑は変更しない）
+    """
+    store = get_blob_store()
+    with _processing_semaphore:
+        with store.open(image_key) as source:
+            renditions = build_renditions(source, image_key, image_size)
+    field.image_sha256 = image_key
+    field.image_size = image_size
+
+    # (field_id, size)は一意のため、既存の行は置き換えずに更新する
+    existing = {rendition.size: rendition for rendition in field.image_renditions}
+    current = []
+    for row in renditions:
+        rendition = existing.get(row["size"]) or FieldImageRendition(size=row["size"])
+        data = row.pop("data")
+        if data is not None:
+            store.put(data)
+        for key, value in row.items():
+            setattr(rendition, key, value)
+        current.append(rendition)
+    field.image_renditions = current
+
+def set_field_image(field: FieldModel, image_bytes: Optional[bytes]) -> None:
+    """
+    畑の画像を設定し、ハッシュ・サイズとレンディションも合わせて更新する（コミットは呼び出し元で行う）
+    メモリ上の画像を設定する場合に使う（アップロードは ImageUpload と apply_field_image で少しずつ保存する）
+
+    Args:
+        field: 畑
+        image_bytes: 画像バイナリ（Noneまたは空の場合は画像なし）
+
+    Raises:
+        ImageTooLargeError: 画像が上限より大きい場合
+        ImageFormatError: 画像として扱えない場合（畑は変更しない）
+    """
+    if not image_bytes:
+        field.image_sha256 = None
+        field.image_size = None
+        field.image_renditions = []
+        return
+    with ImageUpload() as upload:
+        upload.write(image_bytes)
+        image_key, image_size = upload.commit()
+    apply_field_image(field, image_key, image_size)
+
+def read_field_image(field: FieldModel) -> Optional[bytes]:
+    """
+    畑の画像（アップロードされた画像）をブロブストアから読み込む
+
+    Args:
+        field: 畑
+
+    Returns:
+        Optional[bytes]: 画像バイナリ、画像がない場合（ブロブが見つからない場合も含む）はNone
+    """
+    if not field.image_sha256:
+        return None
+    try:
+        return get_blob_store().read(field.image_sha256)
+    except FileNotFoundError:
+        print(f"[field_image_service] 畑 {field.id} の画像がブロブストアにありません: {field.image_sha256}")
+        return None
+
+def image_etag(image_sha256: Optional[str]) -> Optional[str]:
+    """
+    画像のETagを取得
+
+    Args:
+        image_sha256: 画像のSHA-256（16進）
+
+    Returns:
+        Optional[str]: ETag（引用符付き）、画像がない場合はNone
+    """
+    if not image_sha256:
+        return None
+    return f'"{image_sha256}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-MatchヘッダがETagに一致するか（弱い比較。W/付きや複数指定、*も扱う）
+
+    Args:
+        if_none_match: If-None-Matchヘッダの値
+        etag: 現在のETag（引用符付き）
+
+    Returns:
+        bool: 一致する場合はTrue（304を返してよい）
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def image_cache_control(version: Optional[str], image_sha256: Optional[str]) -> str:
+    """
+    画像レスポンスのCache-Controlを取得
+
+    Args:
+        version: URLのバージョン（?v=）
+        image_sha256: 畑の現在の画像のSHA-256
+
+    Returns:
+        str: URLのバージョンが現在の画像と一致すればimmutable、それ以外は毎回確認させる指定
+    """
+    if (
+        version
+        and image_sha256
+        and len(version) >= IMAGE_VERSION_LENGTH
+        and image_sha256.startswith(version)
+    ):
+        return IMAGE_CACHE_CONTROL_IMMUTABLE
+    return IMAGE_CACHE_CONTROL_REVALIDATE
+
+def image_metadata(field: FieldModel) -> Dict[str, Any]:
+    """
+    画像本体を読み込まずに、画像のURL・ETag・サイズを取得
+
+    Args:
+        field: 畑（imageは未読み込みでよい）
+
+    Returns:
+        Dict[str, Any]: image_url・thumbnail_url・image_etag・image_size（画像がない場合はすべてNone）
+    """
+    if not field.image_sha256:
+        return {"image_url": None, "thumbnail_url": None, "image_etag": None, "image_size": None}
+    # 画像が変わるとURLも変わるため、ブラウザのキャッシュが古い画像を返さない
+    image_url = f"/api/fields/{field.id}/image?v={field.image_sha256[:IMAGE_VERSION_LENGTH]}"
+    return {
+        "image_url": image_url,
+        "thumbnail_url": f"{image_url}&size={SIZE_THUMBNAIL}",
+        "image_etag": image_etag(field.image_sha256),
+        "image_size": field.image_size
+    }
+
+def collect_unreferenced_blobs(grace_minutes: int = None) -> Dict[str, int]:
+    """
+    畑・レンディションのどちらからも参照されていないブロブを削除（定期ジョブ）
+    保存からgrace_minutes分以内のブロブは、コミット前の画像の可能性があるため残す
+    書き込み途中のまま残った一時ファイルも、最後の書き込みからgrace_minutes分を過ぎたものは削除する
+
+    Args:
+        grace_minutes: 削除対象にするまでの猶予（分、省略時はFIELD_IMAGE_BLOB_GC_GRACE_MINUTES）
+
+    Returns:
+        Dict[str, int]: ブロブ数・削除数・削除した一時ファイル数
+    """
+    if grace_minutes is None:
+        grace_minutes = FIELD_IMAGE_BLOB_GC_GRACE_MINUTES
+    store = get_blob_store()
+    db = SessionLocal()
+    try:
+        # 参照の一覧を先に取るため、その後に保存されたブロブは猶予で守られる
+        referenced = {key for key, in db.query(FieldModel.image_sha256).filter(FieldModel.image_sha256.isnot(None))}
+        referenced.update(key for key, in db.query(FieldImageRendition.sha256))
+    finally:
+        db.close()
+
+    threshold = time.time() - grace_minutes * 60
+    result = {"blobs": 0, "deleted": 0, "temporary_deleted": store.delete_temporary_files(threshold)}
+    for key, modified_at in store.list_blobs():
+        result["blobs"] += 1
+        if key in referenced or modified_at > threshold:
+            continue
+        store.delete(key)
+        result["deleted"] += 1
+    if result["deleted"]:
+        print(f"[field_image_service] 参照されていないブロブを{result['deleted']}件削除しました")
+    if result["temporary_deleted"]:
+        print(f"[field_image_service] 書き込み途中の一時ファイルを{result['temporary_deleted']}件削除しました")
+    return result
@@ -0,0 +1,156 @@
+"""
+予報データの列指向表現
+5日間3時間ごとの予報データ（dictの一覧）を1回だけ解析し、時刻・降雨量・降水確率を
+列ごとの配列に持つ。日別の集計は時刻の二分探索と配列のスライスで行い、予報一覧を再走査しない
+"""
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Union
+
+# dt_txt（タイムゾーンなし）を秒に変換する基準時刻
+_EPOCH = datetime(1970, 1, 1)
+
+def _to_seconds(moment: datetime) -> float:
+    """タイムゾーンなしの日時を基準時刻からの秒数に変換"""
+    return (moment - _EPOCH).total_seconds()
+
+class ForecastFrame:
+    """
+    予報データの列指向表現
+
+    各列は予報時刻の昇順に並んだ同じ長さの配列。
+    timestamps: 予報時刻（dt_txtを基準時刻からの秒数にしたもの）
+    day_ordinals: 予報日（date.toordinal()）
+    rain_3h: 3時間降雨量（mm）
+    pop: 降水確率（0-1）
+    items: 元の予報データ（天気説明・気温などの代表値の取得用）
+    """
+
+    __slots__ = ("timestamps", "day_ordinals", "rain_3h", "pop", "items")
+
+    def __init__(self, forecast_data: Optional[List[dict]]):
+        """
+        Args:
+            forecast_data: 予報データ一覧（get_weather_forecast_by_latlonの戻り値）
+        """
+        rows = []
+        for item in forecast_data or []:
+            dt_txt = item.get("dt_txt")
+            if not dt_txt:
+                continue
+            try:
+                forecast_time = datetime.fromisoformat(dt_txt)
+            except ValueError:
+                continue
+            rows.append((forecast_time, item))
+        rows.sort(key=lambda row: row[0])
+
+        self.timestamps = array("d", (_to_seconds(forecast_time) for forecast_time, _ in rows))
+        self.day_ordinals = array("l", (forecast_time.toordinal() for forecast_time, _ in rows))
+        self.rain_3h = array("d", ((item.get("rain") or {}).get("3h", 0.0) or 0.0 for _, item in rows))
+        self.pop = array("d", (item.get("pop", 0.0) or 0.0 for _, item in rows))
+        self.items = [item for _, item in rows]
+
+    @classmethod
+    def of(cls, forecast_data: Union["ForecastFrame", List[dict], None]) -> "ForecastFrame":
+        """
+        予報データを列指向表現にする（既に変換済みの場合はそのまま返す）
+
+        Args:
+            forecast_data: 予報データ一覧またはForecastFrame
+
+        Returns:
+            ForecastFrame: 列指向表現
+        """
+        if isinstance(forecast_data, cls):
+            return forecast_data
+        return cls(forecast_data)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def day_range(self, target_date: date) -> range:
+        """
+        指定日の予報枠のインデックス範囲を取得
+
+        Args:
+            target_date: 対象日
+
+        Returns:
+            range: 予報枠のインデックス範囲（該当なしの場合は空）
+        """
+        ordinal = target_date.toordinal()
+        return range(bisect_left(self.day_ordinals, ordinal), bisect_right(self.day_ordinals, ordinal))
+
+    def daily_rainfall(
+        self,
+        target_date: date,
+        after: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> float:
+        """
+        指定日の3時間降雨量を合計
+
+        Args:
+            target_date: 対象日
+            after: 指定時刻より後（この時刻を含まない）の予報のみ集計
+            until: 指定時刻まで（この時刻を含む）の予報のみ集計
+
+        Returns:
+            float: 累積降雨量（mm）
+        """
+        day = self.day_range(target_date)
+        start, stop = day.start, day.stop
+        if after is not None:
+            start = max(start, bisect_right(self.timestamps, _to_seconds(after)))
+        if until is not None:
+            stop = min(stop, bisect_right(self.timestamps, _to_seconds(until)))
+        if start >= stop:
+            return 0.0
+        return math.fsum(self.rain_3h[start:stop])
+
+    def first_pop(self, target_date: date) -> float:
+        """
+        指定日の最初の予報枠の降水確率を取得
+
+        Args:
+            target_date: 対象日
+
+        Returns:
+            float: 降水確率（%）、該当データがない場合は0.0
+        """
+        day = self.day_range(target_date)
+        if not day:
+            return 0.0
+        return self.pop[day.start] * 100
+
+    def daily_summaries(self, days: int, start_date: date) -> List[Dict[str, Any]]:
+        """
+        日別の集計値を取得
+        降雨量はその日の合計、降水確率はその日の最大値、代表値は12時に最も近い予報枠
+
+        Args:
+            days: 最大日数
+            start_date: この日以降の予報のみ対象
+
+        Returns:
+            List[Dict[str, Any]]: 日付・降雨量（mm）・降水確率（%）・代表予報枠の元データの一覧
+        """
+        summaries = []
+        index = bisect_left(self.day_ordinals, start_date.toordinal())
+        while index < len(self) and len(summaries) < days:
+            ordinal = self.day_ordinals[index]
+            stop = bisect_right(self.day_ordinals, ordinal, index)
+            noon = _to_seconds(datetime.combine(date.fromordinal(ordinal), datetime.min.time())) + 12 * 3600
+            representative = min(range(index, stop), key=lambda i: abs(self.timestamps[i] - noon))
+            summaries.append({
+                "date": date.fromordinal(ordinal),
+                "rain_mm": math.fsum(self.rain_3h[index:stop]),
+                "pop": max(self.pop[index:stop]) * 100,
+                "item": self.items[representative]
+            })
+            index = stop
+        return summaries
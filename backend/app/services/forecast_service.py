@@ -0,0 +1,112 @@
+"""
+天気予報サービス
+地点ごとの予報データ（5日間3時間ごと）をweather_cacheに1件だけキャッシュし、
+そこから日別の予報一覧を組み立てる
+"""
+
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from app.services.forecast_frame import ForecastFrame
+from app.services.weather_service import get_weather_forecast_by_latlon, simplify_weather_description
+from app.services.weather_cache_service import (
+    get_or_fetch_weather,
+    WEATHER_FORECAST_CACHE_MINUTES,
+    WEATHER_FORECAST_STALE_TTL_MINUTES
+)
+
+# 予報データのキャッシュキーの日付部分（日付ごとではなく地点ごとに1件）
+FORECAST_CACHE_DATE = "forecast"
+
+def fetch_forecast_payload(lat: float, lon: float, api_key: str) -> Optional[Dict[str, Any]]:
+    """
+    予報データを取得してキャッシュ用の形式にする
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        api_key: OpenWeatherMap APIキー
+
+    Returns:
+        Optional[Dict[str, Any]]: {"list": 予報データ一覧}、取得失敗時はNone
+    """
+    forecast_list = get_weather_forecast_by_latlon(lat, lon, api_key)
+    if not forecast_list:
+        return None
+    return {"list": forecast_list}
+
+def get_or_fetch_forecast(
+    db: Session,
+    lat: float,
+    lon: float,
+    api_key: str,
+    schedule_refresh: Optional[Callable[..., Any]] = None
+) -> Optional[List[dict]]:
+    """
+    地点の予報データをキャッシュから取得し、なければ上流から取得して保存
+    キャッシュ期間は天気情報とは別（WEATHER_FORECAST_CACHE_MINUTES）で、期限切れ後も
+    WEATHER_FORECAST_STALE_TTL_MINUTESまでは古いデータを返してバックグラウンドで更新する
+
+    Args:
+        db: データベースセッション
+        lat: 緯度
+        lon: 経度
+        api_key: OpenWeatherMap APIキー
+        schedule_refresh: バックグラウンド更新の登録関数（BackgroundTasks.add_taskなど）
+
+    Returns:
+        Optional[List[dict]]: 予報データ一覧、取得失敗時はNone
+    """
+    payload = get_or_fetch_weather(
+        db,
+        lat,
+        lon,
+        FORECAST_CACHE_DATE,
+        lambda: fetch_forecast_payload(lat, lon, api_key),
+        cache_duration_minutes=WEATHER_FORECAST_CACHE_MINUTES,
+        stale_ttl_minutes=WEATHER_FORECAST_STALE_TTL_MINUTES,
+        schedule_refresh=schedule_refresh
+    )
+    if payload is None:
+        return None
+    return payload.get("list", [])
+
+def build_daily_forecast(
+    forecast_data: Union[ForecastFrame, List[dict], None],
+    days: int,
+    start_date: Optional[date] = None
+) -> List[Dict[str, Any]]:
+    """
+    予報データから日別の予報一覧を組み立てる
+    降雨量はその日の3時間降雨量の合計、降水確率はその日の最大値、
+    天気・気温・湿度・アイコンは12時に最も近い予報枠の値を使う
+
+    Args:
+        forecast_data: 予報データ一覧またはForecastFrame
+        days: 最大日数
+        start_date: この日以降の予報のみ対象（デフォルトは今日）
+
+    Returns:
+        List[Dict[str, Any]]: 日別の予報（/api/weatherのレスポンス形式）の一覧
+    """
+    if not forecast_data:
+        return []
+    if start_date is None:
+        start_date = datetime.now().date()
+
+    result = []
+    for summary in ForecastFrame.of(forecast_data).daily_summaries(days, start_date):
+        representative = summary["item"]
+        weather_raw = representative.get("weather", [{}])[0].get("description", "不明")
+        result.append({
+            "date": summary["date"].isoformat(),
+            "weather": simplify_weather_description(weather_raw),
+            "rain_mm": summary["rain_mm"],
+            "pop": summary["pop"],
+            "temperature": representative.get("main", {}).get("temp"),
+            "humidity": representative.get("main", {}).get("humidity"),
+            "icon": representative.get("weather", [{}])[0].get("icon")
+        })
+    return result
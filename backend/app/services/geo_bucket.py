@@ -0,0 +1,123 @@
+"""
+位置情報のバケット化
+近接する地点を同じ区画にまとめ、天気キャッシュを共有できるようにする
+"""
+
+import math
+import os
+from typing import Tuple
+
+# バケット化の方式
+# grid: 緯度経度を一定間隔（度）の格子に丸める
+# geohash: 指定桁数のgeohashでまとめる
+# none: バケット化しない（緯度経度そのままをキーにする）
+WEATHER_CACHE_BUCKET_MODE = os.getenv("WEATHER_CACHE_BUCKET_MODE", "grid")
+# grid方式の格子間隔（度）。0.01度は緯度方向で約1.1km
+WEATHER_CACHE_GRID_DEGREES = float(os.getenv("WEATHER_CACHE_GRID_DEGREES", "0.01"))
+# geohash方式の桁数。6桁で約1.2km×0.6km
+WEATHER_CACHE_GEOHASH_PRECISION = int(os.getenv("WEATHER_CACHE_GEOHASH_PRECISION", "6"))
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def encode_geohash(lat: float, lon: float, precision: int) -> str:
+    """
+    緯度経度をgeohash文字列に変換
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        precision: geohashの桁数
+
+    Returns:
+        str: geohash文字列
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        # 経度と緯度を交互に二分する
+        value, value_range = (lon, lon_range) if even else (lat, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits = bits << 1
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+def grid_cell(lat: float, lon: float, degrees: float) -> Tuple[int, int]:
+    """
+    緯度経度が属する格子のインデックスを取得
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        degrees: 格子間隔（度）
+
+    Returns:
+        Tuple[int, int]: (緯度方向のインデックス, 経度方向のインデックス)
+    """
+    # 浮動小数点の表現誤差で境界上の値が隣の格子に落ちないよう、わずかに丸めてから切り捨てる
+    return (
+        math.floor(round(lat / degrees, 9)),
+        math.floor(round(lon / degrees, 9))
+    )
+
+def location_bucket(
+    lat: float,
+    lon: float,
+    mode: str = None,
+    grid_degrees: float = None,
+    geohash_precision: int = None
+) -> str:
+    """
+    緯度経度からバケットIDを生成
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        mode: バケット化の方式（省略時はWEATHER_CACHE_BUCKET_MODE）
+        grid_degrees: grid方式の格子間隔（省略時はWEATHER_CACHE_GRID_DEGREES）
+        geohash_precision: geohash方式の桁数（省略時はWEATHER_CACHE_GEOHASH_PRECISION）
+
+    Returns:
+        str: バケットID（例: "g0.01:3568:13976", "gh:xn76ur", "35.6812_139.7671"）
+    """
+    mode = mode or WEATHER_CACHE_BUCKET_MODE
+    if mode == "grid":
+        degrees = grid_degrees or WEATHER_CACHE_GRID_DEGREES
+        lat_index, lon_index = grid_cell(lat, lon, degrees)
+        return f"g{degrees:g}:{lat_index}:{lon_index}"
+    if mode == "geohash":
+        precision = geohash_precision or WEATHER_CACHE_GEOHASH_PRECISION
+        return f"gh:{encode_geohash(lat, lon, precision)}"
+    return f"{lat}_{lon}"
+
+def bucket_label(mode: str = None, grid_degrees: float = None, geohash_precision: int = None) -> str:
+    """
+    バケット化の設定を表すラベルを取得（統計情報の集計キー）
+
+    Args:
+        mode: バケット化の方式（省略時はWEATHER_CACHE_BUCKET_MODE）
+        grid_degrees: grid方式の格子間隔
+        geohash_precision: geohash方式の桁数
+
+    Returns:
+        str: ラベル（例: "grid:0.01", "geohash:6", "none"）
+    """
+    mode = mode or WEATHER_CACHE_BUCKET_MODE
+    if mode == "grid":
+        return f"grid:{(grid_degrees or WEATHER_CACHE_GRID_DEGREES):g}"
+    if mode == "geohash":
+        return f"geohash:{geohash_precision or WEATHER_CACHE_GEOHASH_PRECISION}"
+    return "none"
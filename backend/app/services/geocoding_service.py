@@ -0,0 +1,384 @@
+"""
+ジオコーディングサービス
+住所から緯度経度を取得する（Nominatim）。結果はgeocode_cacheテーブルにキャッシュし、
+Nominatimの利用規約（1リクエスト/秒）を守るため上流への問い合わせは順番に間隔を空けて行う
+"""
+
+import os
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core.http_client import get_http_client
+from app.database import SessionLocal
+from app.models import GeocodeCache, Field as FieldModel, GeocodeStatus
+
+NOMINATIM_SEARCH_URL = "https://nominatim.openstreetmap.org/search"
+GEOCODE_USER_AGENT = os.getenv("GEOCODE_USER_AGENT", "mizukake-toban-app")
+# Nominatimへの問い合わせの最小間隔（秒）。利用規約の上限は1リクエスト/秒
+GEOCODE_MIN_INTERVAL_SECONDS = float(os.getenv("GEOCODE_MIN_INTERVAL_SECONDS", "1.0"))
+# Nominatimへの問い合わせのタイムアウト（秒）
+GEOCODE_TIMEOUT_SECONDS = float(os.getenv("GEOCODE_TIMEOUT_SECONDS", "5"))
+# APIリクエスト処理中の問い合わせで、順番待ちを諦めるまでの時間（秒）
+GEOCODE_REQUEST_MAX_WAIT_SECONDS = float(os.getenv("GEOCODE_REQUEST_MAX_WAIT_SECONDS", "3"))
+# 住所が見つからなかった結果をキャッシュする期間（時間）
+GEOCODE_NOT_FOUND_TTL_HOURS = int(os.getenv("GEOCODE_NOT_FOUND_TTL_HOURS", "24"))
+# 畑の緯度経度変換の最大試行回数と、再試行までの待ち時間の基準（秒、試行ごとに倍増）
+GEOCODE_MAX_ATTEMPTS = int(os.getenv("GEOCODE_MAX_ATTEMPTS", "3"))
+GEOCODE_RETRY_BACKOFF_SECONDS = float(os.getenv("GEOCODE_RETRY_BACKOFF_SECONDS", "5"))
+# 変換待ちのまま残った畑（再起動でバックグラウンド処理が失われた場合など）を拾う定期ジョブの間隔（分）
+GEOCODE_PENDING_INTERVAL_MINUTES = int(os.getenv("GEOCODE_PENDING_INTERVAL_MINUTES", "10"))
+# 作成・更新直後の畑はバックグラウンド処理に任せ、定期ジョブでは拾わない（分）
+GEOCODE_PENDING_GRACE_MINUTES = 5
+
+Coordinates = Tuple[Optional[float], Optional[float]]
+
+# 畑の緯度経度変換を実行するスレッド（Nominatimへの問い合わせは順番に行うため1つで足りる）
+# 上流の順番待ちや再試行の待ち時間で、リクエスト処理のスレッドプールを塞がないようにする
+_geocode_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geocode")
+# 変換を登録済み（実行待ち・再試行待ちを含む）の畑ID
+_queued_field_ids = set()
+_queued_field_ids_lock = threading.Lock()
+
+class RateLimiter:
+    """
+    呼び出し元を到着順に最小間隔を空けて通すレート制限（プロセス内・スレッド間）
+
+    各呼び出しは次に空いている時刻の枠を予約し、その時刻まで待ってから処理を行う。
+    複数ワーカーで動かす場合はワーカーごとに制限されるため、間隔をワーカー数倍に設定すること。
+    """
+
+    def __init__(self, min_interval_seconds: float):
+        """
+        Args:
+            min_interval_seconds: 呼び出しの最小間隔（秒）
+        """
+        self.min_interval_seconds = min_interval_seconds
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self, max_wait_seconds: Optional[float] = None) -> bool:
+        """
+        次の枠まで待機する
+
+        Args:
+            max_wait_seconds: 待機時間の上限（秒）。超える場合は枠を予約せずに諦める
+
+        Returns:
+            bool: 枠を確保できた場合True、待機時間の上限を超える場合False
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            wait_seconds = slot - now
+            if max_wait_seconds is not None and wait_seconds > max_wait_seconds:
+                return False
+            self._next_slot = slot + self.min_interval_seconds
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+        return True
+
+nominatim_rate_limiter = RateLimiter(GEOCODE_MIN_INTERVAL_SECONDS)
+
+def normalize_address(address: str) -> str:
+    """
+    住所をキャッシュキー用に正規化
+    全角・半角の揺れ（NFKC）と空白の揺れをそろえ、英字は小文字にする
+
+    Args:
+        address: 住所文字列
+
+    Returns:
+        str: 正規化した住所
+    """
+    normalized = unicodedata.normalize("NFKC", address or "")
+    return " ".join(normalized.split()).lower()[:255]
+
+def _query_nominatim(address: str) -> Optional[Tuple[float, float]]:
+    """
+    Nominatimに住所を問い合わせる（レート制限は呼び出し元で行う）
+    HTTPクライアントの再試行を使うと1つの枠で複数回問い合わせてしまうため、再試行はしない
+    （失敗した場合の再試行は geocode_field が間隔を空けて行う）
+
+    Args:
+        address: 住所文字列
+
+    Returns:
+        Optional[Tuple[float, float]]: (緯度, 経度)、住所が見つからない場合はNone
+
+    Raises:
+        通信エラー・応答異常の場合はrequestsの例外を送出する
+    """
+    resp = get_http_client().get(
+        NOMINATIM_SEARCH_URL,
+        params={"format": "json", "q": address, "limit": 1},
+        headers={"User-Agent": GEOCODE_USER_AGENT},
+        timeout=GEOCODE_TIMEOUT_SECONDS,
+        retry=False
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    if data:
+        return float(data[0]["lat"]), float(data[0]["lon"])
+    return None
+
+def _lookup_cache(db: Session, address_keys: List[str]) -> Dict[str, Coordinates]:
+    """
+    キャッシュから住所の緯度経度を一括取得（期限切れの「見つからない」結果は除く）
+
+    Args:
+        db: データベースセッション
+        address_keys: 正規化した住所の一覧
+
+    Returns:
+        Dict[str, Coordinates]: 住所ごとの(緯度, 経度)、見つからない住所は(None, None)
+    """
+    if not address_keys:
+        return {}
+    not_found_cutoff = datetime.now(timezone.utc) - timedelta(hours=GEOCODE_NOT_FOUND_TTL_HOURS)
+    records = db.query(GeocodeCache).filter(
+        GeocodeCache.address_key.in_(address_keys),
+        or_(GeocodeCache.latitude.isnot(None), GeocodeCache.created_at >= not_found_cutoff)
+    ).all()
+    return {record.address_key: (record.latitude, record.longitude) for record in records}
+
+def _store_cache(db: Session, address_key: str, coordinates: Optional[Tuple[float, float]]) -> None:
+    """
+    住所の緯度経度をキャッシュにupsert（コミットは呼び出し元で行う）
+
+    Args:
+        db: データベースセッション
+        address_key: 正規化した住所
+        coordinates: (緯度, 経度)、住所が見つからなかった場合はNone
+    """
+    lat, lon = coordinates or (None, None)
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        stmt = insert(GeocodeCache).values(address_key=address_key, latitude=lat, longitude=lon)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[GeocodeCache.address_key],
+            set_={
+                "latitude": stmt.excluded.latitude,
+                "longitude": stmt.excluded.longitude,
+                # 「見つからない」結果の期限判定はcreated_atで行うため、更新時も問い合わせ時刻に揃える
+                "created_at": func.now(),
+                "updated_at": func.now()
+            }
+        )
+        db.execute(stmt)
+        return
+
+    record = db.query(GeocodeCache).filter(GeocodeCache.address_key == address_key).first()
+    if record is None:
+        db.add(GeocodeCache(address_key=address_key, latitude=lat, longitude=lon))
+    else:
+        record.latitude = lat
+        record.longitude = lon
+        record.created_at = func.now()
+
+def _resolve(db: Session, address: str, address_key: str, max_wait_seconds: Optional[float]) -> Coordinates:
+    """
+    キャッシュにない住所をレート制限付きでNominatimに問い合わせ、結果をキャッシュに保存
+
+    Args:
+        db: データベースセッション
+        address: 住所文字列
+        address_key: 正規化した住所
+        max_wait_seconds: 順番待ちの上限（秒）、Noneの場合は枠が空くまで待つ
+
+    Returns:
+        Coordinates: (緯度, 経度)、取得失敗時は(None, None)
+    """
+    if not nominatim_rate_limiter.acquire(max_wait_seconds):
+        print(f"[geocoding_service] 順番待ちが上限を超えたため問い合わせを見送りました: {address}")
+        return None, None
+    try:
+        coordinates = _query_nominatim(address)
+    except Exception as e:
+        # 通信エラーは一時的な可能性があるためキャッシュしない
+        print(f"[geocoding_service] 住所→緯度経度変換失敗: {address}: {e}")
+        return None, None
+
+    if coordinates is None:
+        print(f"[geocoding_service] 住所が見つかりませんでした: {address}")
+    _store_cache(db, address_key, coordinates)
+    db.commit()
+    return coordinates or (None, None)
+
+def geocode_address(address: str, max_wait_seconds: Optional[float] = None) -> Coordinates:
+    """
+    住所から緯度経度を取得（キャッシュ優先）
+    リクエストのセッションとは別の専用セッションでキャッシュを読み書きする
+
+    Args:
+        address: 住所文字列
+        max_wait_seconds: Nominatimの順番待ちの上限（秒）、Noneの場合は枠が空くまで待つ
+
+    Returns:
+        Coordinates: (緯度, 経度)、取得失敗時は(None, None)
+    """
+    address_key = normalize_address(address)
+    if not address_key:
+        return None, None
+
+    db = SessionLocal()
+    try:
+        cached = _lookup_cache(db, [address_key])
+        if address_key in cached:
+            return cached[address_key]
+        return _resolve(db, address, address_key, max_wait_seconds)
+    finally:
+        db.close()
+
+def geocode_addresses(addresses: Iterable[str]) -> Dict[str, Coordinates]:
+    """
+    複数の住所の緯度経度を一括取得（一括登録・バックフィル用）
+    キャッシュは1回のSELECTでまとめて参照し、キャッシュにない住所だけを1件ずつ問い合わせる
+
+    Args:
+        addresses: 住所文字列の一覧
+
+    Returns:
+        Dict[str, Coordinates]: 入力した住所ごとの(緯度, 経度)、取得失敗時は(None, None)
+    """
+    keys_by_address = {address: normalize_address(address) for address in addresses}
+
+    db = SessionLocal()
+    try:
+        resolved = _lookup_cache(db, sorted({key for key in keys_by_address.values() if key}))
+        results = {}
+        for address, address_key in keys_by_address.items():
+            if not address_key:
+                results[address] = (None, None)
+                continue
+            if address_key not in resolved:
+                resolved[address_key] = _resolve(db, address, address_key, None)
+            results[address] = resolved[address_key]
+        return results
+    finally:
+        db.close()
+
+def geocode_field(field_id: int, attempt: int = 1, max_attempts: Optional[int] = None) -> Optional[GeocodeStatus]:
+    """
+    変換待ちの畑の住所から緯度経度を1回取得して保存
+    取得できなかった場合、最後の試行なら変換失敗にし、試行回数が残っていれば変換待ちのままにする
+    （再試行は enqueue_geocode_field が間隔を空けて登録する）
+    処理中に住所が変更された場合は結果を保存しない
+
+    Args:
+        field_id: 畑ID
+        attempt: 何回目の試行か（1から）
+        max_attempts: 最大試行回数（省略時はGEOCODE_MAX_ATTEMPTS）
+
+    Returns:
+        Optional[GeocodeStatus]: 保存した状態（変換待ちのままにした場合はPENDING）、対象外または保存しなかった場合はNone
+    """
+    if max_attempts is None:
+        max_attempts = GEOCODE_MAX_ATTEMPTS
+
+    db = SessionLocal()
+    try:
+        field = db.query(FieldModel).filter(FieldModel.id == field_id).first()
+        if field is None or field.geocode_status != GeocodeStatus.PENDING:
+            return None
+        address = field.location_text
+        # 上流の待ち時間中にトランザクションを開いたままにしない
+        db.rollback()
+
+        lat, lon = geocode_address(address)
+        if lat is None or lon is None:
+            if attempt < max_attempts:
+                return GeocodeStatus.PENDING
+            status = GeocodeStatus.FAILED
+        else:
+            status = GeocodeStatus.DONE
+        updated = db.query(FieldModel).filter(
+            FieldModel.id == field_id,
+            FieldModel.location_text == address,
+            FieldModel.geocode_status == GeocodeStatus.PENDING
+        ).update(
+            {"latitude": lat, "longitude": lon, "geocode_status": status},
+            synchronize_session=False
+        )
+        db.commit()
+        if not updated:
+            return None
+        if status == GeocodeStatus.FAILED:
+            print(f"[geocoding_service] 畑 {field_id} の緯度経度を取得できませんでした: {address}")
+        return status
+    finally:
+        db.close()
+
+def enqueue_geocode_field(field_id: int) -> bool:
+    """
+    畑の緯度経度変換を専用スレッドに登録（畑の作成・更新後や定期ジョブから呼ぶ）
+    取得できなかった場合は、スレッドを待たせずにタイマーで間隔を空けて登録し直す
+    （待ち時間は試行ごとに倍増、最大GEOCODE_MAX_ATTEMPTS回）
+
+    Args:
+        field_id: 畑ID
+
+    Returns:
+        bool: 登録した場合はTrue、登録済み（実行待ち・再試行待ち）の場合はFalse
+    """
+    with _queued_field_ids_lock:
+        if field_id in _queued_field_ids:
+            return False
+        _queued_field_ids.add(field_id)
+    _geocode_executor.submit(_run_geocode_job, field_id, 1)
+    return True
+
+def _run_geocode_job(field_id: int, attempt: int) -> None:
+    """畑の緯度経度変換を1回試行し、変換待ちのままなら再試行を予約する（専用スレッドで実行）"""
+    try:
+        status = geocode_field(field_id, attempt)
+    except Exception as e:
+        print(f"[geocoding_service] 畑 {field_id} の緯度経度変換でエラー: {e}")
+        status = None
+    if status != GeocodeStatus.PENDING:
+        with _queued_field_ids_lock:
+            _queued_field_ids.discard(field_id)
+        return
+
+    delay_seconds = GEOCODE_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+    timer = threading.Timer(delay_seconds, _geocode_executor.submit, (_run_geocode_job, field_id, attempt + 1))
+    timer.daemon = True
+    timer.start()
+
+def geocode_pending_fields(limit: int = 100) -> Dict[str, int]:
+    """
+    変換待ちのまま残っている畑の緯度経度変換を登録（定期ジョブ）
+
+    Args:
+        limit: 1回の実行で登録する畑の最大件数
+
+    Returns:
+        Dict[str, int]: 対象件数・新たに登録した件数
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=GEOCODE_PENDING_GRACE_MINUTES)
+    db = SessionLocal()
+    try:
+        field_ids = [
+            field_id for (field_id,) in db.query(FieldModel.id).filter(
+                FieldModel.geocode_status == GeocodeStatus.PENDING,
+                func.coalesce(FieldModel.updated_at, FieldModel.created_at) < cutoff
+            ).order_by(FieldModel.id).limit(limit)
+        ]
+    finally:
+        db.close()
+
+    queued = sum(1 for field_id in field_ids if enqueue_geocode_field(field_id))
+    return {"fields": len(field_ids), "queued": queued}
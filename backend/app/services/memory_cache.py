@@ -0,0 +1,113 @@
+"""
+インメモリキャッシュ
+プロセス内で使用する、サイズ上限付きLRU + エントリ単位TTLのキャッシュ
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+class TTLLRUCache:
+    """
+    サイズ上限付きのLRUキャッシュ（エントリごとに有効期限を持つ）
+
+    複数スレッドから同時に利用できるよう、すべての操作はロックで保護する。
+    保持する値はキャッシュ利用側で変更しないこと（コピーは行わない）。
+    """
+
+    def __init__(self, max_size: int = 1024, default_ttl_seconds: float = 900):
+        """
+        Args:
+            max_size: 最大エントリ数（超過時は最も古く参照されたものから削除）
+            default_ttl_seconds: set時にTTLを省略した場合の有効期間（秒）
+        """
+        self.max_size = max_size
+        self.default_ttl_seconds = default_ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        キャッシュから値を取得
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            Optional[Any]: キャッシュされた値、存在しないか期限切れの場合はNone
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """
+        キャッシュに値を保存
+
+        Args:
+            key: キャッシュキー
+            value: 保存する値
+            ttl_seconds: 有効期間（秒）、省略時はdefault_ttl_seconds
+        """
+        if ttl_seconds is None:
+            ttl_seconds = self.default_ttl_seconds
+        if ttl_seconds <= 0 or self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """
+        キャッシュから値を削除
+
+        Args:
+            key: キャッシュキー
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """キャッシュを全件削除（統計値は保持する）"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        キャッシュの統計情報を取得
+
+        Returns:
+            Dict[str, Any]: ヒット数・ミス数・削除数などの統計情報
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_ratio": (self._hits / lookups) if lookups else 0.0
+            }
@@ -0,0 +1,136 @@
+"""
+定期ジョブスケジューラ
+アプリケーションプロセス内でバックグラウンドの定期処理を実行する
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# 定期ジョブを有効にするか。ジョブはプロセスごとに動くため、複数のワーカー・コンテナで
+# 動かす場合は1つのプロセスだけtrueにする（既定は無効）
+ENABLE_BACKGROUND_JOBS = os.getenv("ENABLE_BACKGROUND_JOBS", "false").lower() == "true"
+
+class PeriodicJob:
+    """一定間隔で実行されるジョブ1件分の定義と実行状況"""
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], Any], initial_delay_seconds: float = 0):
+        """
+        Args:
+            name: ジョブ名
+            interval_seconds: 実行間隔（秒）
+            func: 実行する処理
+            initial_delay_seconds: 起動から初回実行までの待ち時間（秒）
+        """
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.initial_delay_seconds = initial_delay_seconds
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_result: Any = None
+        self.last_error: Optional[str] = None
+
+    def run_once(self) -> None:
+        """ジョブを1回実行し、実行時間と結果を記録する"""
+        started = time.perf_counter()
+        self.last_run_at = datetime.now()
+        try:
+            self.last_result = self.func()
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"[scheduler] ジョブ失敗 ({self.name}): {e}")
+        finally:
+            self.runs += 1
+            self.last_duration_ms = (time.perf_counter() - started) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        ジョブの実行状況を取得
+
+        Returns:
+            Dict[str, Any]: 実行回数・失敗回数・直近の実行時間など
+        """
+        return {
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_duration_ms": self.last_duration_ms,
+            "last_result": self.last_result,
+            "last_error": self.last_error
+        }
+
+class JobScheduler:
+    """登録された定期ジョブをそれぞれ専用のデーモンスレッドで実行する"""
+
+    def __init__(self):
+        self._jobs: Dict[str, PeriodicJob] = {}
+        self._threads: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+
+    def register(self, name: str, interval_seconds: float, func: Callable[[], Any], initial_delay_seconds: float = 0) -> PeriodicJob:
+        """
+        定期ジョブを登録
+
+        Args:
+            name: ジョブ名
+            interval_seconds: 実行間隔（秒）
+            func: 実行する処理
+            initial_delay_seconds: 起動から初回実行までの待ち時間（秒）
+
+        Returns:
+            PeriodicJob: 登録したジョブ
+        """
+        job = PeriodicJob(name, interval_seconds, func, initial_delay_seconds)
+        self._jobs[name] = job
+        return job
+
+    def _loop(self, job: PeriodicJob) -> None:
+        """ジョブの実行ループ（停止要求まで繰り返す）"""
+        if self._stop_event.wait(job.initial_delay_seconds):
+            return
+        while not self._stop_event.is_set():
+            job.run_once()
+            if self._stop_event.wait(job.interval_seconds):
+                return
+
+    def start(self) -> None:
+        """登録済みのジョブをすべて開始する"""
+        if self._threads:
+            return
+        self._stop_event.clear()
+        for job in self._jobs.values():
+            thread = threading.Thread(target=self._loop, args=(job,), name=f"job-{job.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        すべてのジョブを停止する（実行中の処理は完了を待つ）
+
+        Args:
+            timeout: スレッドごとの終了待ち時間（秒）
+        """
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        全ジョブの実行状況を取得
+
+        Returns:
+            Dict[str, Dict[str, Any]]: ジョブ名ごとの実行状況
+        """
+        return {name: job.stats() for name, job in self._jobs.items()}
+
+# アプリケーション全体で共有するスケジューラ
+scheduler = JobScheduler()
@@ -0,0 +1,200 @@
+"""
+リクエスト合流（single-flight）
+同じキーに対する同時実行を1回にまとめ、後続の呼び出し元は先行処理の結果を待って共有する
+"""
+
+import asyncio
+import hashlib
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+class _Call:
+    """実行中の処理1件分の状態"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    キー単位で処理を合流させる（プロセス内・スレッド間）
+
+    同じキーでdo()が同時に呼ばれた場合、最初の呼び出しだけが処理を実行し、
+    後続の呼び出しはその完了を待って同じ結果（または同じ例外）を受け取る。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._executions = 0
+        self._shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        キーに対して処理を実行（実行中なら完了を待つ）
+
+        Args:
+            key: 合流キー
+            fn: 実行する処理
+
+        Returns:
+            Tuple[Any, bool]: (処理結果, 他の呼び出しの結果を共有したかどうか)
+
+        Raises:
+            先行処理で発生した例外をそのまま送出する
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> Dict[str, int]:
+        """
+        合流の統計情報を取得
+
+        Returns:
+            Dict[str, int]: 実行回数・結果共有回数・実行中キー数
+        """
+        with self._lock:
+            return {
+                "executions": self._executions,
+                "shared": self._shared,
+                "in_flight": len(self._calls)
+            }
+
+class _LeaderCancelledError(Exception):
+    """先行処理がキャンセルされたことを、結果を待っている呼び出しに伝える例外（AsyncSingleFlight内部用）"""
+
+class AsyncSingleFlight:
+    """
+    キー単位で処理を合流させる（イベントループ内・コルーチン間）
+
+    SingleFlightの非同期版。後続の呼び出しはスレッドを占有せずに先行処理の完了を待つ。
+    先行処理の呼び出し元がキャンセルされた場合は、待っていた呼び出しの1つが処理を引き継ぐ。
+    イベントループ内でのみ使うためロックは不要。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._executions = 0
+        self._shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        キーに対して処理を実行（実行中なら完了を待つ）
+
+        Args:
+            key: 合流キー
+            fn: 実行するコルーチン関数
+
+        Returns:
+            Tuple[Any, bool]: (処理結果, 他の呼び出しの結果を共有したかどうか)
+
+        Raises:
+            先行処理で発生した例外をそのまま送出する
+        """
+        future = self._calls.get(key)
+        while future is not None:
+            try:
+                # 待っている側がキャンセルされても先行処理は止めない
+                result = await asyncio.shield(future)
+            except _LeaderCancelledError:
+                # 先行処理がキャンセルされた場合は、最初に再開した呼び出しが実行し、残りはそれを待つ
+                future = self._calls.get(key)
+                continue
+            self._shared += 1
+            return result, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self._executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # futureをキャンセルすると待機者にもCancelledErrorが伝わるため、引き継ぎ用の例外を設定する
+            future.set_exception(_LeaderCancelledError())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 待機者がいない場合に「例外が取得されなかった」警告を出さない
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._calls[key]
+        return result, False
+
+    def stats(self) -> Dict[str, int]:
+        """
+        合流の統計情報を取得
+
+        Returns:
+            Dict[str, int]: 実行回数・結果共有回数・実行中キー数
+        """
+        return {
+            "executions": self._executions,
+            "shared": self._shared,
+            "in_flight": len(self._calls)
+        }
+
+def advisory_lock_id(key: str) -> int:
+    """
+    文字列キーからPostgreSQLのアドバイザリロックID（符号付き64bit）を生成
+    プロセスをまたいで同じ値になるよう、組み込みのhash()ではなくハッシュ関数を使う
+
+    Args:
+        key: ロックキー
+
+    Returns:
+        int: アドバイザリロックID
+    """
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+def acquire_advisory_xact_lock(db: Session, key: str) -> bool:
+    """
+    トランザクション単位のアドバイザリロックを取得（PostgreSQLのみ）
+    ロックは現在のトランザクションのコミットまたはロールバックで自動的に解放される
+
+    Args:
+        db: データベースセッション
+        key: ロックキー
+
+    Returns:
+        bool: ロックを取得した場合True、PostgreSQL以外で何もしなかった場合False
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    db.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": advisory_lock_id(key)})
+    return True
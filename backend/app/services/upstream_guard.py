@@ -0,0 +1,432 @@
+"""
+上流API保護（呼び出し回数の予算とサーキットブレーカー）
+OpenWeatherMapの呼び出し回数を分・日単位の予算内に抑え、障害時は呼び出しを止めて即座に失敗させる
+"""
+
+import asyncio
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+# 呼び出し回数の予算（0は無制限）
+WEATHER_QUOTA_PER_MINUTE = int(os.getenv("WEATHER_QUOTA_PER_MINUTE", "60"))
+WEATHER_QUOTA_PER_DAY = int(os.getenv("WEATHER_QUOTA_PER_DAY", "30000"))
+# 直近WEATHER_BREAKER_WINDOW_SECONDS秒の失敗率がしきい値を超えたら遮断する（最低呼び出し数以上の場合のみ）
+# ブレーカーは呼び出し先（現在の天気・予報・History APIなど）ごとに持つ
+WEATHER_BREAKER_FAILURE_RATE = float(os.getenv("WEATHER_BREAKER_FAILURE_RATE", "0.5"))
+WEATHER_BREAKER_MIN_CALLS = int(os.getenv("WEATHER_BREAKER_MIN_CALLS", "10"))
+WEATHER_BREAKER_WINDOW_SECONDS = float(os.getenv("WEATHER_BREAKER_WINDOW_SECONDS", "60"))
+# 遮断を続ける時間（秒）。経過後は試行呼び出しを1件だけ通して復旧を確認する
+WEATHER_BREAKER_OPEN_SECONDS = float(os.getenv("WEATHER_BREAKER_OPEN_SECONDS", "30"))
+
+class QuotaBudget:
+    """
+    分単位・日単位の呼び出し回数の予算（プロセス内・スレッド間）
+
+    固定ウィンドウ（毎分・毎日0時で切り替え）で呼び出し回数を数え、
+    どちらかの上限に達している間は呼び出しを許可しない。
+    """
+
+    def __init__(self, per_minute: int, per_day: int):
+        """
+        Args:
+            per_minute: 1分あたりの上限（0は無制限）
+            per_day: 1日あたりの上限（0は無制限）
+        """
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self._lock = threading.Lock()
+        self._minute: Optional[str] = None
+        self._day: Optional[str] = None
+        self._minute_count = 0
+        self._day_count = 0
+        self._rejected = 0
+
+    def _roll(self, now: datetime) -> None:
+        """ウィンドウが切り替わっていればカウンタをリセットする（ロック内で呼ぶ）"""
+        minute = now.strftime("%Y-%m-%d %H:%M")
+        day = minute[:10]
+        if minute != self._minute:
+            self._minute = minute
+            self._minute_count = 0
+        if day != self._day:
+            self._day = day
+            self._day_count = 0
+
+    def try_acquire(self) -> bool:
+        """
+        予算から1回分を消費する
+
+        Returns:
+            bool: 消費できた場合True、上限に達している場合False
+        """
+        with self._lock:
+            self._roll(datetime.now())
+            if (self.per_minute and self._minute_count >= self.per_minute) or \
+                    (self.per_day and self._day_count >= self.per_day):
+                self._rejected += 1
+                return False
+            self._minute_count += 1
+            self._day_count += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        予算の使用状況を取得
+
+        Returns:
+            Dict[str, Any]: 上限・現在のウィンドウの使用数・拒否数
+        """
+        with self._lock:
+            self._roll(datetime.now())
+            return {
+                "per_minute": self.per_minute,
+                "per_day": self.per_day,
+                "used_minute": self._minute_count,
+                "used_day": self._day_count,
+                "rejected": self._rejected
+            }
+
+class CircuitBreaker:
+    """
+    失敗率に基づくサーキットブレーカー（プロセス内・スレッド間）
+
+    closed: 通常状態。直近の呼び出し結果を記録し、失敗率がしきい値を超えたらopenにする
+    open: 遮断状態。open_seconds経過するまで呼び出しを許可しない
+    half_open: 試行状態。1件だけ呼び出しを許可し、成功ならclosed、失敗ならopenに戻す
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float,
+        min_calls: int,
+        window_seconds: float,
+        open_seconds: float
+    ):
+        """
+        Args:
+            failure_rate_threshold: 遮断する失敗率（0-1）
+            min_calls: 失敗率を判定する最低呼び出し数
+            window_seconds: 失敗率を集計する期間（秒）
+            open_seconds: 遮断を続ける時間（秒）
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._results: Deque[Tuple[float, bool]] = deque()
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._opened_count = 0
+        self._rejected = 0
+        self._last_opened_at: Optional[str] = None
+
+    def _trim(self, now: float) -> None:
+        """集計期間外の結果を捨てる（ロック内で呼ぶ）"""
+        while self._results and self._results[0][0] < now - self.window_seconds:
+            self._results.popleft()
+
+    def _open(self, now: float) -> None:
+        """遮断状態にする（ロック内で呼ぶ）"""
+        self._state = "open"
+        self._opened_at = now
+        self._opened_count += 1
+        self._last_opened_at = datetime.now().isoformat()
+        self._results.clear()
+        print(f"[upstream_guard] サーキットブレーカー遮断: {self.open_seconds}秒間上流の呼び出しを停止します")
+
+    def _current_state(self, now: float) -> str:
+        """遮断時間の経過を反映した状態を取得（ロック内で呼ぶ）"""
+        if self._state == "open" and now - self._opened_at >= self.open_seconds:
+            self._state = "half_open"
+            self._probe_in_flight = False
+        return self._state
+
+    def available(self) -> bool:
+        """
+        呼び出しを許可できる状態かどうか（状態は変更しない）
+
+        Returns:
+            bool: closedまたは試行可能なhalf_openの場合True
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            return state == "closed" or (state == "half_open" and not self._probe_in_flight)
+
+    def allow(self) -> bool:
+        """
+        呼び出しの許可を得る（half_openでは試行呼び出しの枠を確保する）
+
+        Returns:
+            bool: 呼び出してよい場合True
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def release(self) -> None:
+        """呼び出さなかった場合に、allow()で確保した試行呼び出しの枠を返却する"""
+        with self._lock:
+            if self._state == "half_open":
+                self._probe_in_flight = False
+
+    def record(self, success: bool) -> None:
+        """
+        呼び出し結果を記録する
+
+        Args:
+            success: 呼び出しが成功したかどうか
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == "half_open":
+                self._probe_in_flight = False
+                if success:
+                    self._state = "closed"
+                    self._results.clear()
+                    print("[upstream_guard] サーキットブレーカー復旧")
+                else:
+                    self._open(now)
+                return
+            if state == "open":
+                return
+
+            self._results.append((now, success))
+            self._trim(now)
+            calls = len(self._results)
+            failures = sum(1 for _, ok in self._results if not ok)
+            if calls >= self.min_calls and failures / calls >= self.failure_rate_threshold:
+                self._open(now)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        ブレーカーの状態を取得
+
+        Returns:
+            Dict[str, Any]: 状態・直近の呼び出し数と失敗数・遮断回数・拒否数
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._trim(now)
+            return {
+                "state": state,
+                "window_calls": len(self._results),
+                "window_failures": sum(1 for _, ok in self._results if not ok),
+                "opened_count": self._opened_count,
+                "rejected": self._rejected,
+                "last_opened_at": self._last_opened_at
+            }
+
+class UpstreamGuard:
+    """
+    上流APIの呼び出しを予算とサーキットブレーカーで保護する
+
+    予算は全呼び出し先で共有し、ブレーカーは呼び出し先ごとに持つ
+    （History APIのような補助的な呼び出しの失敗で、現在の天気・予報まで止めないため）。
+    呼び出し前にブレーカー → 予算の順で許可を確認し、呼び出し結果をブレーカーに記録する。
+    予算切れで見送った呼び出しと、呼び出し元の締め切りでキャンセルされた呼び出しは失敗として数えない。
+    """
+
+    def __init__(
+        self,
+        budget: QuotaBudget,
+        breaker_factory: Callable[[], CircuitBreaker],
+        primary_names: Tuple[str, ...] = ()
+    ):
+        """
+        Args:
+            budget: 呼び出し回数の予算
+            breaker_factory: 呼び出し先ごとのサーキットブレーカーを作成する関数
+            primary_names: 上流を呼び出せるかどうか（available()）の判定に使う呼び出し先
+        """
+        self.budget = budget
+        self.breaker_factory = breaker_factory
+        self.primary_names = primary_names
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._calls: Dict[str, Dict[str, int]] = {}
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        """
+        呼び出し先のサーキットブレーカーを取得（初回は作成する）
+
+        Args:
+            name: 呼び出し先の名前
+
+        Returns:
+            CircuitBreaker: サーキットブレーカー
+        """
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = self.breaker_factory()
+            return breaker
+
+    def reset_breakers(self) -> None:
+        """全呼び出し先のサーキットブレーカーを初期状態に戻す（ベンチマークなどから使う）"""
+        with self._lock:
+            self._breakers.clear()
+
+    def _count(self, name: str, outcome: str) -> None:
+        """呼び出し先ごとの結果を数える"""
+        with self._lock:
+            counters = self._calls.setdefault(name, {"success": 0, "failure": 0, "rejected": 0, "cancelled": 0})
+            counters[outcome] += 1
+
+    def available(self, *names: str) -> bool:
+        """
+        上流を呼び出せる状態かどうか（ブレーカーが遮断中でなく、予算が残っている）
+
+        Args:
+            *names: 判定する呼び出し先（省略時はprimary_names）
+
+        Returns:
+            bool: 呼び出せる場合True
+        """
+        if not all(self.breaker(name).available() for name in names or self.primary_names):
+            return False
+        budget = self.budget.stats()
+        return not (
+            (budget["per_minute"] and budget["used_minute"] >= budget["per_minute"]) or
+            (budget["per_day"] and budget["used_day"] >= budget["per_day"])
+        )
+
+    def acquire(self, name: str) -> bool:
+        """
+        呼び出しの許可を得る
+
+        Args:
+            name: 呼び出し先の名前
+
+        Returns:
+            bool: 呼び出してよい場合True
+        """
+        breaker = self.breaker(name)
+        if not breaker.allow():
+            self._count(name, "rejected")
+            return False
+        if not self.budget.try_acquire():
+            breaker.release()
+            self._count(name, "rejected")
+            return False
+        return True
+
+    def record(self, name: str, success: bool) -> None:
+        """
+        呼び出し結果を記録する
+
+        Args:
+            name: 呼び出し先の名前
+            success: 呼び出しが成功したかどうか
+        """
+        self.breaker(name).record(success)
+        self._count(name, "success" if success else "failure")
+
+    def cancel(self, name: str) -> None:
+        """
+        呼び出し元の都合（締め切り超過など）で結果を待たずに終えた呼び出しを記録する
+        上流の失敗ではないためブレーカーには記録せず、試行呼び出しの枠だけ返却する
+
+        Args:
+            name: 呼び出し先の名前
+        """
+        self.breaker(name).release()
+        self._count(name, "cancelled")
+
+    def guard(self, name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """
+        上流呼び出し関数を保護するデコレータ（同期関数・コルーチン関数の両方に対応）
+        対象の関数は失敗時にNoneを返すこと。許可されない場合は呼び出さずにNoneを返す
+
+        Args:
+            name: 呼び出し先の名前（統計用）
+
+        Returns:
+            Callable: デコレータ
+        """
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.acquire(name):
+                        return None
+                    try:
+                        result = await func(*args, **kwargs)
+                    except asyncio.CancelledError:
+                        # 締め切り超過によるキャンセルは上流の失敗として数えない
+                        self.cancel(name)
+                        raise
+                    except BaseException:
+                        self.record(name, False)
+                        raise
+                    self.record(name, result is not None)
+                    return result
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.acquire(name):
+                    return None
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException:
+                    self.record(name, False)
+                    raise
+                self.record(name, result is not None)
+                return result
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        予算・ブレーカー・呼び出し先ごとの統計情報を取得
+
+        Returns:
+            Dict[str, Any]: 統計情報
+        """
+        with self._lock:
+            calls = {name: dict(counters) for name, counters in self._calls.items()}
+            breakers = dict(self._breakers)
+        return {
+            "available": self.available(),
+            "quota": self.budget.stats(),
+            "breakers": {name: breaker.stats() for name, breaker in breakers.items()},
+            "calls": calls
+        }
+
+def create_weather_breaker() -> CircuitBreaker:
+    """
+    OpenWeatherMapの呼び出し先1つ分のサーキットブレーカーを作成
+
+    Returns:
+        CircuitBreaker: WEATHER_BREAKER_*の設定のブレーカー
+    """
+    return CircuitBreaker(
+        WEATHER_BREAKER_FAILURE_RATE,
+        WEATHER_BREAKER_MIN_CALLS,
+        WEATHER_BREAKER_WINDOW_SECONDS,
+        WEATHER_BREAKER_OPEN_SECONDS
+    )
+
+# OpenWeatherMap用（同期版・非同期版のweather_serviceで共有する）
+# 現在の天気と予報が呼び出せれば天気情報を返せるため、available()はこの2つで判定する
+weather_upstream_guard = UpstreamGuard(
+    QuotaBudget(WEATHER_QUOTA_PER_MINUTE, WEATHER_QUOTA_PER_DAY),
+    create_weather_breaker,
+    primary_names=("current", "forecast")
+)
@@ -3,16 +3,72 @@
 天気情報のキャッシュ管理を行うサービス
 """
 
+import asyncio
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Awaitable, Callable, List, Set, Tuple
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from app.database import SessionLocal
 from app.models import WeatherCache
+from app.services.memory_cache import TTLLRUCache
+from app.services.cache_serializer import get_serializer, WEATHER_CACHE_FORMAT
+from app.services.geo_bucket import location_bucket, bucket_label
+from app.services.single_flight import SingleFlight, AsyncSingleFlight, acquire_advisory_xact_lock
+from app.services.upstream_guard import weather_upstream_guard
+
+# プロセス内キャッシュ（L1）。weather_cacheテーブル（L2）の手前で参照する
+WEATHER_MEMORY_CACHE_SIZE = int(os.getenv("WEATHER_MEMORY_CACHE_SIZE", "1024"))
+weather_memory_cache = TTLLRUCache(max_size=WEATHER_MEMORY_CACHE_SIZE, default_ttl_seconds=15 * 60)
+
+# 新しく書き込むキャッシュのシリアライザ（起動時に設定ミスを検出する）
+weather_cache_serializer = get_serializer(WEATHER_CACHE_FORMAT)
+
+# ソフトTTL（cache_duration_minutes）経過後も古いデータとして返してよい期間（分、ハードTTL）
+DEFAULT_STALE_TTL_MINUTES = int(os.getenv("WEATHER_CACHE_STALE_TTL_MINUTES", "60"))
+
+# 上流APIが遮断中・予算切れの間は、ハードTTLを過ぎたデータもこの期間（分）までは返す
+WEATHER_OUTAGE_STALE_TTL_MINUTES = int(os.getenv("WEATHER_OUTAGE_STALE_TTL_MINUTES", "360"))
+
+# 予報データ（5日間3時間ごと）のキャッシュ期間（分）。地点ごとに1件を全日付で共有する
+WEATHER_FORECAST_CACHE_MINUTES = int(os.getenv("WEATHER_FORECAST_CACHE_MINUTES", "60"))
+WEATHER_FORECAST_STALE_TTL_MINUTES = int(os.getenv("WEATHER_FORECAST_STALE_TTL_MINUTES", "180"))
+
+# weather_cacheテーブルの最大行数と定期クリーンアップの間隔（分）
+WEATHER_CACHE_MAX_ROWS = int(os.getenv("WEATHER_CACHE_MAX_ROWS", "1000"))
+WEATHER_CACHE_CLEANUP_INTERVAL_MINUTES = int(os.getenv("WEATHER_CACHE_CLEANUP_INTERVAL_MINUTES", "30"))
+
+# バケット設定ごとのキャッシュ参照の統計
+_bucket_stats: Dict[str, Dict[str, int]] = {}
+_bucket_stats_lock = threading.Lock()
+
+# 一括取得でキャッシュミスした地点を上流から並列取得するスレッドプール
+WEATHER_BATCH_MAX_WORKERS = int(os.getenv("WEATHER_BATCH_MAX_WORKERS", "8"))
+_fetch_executor = ThreadPoolExecutor(max_workers=WEATHER_BATCH_MAX_WORKERS, thread_name_prefix="weather-batch")
+
+# BackgroundTasksが使えない呼び出し元向けのキャッシュ更新用スレッドプール
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="weather-refresh")
+
+# キャッシュミス時の上流取得の合流方式
+# local: 同一プロセス内のスレッド間で合流
+# advisory: さらにPostgreSQLのアドバイザリロックで複数ワーカー間でも合流
+WEATHER_CACHE_LOCK_MODE = os.getenv("WEATHER_CACHE_LOCK_MODE", "local")
+weather_single_flight = SingleFlight()
+# 非同期ハンドラ用（イベントループ内のコルーチン間で合流）
+weather_async_single_flight = AsyncSingleFlight()
+# BackgroundTasksが使えない呼び出し元の非同期キャッシュ更新タスク（完了まで参照を保持する）
+_async_refresh_tasks: Set[asyncio.Task] = set()
 
 def generate_cache_key(lat: float, lon: float, date: str) -> str:
     """
     キャッシュキーを生成
+    近接する地点は同じバケット（WEATHER_CACHE_BUCKET_MODEの区画）にまとめ、キャッシュを共有する
     
     Args:
         lat: 緯度
@@ -22,24 +78,135 @@ def generate_cache_key(lat: float, lon: float, date: str) -> str:
     Returns:
         str: キャッシュキー
     """
-    return f"{lat}_{lon}_{date}"
+    return f"{location_bucket(lat, lon)}_{date}"
 
-def get_cached_weather(db: Session, lat: float, lon: float, date: str, cache_duration_minutes: int = 15) -> Optional[Dict[str, Any]]:
+def _record_bucket_lookup(hit: bool) -> None:
     """
-    キャッシュされた天気情報を取得
+    現在のバケット設定ごとにキャッシュ参照のヒット・ミスを記録
+    
+    Args:
+        hit: キャッシュにヒットしたかどうか
+    """
+    label = bucket_label()
+    with _bucket_stats_lock:
+        counters = _bucket_stats.setdefault(label, {"hits": 0, "misses": 0})
+        counters["hits" if hit else "misses"] += 1
+
+def _decode_cache_record(cache_record: WeatherCache) -> Dict[str, Any]:
+    """
+    キャッシュレコードから天気情報を復元
+    
+    Args:
+        cache_record: キャッシュレコード
+        
+    Returns:
+        Dict[str, Any]: 天気情報
+    """
+    if cache_record.payload is not None:
+        return get_serializer(cache_record.payload_format).decode(cache_record.payload)
+    # 旧形式（JSON文字列）のレコード
+    return json.loads(cache_record.weather_data)
+
+def _ttl_bounds(cache_duration_minutes: int, stale_ttl_minutes: Optional[int]) -> Tuple[timedelta, timedelta]:
+    """
+    ソフトTTLとハードTTLを求める（ハードTTLはソフトTTL以上にそろえる）
+    
+    Args:
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）、省略時はDEFAULT_STALE_TTL_MINUTES
+        
+    Returns:
+        Tuple[timedelta, timedelta]: (ソフトTTL, ハードTTL)
+    """
+    if stale_ttl_minutes is None:
+        stale_ttl_minutes = DEFAULT_STALE_TTL_MINUTES
+    stale_ttl_minutes = max(stale_ttl_minutes, cache_duration_minutes)
+    return timedelta(minutes=cache_duration_minutes), timedelta(minutes=stale_ttl_minutes)
+
+def _lookup_memory_cache(cache_key: str, soft_ttl: timedelta, hard_ttl: timedelta) -> Optional[Tuple[Dict[str, Any], bool]]:
+    """
+    L1（プロセス内キャッシュ）から天気情報を鮮度付きで取得
+    
+    Args:
+        cache_key: キャッシュキー
+        soft_ttl: ソフトTTL
+        hard_ttl: ハードTTL
+        
+    Returns:
+        Optional[Tuple[Dict[str, Any], bool]]: (天気情報, 古いデータかどうか)、存在しない場合はNone
+    """
+    cached = weather_memory_cache.get(cache_key)
+    if cached is None:
+        return None
+    fetched_at, weather_data = cached
+    cache_age = timedelta(seconds=time.time() - fetched_at)
+    if cache_age > hard_ttl:
+        return None
+    return weather_data, cache_age > soft_ttl
+
+def _serving_stale_ttl(stale_ttl_minutes: Optional[int]) -> Tuple[Optional[int], bool]:
+    """
+    キャッシュ参照時のハードTTLを決める
+    上流APIを呼び出せない間（サーキットブレーカー遮断中・予算切れ）は古いデータを長めに返す
+    
+    Args:
+        stale_ttl_minutes: 通常時のハードTTL（分）
+        
+    Returns:
+        Tuple[Optional[int], bool]: (参照時のハードTTL（分）, 上流APIを呼び出せるかどうか)
+    """
+    if weather_upstream_guard.available():
+        return stale_ttl_minutes, True
+    base = stale_ttl_minutes if stale_ttl_minutes is not None else DEFAULT_STALE_TTL_MINUTES
+    return max(base, WEATHER_OUTAGE_STALE_TTL_MINUTES), False
+
+def get_cached_weather_entry(
+    db: Session,
+    lat: float,
+    lon: float,
+    date: str,
+    cache_duration_minutes: int = 15,
+    stale_ttl_minutes: Optional[int] = None
+) -> Optional[Tuple[Dict[str, Any], bool]]:
+    """
+    キャッシュされた天気情報を鮮度付きで取得
+    cache_duration_minutes（ソフトTTL）を過ぎても stale_ttl_minutes（ハードTTL）以内なら
+    古いデータとして返す
     
     Args:
         db: データベースセッション
         lat: 緯度
         lon: 経度
         date: 日付
-        cache_duration_minutes: キャッシュ有効期間（分）
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）
         
     Returns:
-        Optional[Dict[str, Any]]: キャッシュされた天気情報、有効期限切れまたは存在しない場合はNone
+        Optional[Tuple[Dict[str, Any], bool]]: (天気情報, 古いデータかどうか)、ハードTTL切れまたは存在しない場合はNone
+    """
+    entry = _lookup_cached_weather(db, lat, lon, date, cache_duration_minutes, stale_ttl_minutes)
+    _record_bucket_lookup(entry is not None)
+    return entry
+
+def _lookup_cached_weather(
+    db: Session,
+    lat: float,
+    lon: float,
+    date: str,
+    cache_duration_minutes: int = 15,
+    stale_ttl_minutes: Optional[int] = None
+) -> Optional[Tuple[Dict[str, Any], bool]]:
+    """
+    get_cached_weather_entryの本体（L1 → weather_cacheテーブルの順に参照する）
     """
+    soft_ttl, hard_ttl = _ttl_bounds(cache_duration_minutes, stale_ttl_minutes)
     cache_key = generate_cache_key(lat, lon, date)
     
+    # L1（プロセス内キャッシュ）を優先して参照
+    entry = _lookup_memory_cache(cache_key, soft_ttl, hard_ttl)
+    if entry is not None:
+        return entry
+    
     # キャッシュレコードを取得
     cache_record = db.query(WeatherCache).filter(WeatherCache.cache_key == cache_key).first()
     
@@ -48,24 +215,151 @@ def get_cached_weather(db: Session, lat: float, lon: float, date: str, cache_dur
     
     # キャッシュの有効期限をチェック
     cache_age = datetime.now(cache_record.created_at.tzinfo) - cache_record.created_at
-    if cache_age > timedelta(minutes=cache_duration_minutes):
-        # 有効期限切れのキャッシュを削除
-        db.delete(cache_record)
-        db.commit()
+    if cache_age > hard_ttl:
+        # 期限切れの行は定期メンテナンスで削除する（上流障害時はより長いハードTTLで参照するため、ここでは残す）
         return None
     
-    # キャッシュされたデータを返す
+    # キャッシュされたデータを返す（ハードTTLまでの残り期間だけL1にも載せる）
     try:
-        return json.loads(cache_record.weather_data)
-    except json.JSONDecodeError:
-        # JSONデコードエラーの場合、キャッシュを削除
+        weather_data = _decode_cache_record(cache_record)
+    except Exception:
+        # デコードエラーの場合、キャッシュを削除
         db.delete(cache_record)
         db.commit()
         return None
+    
+    weather_memory_cache.set(
+        cache_key,
+        (cache_record.created_at.timestamp(), weather_data),
+        ttl_seconds=(hard_ttl - cache_age).total_seconds()
+    )
+    return weather_data, cache_age > soft_ttl
+
+def get_cached_weather(db: Session, lat: float, lon: float, date: str, cache_duration_minutes: int = 15) -> Optional[Dict[str, Any]]:
+    """
+    キャッシュされた天気情報を取得
+    
+    Args:
+        db: データベースセッション
+        lat: 緯度
+        lon: 経度
+        date: 日付
+        cache_duration_minutes: キャッシュ有効期間（分）
+        
+    Returns:
+        Optional[Dict[str, Any]]: キャッシュされた天気情報、有効期限切れまたは存在しない場合はNone
+    """
+    entry = get_cached_weather_entry(db, lat, lon, date, cache_duration_minutes=cache_duration_minutes)
+    if entry is None:
+        return None
+    weather_data, is_stale = entry
+    return None if is_stale else weather_data
+
+def get_cached_weather_entries(
+    db: Session,
+    points: List[Tuple[float, float, str]],
+    cache_duration_minutes: int = 15,
+    stale_ttl_minutes: Optional[int] = None
+) -> Dict[str, Tuple[Dict[str, Any], bool]]:
+    """
+    複数地点・日付のキャッシュをまとめて取得（L1にないものは1回のSELECTで取得）
+    ハードTTL切れのレコードは削除せず、定期クリーンアップに任せる
+    
+    Args:
+        db: データベースセッション
+        points: (緯度, 経度, 日付) の一覧
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）
+        
+    Returns:
+        Dict[str, Tuple[Dict[str, Any], bool]]: キャッシュキーごとの (天気情報, 古いデータかどうか)
+    """
+    soft_ttl, hard_ttl = _ttl_bounds(cache_duration_minutes, stale_ttl_minutes)
+    cache_keys = {generate_cache_key(lat, lon, date) for lat, lon, date in points}
+    
+    entries = {}
+    db_keys = []
+    for cache_key in cache_keys:
+        entry = _lookup_memory_cache(cache_key, soft_ttl, hard_ttl)
+        if entry is not None:
+            entries[cache_key] = entry
+        else:
+            db_keys.append(cache_key)
+    
+    if db_keys:
+        cache_records = db.query(WeatherCache).filter(WeatherCache.cache_key.in_(db_keys)).all()
+        for cache_record in cache_records:
+            cache_age = datetime.now(cache_record.created_at.tzinfo) - cache_record.created_at
+            if cache_age > hard_ttl:
+                continue
+            try:
+                weather_data = _decode_cache_record(cache_record)
+            except Exception:
+                continue
+            weather_memory_cache.set(
+                cache_record.cache_key,
+                (cache_record.created_at.timestamp(), weather_data),
+                ttl_seconds=(hard_ttl - cache_age).total_seconds()
+            )
+            entries[cache_record.cache_key] = (weather_data, cache_age > soft_ttl)
+    
+    for cache_key in cache_keys:
+        _record_bucket_lookup(cache_key in entries)
+    return entries
+
+def _upsert_cache_rows(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    キャッシュ行をcache_key単位でupsert（コミットは呼び出し元で行う）
+    PostgreSQL・SQLiteでは INSERT ... ON CONFLICT DO UPDATE の1文で実行し、
+    それ以外のDBでは既存行の更新または追加で代替する
+    
+    Args:
+        db: データベースセッション
+        rows: cache_key・payload・payload_formatを持つ行の一覧
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+    
+    if insert is not None:
+        stmt = insert(WeatherCache).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WeatherCache.cache_key],
+            set_={
+                "payload": stmt.excluded.payload,
+                "payload_format": stmt.excluded.payload_format,
+                "weather_data": None,
+                # 鮮度判定はcreated_atで行うため、更新時も取得時刻に揃える
+                "created_at": func.now(),
+                "updated_at": func.now()
+            }
+        )
+        db.execute(stmt)
+        return
+    
+    existing = {
+        record.cache_key: record
+        for record in db.query(WeatherCache).filter(
+            WeatherCache.cache_key.in_([row["cache_key"] for row in rows])
+        )
+    }
+    for row in rows:
+        record = existing.get(row["cache_key"])
+        if record is None:
+            db.add(WeatherCache(**row))
+        else:
+            record.payload = row["payload"]
+            record.payload_format = row["payload_format"]
+            record.weather_data = None
+            record.created_at = func.now()
 
-def set_cached_weather(db: Session, lat: float, lon: float, date: str, weather_data: Dict[str, Any]) -> None:
+def set_cached_weather(db: Session, lat: float, lon: float, date: str, weather_data: Dict[str, Any], stale_ttl_minutes: Optional[int] = None) -> None:
     """
-    天気情報をキャッシュに保存
+    天気情報をキャッシュに保存（cache_key単位のupsert）
     
     Args:
         db: データベースセッション
@@ -73,26 +367,498 @@ def set_cached_weather(db: Session, lat: float, lon: float, date: str, weather_d
         lon: 経度
         date: 日付
         weather_data: 天気情報データ
+        stale_ttl_minutes: L1キャッシュの保持期間（分、ハードTTL）
+    """
+    set_cached_weather_many(db, [(lat, lon, date, weather_data)], stale_ttl_minutes=stale_ttl_minutes)
+
+def set_cached_weather_many(
+    db: Session,
+    entries: List[Tuple[float, float, str, Dict[str, Any]]],
+    stale_ttl_minutes: Optional[int] = None
+) -> None:
+    """
+    複数の天気情報を1文でキャッシュに保存（プリフェッチ・一括取得向け）
+    
+    Args:
+        db: データベースセッション
+        entries: (緯度, 経度, 日付, 天気情報データ) の一覧
+        stale_ttl_minutes: L1キャッシュの保持期間（分、ハードTTL）
+    """
+    if not entries:
+        return
+    if stale_ttl_minutes is None:
+        stale_ttl_minutes = DEFAULT_STALE_TTL_MINUTES
+    
+    # 同じキーが複数あると ON CONFLICT が同一文内で衝突するため、後勝ちで1件にまとめる
+    rows = {}
+    for lat, lon, date, weather_data in entries:
+        cache_key = generate_cache_key(lat, lon, date)
+        rows[cache_key] = (weather_data, weather_cache_serializer.encode(weather_data))
+    
+    _upsert_cache_rows(db, [
+        {"cache_key": cache_key, "payload": encoded, "payload_format": weather_cache_serializer.name}
+        for cache_key, (_, encoded) in rows.items()
+    ])
+    db.commit()
+    
+    # L1にも保存（取得時刻と合わせて保持し、鮮度判定に使う）
+    fetched_at = time.time()
+    for cache_key, (weather_data, _) in rows.items():
+        weather_memory_cache.set(cache_key, (fetched_at, weather_data), ttl_seconds=stale_ttl_minutes * 60)
+
+def _load_weather(
+    db: Session,
+    lat: float,
+    lon: float,
+    date: str,
+    fetch: Callable[[], Optional[Dict[str, Any]]],
+    cache_duration_minutes: int,
+    stale_ttl_minutes: Optional[int]
+) -> Optional[Dict[str, Any]]:
+    """
+    天気情報を上流から取得してキャッシュに保存（同じキャッシュキーの同時実行は1回にまとめる）
+    
+    Args:
+        db: データベースセッション
+        lat: 緯度
+        lon: 経度
+        date: 日付
+        fetch: 天気情報を取得する処理（失敗時はNoneを返す）
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）
+        
+    Returns:
+        Optional[Dict[str, Any]]: 天気情報、取得失敗時はNone
+    """
+    cache_key = generate_cache_key(lat, lon, date)
+    
+    def load() -> Optional[Dict[str, Any]]:
+        cached = _lock_and_recheck(db, cache_key, lat, lon, date, cache_duration_minutes)
+        if cached:
+            return cached
+        
+        try:
+            weather_data = fetch()
+        except Exception:
+            db.rollback()
+            raise
+        
+        _store_fetched_weather(db, lat, lon, date, weather_data, stale_ttl_minutes)
+        return weather_data
+    
+    weather_data, _ = weather_single_flight.do(cache_key, load)
+    return weather_data
+
+def _lock_and_recheck(
+    db: Session,
+    cache_key: str,
+    lat: float,
+    lon: float,
+    date: str,
+    cache_duration_minutes: int
+) -> Optional[Dict[str, Any]]:
+    """
+    advisoryモードの場合はアドバイザリロックを取得し、ロック待ちの間に保存されたキャッシュを再確認
+    
+    Args:
+        db: データベースセッション
+        cache_key: キャッシュキー（ロックキー）
+        lat: 緯度
+        lon: 経度
+        date: 日付
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        
+    Returns:
+        Optional[Dict[str, Any]]: 他ワーカーが保存した天気情報（ロックは解放済み）、なければNone
+    """
+    if WEATHER_CACHE_LOCK_MODE == "advisory" and acquire_advisory_xact_lock(db, cache_key):
+        # 他ワーカーがロック待ちの間に保存している可能性があるため再確認
+        cached = get_cached_weather(db, lat, lon, date, cache_duration_minutes=cache_duration_minutes)
+        if cached:
+            # ロックを解放するためトランザクションを終了
+            db.commit()
+            return cached
+    return None
+
+def _store_fetched_weather(
+    db: Session,
+    lat: float,
+    lon: float,
+    date: str,
+    weather_data: Optional[Dict[str, Any]],
+    stale_ttl_minutes: Optional[int]
+) -> None:
+    """
+    上流から取得した天気情報をキャッシュに保存（取得失敗・部分集計の場合は保存しない）
+    いずれの場合もトランザクションを終了し、アドバイザリロックを解放する
+    
+    Args:
+        db: データベースセッション
+        lat: 緯度
+        lon: 経度
+        date: 日付
+        weather_data: 取得した天気情報（取得失敗時はNone）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）
+    """
+    if not weather_data or weather_data.get("degraded"):
+        db.commit()
+    else:
+        set_cached_weather(db, lat, lon, date, weather_data, stale_ttl_minutes=stale_ttl_minutes)
+
+async def _load_weather_async(
+    db: Session,
+    lat: float,
+    lon: float,
+    date: str,
+    fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    cache_duration_minutes: int,
+    stale_ttl_minutes: Optional[int]
+) -> Optional[Dict[str, Any]]:
+    """
+    _load_weatherの非同期版
+    上流の取得はイベントループ上で待ち、DB処理だけをスレッドプールで実行する
+    
+    Args:
+        db: データベースセッション
+        lat: 緯度
+        lon: 経度
+        date: 日付
+        fetch: 天気情報を取得するコルーチン関数（失敗時はNoneを返す）
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）
+        
+    Returns:
+        Optional[Dict[str, Any]]: 天気情報、取得失敗時はNone
     """
     cache_key = generate_cache_key(lat, lon, date)
     
-    # 既存のキャッシュを削除（upsert）
-    existing_cache = db.query(WeatherCache).filter(WeatherCache.cache_key == cache_key).first()
-    if existing_cache:
-        db.delete(existing_cache)
+    async def load() -> Optional[Dict[str, Any]]:
+        cached = await run_in_threadpool(_lock_and_recheck, db, cache_key, lat, lon, date, cache_duration_minutes)
+        if cached:
+            return cached
+        
+        try:
+            weather_data = await fetch()
+        except BaseException:
+            await run_in_threadpool(db.rollback)
+            raise
+        
+        await run_in_threadpool(_store_fetched_weather, db, lat, lon, date, weather_data, stale_ttl_minutes)
+        return weather_data
+    
+    weather_data, _ = await weather_async_single_flight.do(cache_key, load)
+    return weather_data
+
+def refresh_cached_weather(
+    lat: float,
+    lon: float,
+    date: str,
+    fetch: Callable[[], Optional[Dict[str, Any]]],
+    cache_duration_minutes: int = 15,
+    stale_ttl_minutes: Optional[int] = None
+) -> bool:
+    """
+    天気情報キャッシュをバックグラウンドで更新
+    リクエストのセッションは使わず、専用のセッションを開いて処理する
     
-    # 新しいキャッシュを作成
-    cache_record = WeatherCache(
-        cache_key=cache_key,
-        weather_data=json.dumps(weather_data, ensure_ascii=False)
+    Args:
+        lat: 緯度
+        lon: 経度
+        date: 日付
+        fetch: 天気情報を取得する処理（失敗時はNoneを返す）
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）
+        
+    Returns:
+        bool: キャッシュが新しい天気情報になっている場合True、取得失敗・部分集計の場合False
+    """
+    db = SessionLocal()
+    try:
+        # 他の更新処理で既に新しくなっていれば何もしない
+        entry = get_cached_weather_entry(db, lat, lon, date, cache_duration_minutes, stale_ttl_minutes)
+        if entry is not None and not entry[1]:
+            return True
+        weather_data = _load_weather(db, lat, lon, date, fetch, cache_duration_minutes, stale_ttl_minutes)
+        return bool(weather_data) and not weather_data.get("degraded")
+    except Exception as e:
+        print(f"[weather_cache_service] キャッシュ更新失敗 ({lat}, {lon}, {date}): {e}")
+        return False
+    finally:
+        db.close()
+
+def get_or_fetch_weather(
+    db: Session,
+    lat: float,
+    lon: float,
+    date: str,
+    fetch: Callable[[], Optional[Dict[str, Any]]],
+    cache_duration_minutes: int = 15,
+    stale_ttl_minutes: Optional[int] = None,
+    schedule_refresh: Optional[Callable[..., Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    キャッシュから天気情報を取得し、なければ取得処理を1回だけ実行して保存
+    同じキャッシュキーへの同時リクエストは先行リクエストの取得結果を待って共有する
+    ソフトTTL切れ・ハードTTL以内のデータは即座に返し、更新はバックグラウンドで行う
+    
+    Args:
+        db: データベースセッション
+        lat: 緯度
+        lon: 経度
+        date: 日付
+        fetch: キャッシュミス時に天気情報を取得する処理（失敗時はNoneを返す）
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）
+        schedule_refresh: バックグラウンド更新の登録関数（BackgroundTasks.add_taskなど）、
+            省略時はキャッシュ更新用のスレッドプールで実行
+        
+    Returns:
+        Optional[Dict[str, Any]]: 天気情報（degradedがTrueの部分集計はキャッシュしない）、取得失敗時はNone
+    """
+    lookup_stale_ttl, upstream_available = _serving_stale_ttl(stale_ttl_minutes)
+    entry = get_cached_weather_entry(db, lat, lon, date, cache_duration_minutes, lookup_stale_ttl)
+    if entry is not None:
+        weather_data, is_stale = entry
+        # 上流を呼び出せない間は更新しても失敗するだけなので登録しない
+        if is_stale and upstream_available:
+            if schedule_refresh is None:
+                schedule_refresh = _refresh_executor.submit
+            schedule_refresh(
+                refresh_cached_weather,
+                lat,
+                lon,
+                date,
+                fetch,
+                cache_duration_minutes,
+                stale_ttl_minutes
+            )
+        return weather_data
+    
+    return _load_weather(db, lat, lon, date, fetch, cache_duration_minutes, stale_ttl_minutes)
+
+async def refresh_cached_weather_async(
+    lat: float,
+    lon: float,
+    date: str,
+    fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    cache_duration_minutes: int = 15,
+    stale_ttl_minutes: Optional[int] = None
+) -> None:
+    """
+    refresh_cached_weatherの非同期版（専用のセッションを開いて処理する）
+    
+    Args:
+        lat: 緯度
+        lon: 経度
+        date: 日付
+        fetch: 天気情報を取得するコルーチン関数（失敗時はNoneを返す）
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）
+    """
+    db = await run_in_threadpool(SessionLocal)
+    try:
+        entry = await run_in_threadpool(
+            get_cached_weather_entry, db, lat, lon, date, cache_duration_minutes, stale_ttl_minutes
+        )
+        if entry is not None and not entry[1]:
+            return
+        await _load_weather_async(db, lat, lon, date, fetch, cache_duration_minutes, stale_ttl_minutes)
+    except Exception as e:
+        print(f"[weather_cache_service] キャッシュ更新失敗 ({lat}, {lon}, {date}): {e}")
+    finally:
+        await run_in_threadpool(db.close)
+
+def _spawn_refresh_task(func: Callable[..., Awaitable[Any]], *args: Any) -> None:
+    """非同期のキャッシュ更新をイベントループのタスクとして実行"""
+    task = asyncio.get_running_loop().create_task(func(*args))
+    _async_refresh_tasks.add(task)
+    task.add_done_callback(_async_refresh_tasks.discard)
+
+async def get_or_fetch_weather_async(
+    db: Session,
+    lat: float,
+    lon: float,
+    date: str,
+    fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    cache_duration_minutes: int = 15,
+    stale_ttl_minutes: Optional[int] = None,
+    schedule_refresh: Optional[Callable[..., Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    get_or_fetch_weatherの非同期版
+    キャッシュ参照・保存はスレッドプールで実行し、上流の待ち時間ではスレッドを占有しない
+    同じキャッシュキーへの同時リクエストはイベントループ内で1回の取得にまとめる
+    
+    Args:
+        db: データベースセッション
+        lat: 緯度
+        lon: 経度
+        date: 日付
+        fetch: キャッシュミス時に天気情報を取得するコルーチン関数（失敗時はNoneを返す）
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）
+        schedule_refresh: バックグラウンド更新の登録関数（BackgroundTasks.add_taskなど）、
+            省略時はイベントループのタスクとして実行
+        
+    Returns:
+        Optional[Dict[str, Any]]: 天気情報（degradedがTrueの部分集計はキャッシュしない）、取得失敗時はNone
+    """
+    lookup_stale_ttl, upstream_available = _serving_stale_ttl(stale_ttl_minutes)
+    entry = await run_in_threadpool(
+        get_cached_weather_entry, db, lat, lon, date, cache_duration_minutes, lookup_stale_ttl
     )
+    if entry is not None:
+        weather_data, is_stale = entry
+        if is_stale and upstream_available:
+            if schedule_refresh is None:
+                schedule_refresh = _spawn_refresh_task
+            schedule_refresh(
+                refresh_cached_weather_async,
+                lat,
+                lon,
+                date,
+                fetch,
+                cache_duration_minutes,
+                stale_ttl_minutes
+            )
+        return weather_data
     
-    db.add(cache_record)
-    db.commit()
+    return await _load_weather_async(db, lat, lon, date, fetch, cache_duration_minutes, stale_ttl_minutes)
+
+def refresh_cached_weather_many(
+    lat: float,
+    lon: float,
+    dates: List[str],
+    fetch_location: Callable[[float, float, List[str]], Dict[str, Optional[Dict[str, Any]]]],
+    cache_duration_minutes: int = 15,
+    stale_ttl_minutes: Optional[int] = None
+) -> None:
+    """
+    1地点（バケット）の複数日付のキャッシュをバックグラウンドでまとめて更新
+    上流の取得は地点ごとに1回だけ行い、取得できた日付はまとめてupsertする
+    
+    Args:
+        lat: 緯度
+        lon: 経度
+        dates: 更新する日付の一覧
+        fetch_location: 1地点の複数日付分の天気情報を取得する処理
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）
+    """
+    db = SessionLocal()
+    try:
+        # 他の更新処理で既に新しくなった日付は取得しない
+        entries = get_cached_weather_entries(
+            db, [(lat, lon, date) for date in dates], cache_duration_minutes, stale_ttl_minutes
+        )
+        stale_dates = []
+        for date in dates:
+            entry = entries.get(generate_cache_key(lat, lon, date))
+            if entry is None or entry[1]:
+                stale_dates.append(date)
+        if not stale_dates:
+            return
+        weather_by_date = fetch_location(lat, lon, stale_dates) or {}
+        to_store = []
+        for date in stale_dates:
+            weather_data = weather_by_date.get(date)
+            if weather_data and not weather_data.get("degraded"):
+                to_store.append((lat, lon, date, weather_data))
+        set_cached_weather_many(db, to_store, stale_ttl_minutes=stale_ttl_minutes)
+    except Exception as e:
+        print(f"[weather_cache_service] キャッシュ一括更新失敗 ({lat}, {lon}, {dates}): {e}")
+    finally:
+        db.close()
+
+def get_or_fetch_weather_many(
+    db: Session,
+    points: List[Tuple[float, float, str]],
+    fetch_location: Callable[[float, float, List[str]], Dict[str, Optional[Dict[str, Any]]]],
+    cache_duration_minutes: int = 15,
+    stale_ttl_minutes: Optional[int] = None,
+    schedule_refresh: Optional[Callable[..., Any]] = None
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    複数地点・日付の天気情報をまとめて取得
+    キャッシュはまとめて参照し、ミスした分は地点（バケット）ごとに1回だけ、並列に上流から取得する
+    古いデータの更新も地点（バケット）ごとに1回の取得にまとめてバックグラウンドで行う
+    
+    Args:
+        db: データベースセッション
+        points: (緯度, 経度, 日付) の一覧
+        fetch_location: 1地点の複数日付分の天気情報を取得する処理（日付ごとの天気情報、失敗時はNone）
+        cache_duration_minutes: キャッシュ有効期間（分、ソフトTTL）
+        stale_ttl_minutes: 古いデータを返してよい期間（分、ハードTTL）
+        schedule_refresh: 古いデータのバックグラウンド更新の登録関数（省略時はスレッドプールで実行）
+        
+    Returns:
+        Dict[str, Optional[Dict[str, Any]]]: キャッシュキーごとの天気情報（取得失敗時はNone）
+    """
+    if schedule_refresh is None:
+        schedule_refresh = _refresh_executor.submit
+    
+    lookup_stale_ttl, upstream_available = _serving_stale_ttl(stale_ttl_minutes)
+    entries = get_cached_weather_entries(db, points, cache_duration_minutes, lookup_stale_ttl)
+    
+    results = {}
+    # キャッシュミスと古いデータを地点（バケット）ごとにまとめる
+    missing = {}
+    stale = {}
+    for lat, lon, date in points:
+        cache_key = generate_cache_key(lat, lon, date)
+        if cache_key in results:
+            continue
+        entry = entries.get(cache_key)
+        if entry is not None:
+            weather_data, is_stale = entry
+            results[cache_key] = weather_data
+            if is_stale and upstream_available:
+                location = stale.setdefault(location_bucket(lat, lon), (lat, lon, []))
+                if date not in location[2]:
+                    location[2].append(date)
+            continue
+        results[cache_key] = None
+        location = missing.setdefault(location_bucket(lat, lon), (lat, lon, []))
+        if date not in location[2]:
+            location[2].append(date)
+    
+    # 古いデータは地点ごとに1回の更新を登録（上流を呼び出せない間は登録しない）
+    for lat, lon, dates in stale.values():
+        schedule_refresh(
+            refresh_cached_weather_many,
+            lat,
+            lon,
+            dates,
+            fetch_location,
+            cache_duration_minutes,
+            stale_ttl_minutes
+        )
+    
+    # 地点ごとの上流取得を並列に実行
+    futures = {
+        _fetch_executor.submit(fetch_location, lat, lon, dates): (lat, lon, dates)
+        for lat, lon, dates in missing.values()
+    }
+    to_store = []
+    for future, (lat, lon, dates) in futures.items():
+        try:
+            weather_by_date = future.result() or {}
+        except Exception as e:
+            print(f"[weather_cache_service] 天気情報の一括取得失敗 ({lat}, {lon}): {e}")
+            continue
+        for date in dates:
+            weather_data = weather_by_date.get(date)
+            results[generate_cache_key(lat, lon, date)] = weather_data
+            if weather_data and not weather_data.get("degraded"):
+                to_store.append((lat, lon, date, weather_data))
+    
+    # 取得できた分はまとめて1文でupsert
+    set_cached_weather_many(db, to_store, stale_ttl_minutes=stale_ttl_minutes)
+    return results
 
 def clear_expired_cache(db: Session, cache_duration_minutes: int = 15) -> int:
     """
-    有効期限切れのキャッシュを削除
+    有効期限切れのキャッシュを削除（created_atのインデックスを使った一括DELETE）
     
     Args:
         db: データベースセッション
@@ -103,20 +869,16 @@ def clear_expired_cache(db: Session, cache_duration_minutes: int = 15) -> int:
     """
     cutoff_time = datetime.now() - timedelta(minutes=cache_duration_minutes)
     
-    expired_caches = db.query(WeatherCache).filter(
+    count = db.query(WeatherCache).filter(
         WeatherCache.created_at < cutoff_time
-    ).all()
-    
-    count = len(expired_caches)
-    for cache in expired_caches:
-        db.delete(cache)
+    ).delete(synchronize_session=False)
     
     db.commit()
     return count
 
 def clear_old_date_cache(db: Session, days_to_keep: int = 7) -> int:
     """
-    古い日付のキャッシュを削除
+    古い日付のキャッシュを削除（created_atのインデックスを使った一括DELETE）
     
     Args:
         db: データベースセッション
@@ -127,20 +889,16 @@ def clear_old_date_cache(db: Session, days_to_keep: int = 7) -> int:
     """
     cutoff_date = datetime.now().date() - timedelta(days=days_to_keep)
     
-    old_caches = db.query(WeatherCache).filter(
+    count = db.query(WeatherCache).filter(
         WeatherCache.created_at < cutoff_date
-    ).all()
-    
-    count = len(old_caches)
-    for cache in old_caches:
-        db.delete(cache)
+    ).delete(synchronize_session=False)
     
     db.commit()
     return count
 
 def limit_cache_size(db: Session, max_cache_size: int = 1000) -> int:
     """
-    キャッシュサイズを制限する（古いものから削除）
+    キャッシュサイズを制限する（古いものから一括削除）
     
     Args:
         db: データベースセッション
@@ -149,24 +907,19 @@ def limit_cache_size(db: Session, max_cache_size: int = 1000) -> int:
     Returns:
         int: 削除されたキャッシュ数
     """
-    total_caches = db.query(WeatherCache).count()
-    
-    if total_caches <= max_cache_size:
-        return 0
+    # 新しい順にmax_cache_size件を残し、それ以降のIDをまとめて削除
+    overflow_ids = db.query(WeatherCache.id).order_by(
+        WeatherCache.created_at.desc()
+    ).offset(max_cache_size).subquery()
     
-    # 古いものから削除
-    caches_to_delete = db.query(WeatherCache).order_by(
-        WeatherCache.created_at.asc()
-    ).limit(total_caches - max_cache_size).all()
-    
-    count = len(caches_to_delete)
-    for cache in caches_to_delete:
-        db.delete(cache)
+    count = db.query(WeatherCache).filter(
+        WeatherCache.id.in_(db.query(overflow_ids.c.id))
+    ).delete(synchronize_session=False)
     
     db.commit()
     return count
 
-def cleanup_cache(db: Session, cache_duration_minutes: int = 15, days_to_keep: int = 7, max_cache_size: int = 1000) -> Dict[str, int]:
+def cleanup_cache(db: Session, cache_duration_minutes: int = 15, days_to_keep: int = 7, max_cache_size: int = 1000) -> Dict[str, Any]:
     """
     包括的なキャッシュクリーンアップを実行
     
@@ -177,15 +930,100 @@ def cleanup_cache(db: Session, cache_duration_minutes: int = 15, days_to_keep: i
         max_cache_size: 最大キャッシュ数
         
     Returns:
-        Dict[str, int]: 削除されたキャッシュ数の詳細
+        Dict[str, Any]: 削除されたキャッシュ数と各処理の所要時間（ミリ秒）
     """
+    timings = {}
+    
+    started = time.perf_counter()
     expired_count = clear_expired_cache(db, cache_duration_minutes)
+    timings["expired"] = round((time.perf_counter() - started) * 1000, 2)
+    
+    started = time.perf_counter()
     old_date_count = clear_old_date_cache(db, days_to_keep)
+    timings["old_date"] = round((time.perf_counter() - started) * 1000, 2)
+    
+    started = time.perf_counter()
     size_limit_count = limit_cache_size(db, max_cache_size)
+    timings["size_limit"] = round((time.perf_counter() - started) * 1000, 2)
     
     return {
         "expired": expired_count,
         "old_date": old_date_count,
         "size_limit": size_limit_count,
-        "total": expired_count + old_date_count + size_limit_count
-    } 
\ No newline at end of file
+        "total": expired_count + old_date_count + size_limit_count,
+        "duration_ms": timings
+    }
+
+def run_cache_maintenance() -> Dict[str, Any]:
+    """
+    定期メンテナンスジョブとしてキャッシュクリーンアップを実行
+    リクエスト処理とは別に、専用のセッションで実行する
+    
+    Returns:
+        Dict[str, Any]: cleanup_cacheの結果
+    """
+    db = SessionLocal()
+    try:
+        result = cleanup_cache(
+            db,
+            # 古いデータとして返せる期間（ハードTTL、予報データ・上流障害時はより長い）までは残す
+            cache_duration_minutes=max(
+                DEFAULT_STALE_TTL_MINUTES,
+                WEATHER_FORECAST_STALE_TTL_MINUTES,
+                WEATHER_OUTAGE_STALE_TTL_MINUTES
+            ),
+            days_to_keep=7,
+            max_cache_size=WEATHER_CACHE_MAX_ROWS
+        )
+        print(f"[Weather Cache Cleanup] 削除されたキャッシュ: {result}")
+        return result
+    finally:
+        db.close()
+
+def get_memory_cache_stats() -> Dict[str, Any]:
+    """
+    プロセス内キャッシュ（L1）の統計情報を取得
+    
+    Returns:
+        Dict[str, Any]: ヒット数・ミス数・削除数などの統計情報
+    """
+    return weather_memory_cache.stats()
+
+def get_single_flight_stats() -> Dict[str, Any]:
+    """
+    キャッシュミス時の取得合流の統計情報を取得
+    
+    Returns:
+        Dict[str, Any]: 実行回数・結果共有回数・合流方式（asyncは非同期ハンドラ分）
+    """
+    return {
+        "mode": WEATHER_CACHE_LOCK_MODE,
+        **weather_single_flight.stats(),
+        "async": weather_async_single_flight.stats()
+    }
+
+def get_upstream_stats() -> Dict[str, Any]:
+    """
+    上流APIの呼び出し予算・サーキットブレーカーの統計情報を取得
+    
+    Returns:
+        Dict[str, Any]: 予算の使用状況・ブレーカーの状態・呼び出し先ごとの成功/失敗/拒否数
+    """
+    return weather_upstream_guard.stats()
+
+def get_bucket_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    バケット設定（バケットサイズ）ごとのキャッシュヒット率を取得
+    
+    Returns:
+        Dict[str, Dict[str, Any]]: ラベル（例: "grid:0.01"）ごとのヒット数・ミス数・ヒット率
+    """
+    with _bucket_stats_lock:
+        result = {}
+        for label, counters in _bucket_stats.items():
+            lookups = counters["hits"] + counters["misses"]
+            result[label] = {
+                **counters,
+                "hit_ratio": (counters["hits"] / lookups) if lookups else 0.0
+            }
+        return result
@@ -0,0 +1,230 @@
+"""
+天気リクエストコンテキスト
+1回の天気リクエスト内で外部APIの取得結果を共有し、同じデータの重複取得を防ぐ
+"""
+
+import asyncio
+from datetime import date, datetime
+from typing import Any, Dict, Optional, List, Tuple
+
+from app.services.weather_service import (
+    get_weather_by_latlon,
+    get_weather_forecast_by_latlon,
+    get_history_rainfall_until_now,
+    get_accurate_daily_rainfall_with_status,
+    sum_forecast_rainfall,
+    get_forecast_pop,
+    simplify_weather_description
+)
+from app.services import weather_service_async
+from app.services.forecast_frame import ForecastFrame
+from app.services.forecast_service import build_daily_forecast
+
+# 未取得を表す番兵（取得失敗のNoneと区別するため）
+_UNSET = object()
+
+class WeatherContext:
+    """
+    リクエストスコープの天気データコンテキスト
+
+    現在の天気・予報・History APIの実績はそれぞれ最初に参照されたときに1回だけ取得し、
+    降雨量・降水確率・天気説明などの派生計算はすべて取得済みのデータから行う。
+    """
+
+    def __init__(self, lat: float, lon: float, api_key: str, now: Optional[datetime] = None):
+        """
+        Args:
+            lat: 緯度
+            lon: 経度
+            api_key: OpenWeatherMap APIキー
+            now: 基準時刻（デフォルトは現在時刻）
+        """
+        self.lat = lat
+        self.lon = lon
+        self.api_key = api_key
+        self.now = now or datetime.now()
+        self._current = _UNSET
+        self._forecast = _UNSET
+        self._history = _UNSET
+        self._forecast_frame = None
+
+    @property
+    def current(self) -> Optional[dict]:
+        """現在の天気情報（取得失敗時はNone）"""
+        if self._current is _UNSET:
+            self._current = get_weather_by_latlon(self.lat, self.lon, self.api_key)
+        return self._current
+
+    @property
+    def forecast(self) -> Optional[List[dict]]:
+        """5日間3時間ごとの予報データ（取得失敗時はNone）"""
+        if self._forecast is _UNSET:
+            self._forecast = get_weather_forecast_by_latlon(self.lat, self.lon, self.api_key)
+        return self._forecast
+
+    @property
+    def forecast_frame(self) -> ForecastFrame:
+        """予報データの列指向表現（予報データ1件につき1回だけ変換する）"""
+        if self._forecast_frame is None:
+            self._forecast_frame = ForecastFrame(self.forecast)
+        return self._forecast_frame
+
+    @property
+    def history_rainfall(self) -> Tuple[float, bool]:
+        """今日の0時から現在時刻までの実績降雨量と欠損フラグ"""
+        if self._history is _UNSET:
+            self._history = get_history_rainfall_until_now(self.lat, self.lon, self.api_key, now=self.now)
+        return self._history
+
+    def daily_rainfall(self, target_date: Optional[date] = None) -> float:
+        """
+        予報データから指定日の累積降雨量を計算
+
+        Args:
+            target_date: 対象日（デフォルトは今日）
+
+        Returns:
+            float: 累積降雨量（mm）
+        """
+        return sum_forecast_rainfall(self.forecast_frame, target_date or self.now.date())
+
+    def today_rainfall_until_now(self) -> float:
+        """
+        予報データから今日の現在時刻までの累積降雨量を計算
+
+        Returns:
+            float: 累積降雨量（mm）
+        """
+        return sum_forecast_rainfall(self.forecast_frame, self.now.date(), until=self.now)
+
+    def accurate_daily_rainfall(self) -> Tuple[float, bool]:
+        """
+        実績データと予報データを組み合わせた今日の累積降雨量を計算
+
+        Returns:
+            Tuple[float, bool]: (累積降雨量（mm）, 一部データが欠損したかどうか)
+        """
+        return get_accurate_daily_rainfall_with_status(
+            self.lat,
+            self.lon,
+            self.api_key,
+            forecast_data=self.forecast_frame,
+            history_rainfall=self.history_rainfall,
+            now=self.now
+        )
+
+    def pop(self, target_date: Optional[date] = None) -> float:
+        """
+        予報データから指定日の降水確率を取得
+
+        Args:
+            target_date: 対象日（デフォルトは今日）
+
+        Returns:
+            float: 降水確率（%）
+        """
+        return get_forecast_pop(self.forecast_frame, target_date or self.now.date())
+
+    def weather_description(self) -> str:
+        """
+        現在の天気説明（OpenWeatherMapの原文）を取得
+
+        Returns:
+            str: 天気説明、取得できない場合は「不明」
+        """
+        current = self.current or {}
+        return current.get("weather", [{}])[0].get("description", "不明")
+
+    def build_weather_data(self, date_str: str) -> Optional[Dict[str, Any]]:
+        """
+        取得済みの上流データから天気情報（/api/weatherのレスポンス形式）を組み立てる
+
+        Args:
+            date_str: 日付（YYYY-MM-DD形式、キャッシュキーとレスポンスに使用）
+
+        Returns:
+            Optional[Dict[str, Any]]: 天気情報、現在の天気の取得に失敗した場合はNone
+        """
+        current_weather = self.current
+        if not current_weather:
+            return None
+
+        # 今日の累積降雨量を取得（より正確な計算、History APIは並列取得）
+        rain_mm, degraded = self.accurate_daily_rainfall()
+
+        return {
+            "date": date_str,
+            "weather": simplify_weather_description(self.weather_description()),
+            "rain_mm": rain_mm,
+            "pop": self.pop(),
+            "temperature": current_weather.get("main", {}).get("temp"),
+            "humidity": current_weather.get("main", {}).get("humidity"),
+            "icon": current_weather.get("weather", [{}])[0].get("icon"),
+            "degraded": degraded
+        }
+
+    def build_weather_data_for_date(self, date_str: str) -> Optional[Dict[str, Any]]:
+        """
+        指定日の天気情報（/api/weatherのレスポンス形式）を組み立てる
+        明日以降はその日の予報の日別集計（/api/weather/forecastと同じ値）、今日までは build_weather_data の値
+        （/api/weatherと一括取得は同じキャッシュキーを使うため、どちらも必ずこのメソッドで組み立てる）
+
+        Args:
+            date_str: 日付（YYYY-MM-DD形式）
+
+        Returns:
+            Optional[Dict[str, Any]]: 天気情報、予報の範囲外または取得に失敗した場合はNone
+        """
+        if date.fromisoformat(date_str) <= self.now.date():
+            return self.build_weather_data(date_str)
+        if not self.forecast:
+            return None
+        daily = build_daily_forecast(self.forecast_frame, 1, start_date=date.fromisoformat(date_str))
+        if not daily or daily[0]["date"] != date_str:
+            return None
+        return daily[0]
+
+class AsyncWeatherContext(WeatherContext):
+    """
+    非同期版のリクエストスコープ天気データコンテキスト
+
+    現在の天気・予報・History APIの実績をイベントループ上で同時に取得してから、
+    派生計算はWeatherContextと同じく取得済みのデータから行う。
+    """
+
+    async def load(self) -> None:
+        """未取得の上流データを同時に取得する"""
+        async def keep(value):
+            return value
+
+        current, forecast, history = await asyncio.gather(
+            weather_service_async.get_weather_by_latlon(self.lat, self.lon, self.api_key)
+            if self._current is _UNSET else keep(self._current),
+            weather_service_async.get_weather_forecast_by_latlon(self.lat, self.lon, self.api_key)
+            if self._forecast is _UNSET else keep(self._forecast),
+            weather_service_async.get_history_rainfall_until_now(self.lat, self.lon, self.api_key, now=self.now)
+            if self._history is _UNSET else keep(self._history)
+        )
+        self._current = current
+        self._forecast = forecast
+        self._history = history
+
+    async def build_weather_data_async(self, date_str: str) -> Optional[Dict[str, Any]]:
+        """
+        上流データを同時に取得して天気情報（/api/weatherのレスポンス形式）を組み立てる
+        明日以降は予報だけを取得し、build_weather_data_for_date と同じ値を返す
+
+        Args:
+            date_str: 日付（YYYY-MM-DD形式、キャッシュキーとレスポンスに使用）
+
+        Returns:
+            Optional[Dict[str, Any]]: 天気情報、予報の範囲外または取得に失敗した場合はNone
+        """
+        if date.fromisoformat(date_str) > self.now.date():
+            if self._forecast is _UNSET:
+                self._forecast = await weather_service_async.get_weather_forecast_by_latlon(
+                    self.lat, self.lon, self.api_key
+                )
+            return self.build_weather_data_for_date(date_str)
+        await self.load()
+        return self.build_weather_data(date_str)
@@ -0,0 +1,120 @@
+"""
+天気情報プリフェッチサービス
+当番予定のある畑の天気情報を、利用者がアクセスする前にキャッシュへ取得しておく
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Dict
+
+from app.database import SessionLocal
+from app.models import Field as FieldModel, Schedule as ScheduleModel
+from app.services.upstream_guard import weather_upstream_guard
+from app.services.weather_context import WeatherContext
+from app.services.weather_cache_service import generate_cache_key, get_cached_weather_entries, refresh_cached_weather
+
+# プリフェッチの実行間隔（分）
+WEATHER_PREFETCH_INTERVAL_MINUTES = int(os.getenv("WEATHER_PREFETCH_INTERVAL_MINUTES", "10"))
+# 何日先までの当番予定を対象にするか（今日から当番予定の日までの天気を取得する）
+WEATHER_PREFETCH_DAYS_AHEAD = int(os.getenv("WEATHER_PREFETCH_DAYS_AHEAD", "1"))
+# ソフトTTL切れまでの残りがこの時間（分）以内のエントリだけを更新する
+WEATHER_PREFETCH_REFRESH_AHEAD_MINUTES = int(os.getenv("WEATHER_PREFETCH_REFRESH_AHEAD_MINUTES", "3"))
+# 1回の実行で使う上流APIの呼び出し回数の上限（WEATHER_QUOTA_PER_MINUTEに対する割合）。
+# ユーザーのリクエストと共有する予算を使い切らないよう、残りは次回以降の実行に回す
+WEATHER_PREFETCH_QUOTA_SHARE = float(os.getenv("WEATHER_PREFETCH_QUOTA_SHARE", "0.25"))
+
+# /api/weather と同じキャッシュ期間（分）
+CACHE_DURATION_MINUTES = 15
+STALE_TTL_MINUTES = 60
+
+# 1地点の取得で呼び出す上流APIの回数の見積もり
+# 今日の分は現在の天気・予報・History API（3時間ごと最大8回）、明日以降は予報のみ（今日の分と共有）
+CALLS_WITH_TODAY = 10
+CALLS_FORECAST_ONLY = 1
+
+def prefetch_scheduled_weather() -> Dict[str, int]:
+    """
+    当番予定のある畑の今日から当番予定の日までの天気情報をキャッシュに取得
+    キャッシュにないエントリと、ソフトTTL切れが近いエントリだけを更新する
+    上流APIを呼び出せない間や、1回の実行の呼び出し上限に達した場合は次回の実行に回す
+
+    Returns:
+        Dict[str, int]: 対象地点数・更新数・スキップ数・取得失敗数・次回に回した地点数
+    """
+    result = {"locations": 0, "refreshed": 0, "skipped": 0, "failed": 0, "deferred": 0}
+    api_key = os.environ.get("WEATHER_API_KEY")
+    if not api_key:
+        return result
+
+    today = datetime.now().date()
+    today_str = today.isoformat()
+    # 上流を呼び出すかどうかは、ソフトTTLを前倒しした鮮度で判定する
+    refresh_duration_minutes = max(1, CACHE_DURATION_MINUTES - WEATHER_PREFETCH_REFRESH_AHEAD_MINUTES)
+    per_minute = weather_upstream_guard.budget.per_minute
+    max_calls = max(CALLS_WITH_TODAY, int(per_minute * WEATHER_PREFETCH_QUOTA_SHARE)) if per_minute else None
+
+    db = SessionLocal()
+    try:
+        rows = db.query(FieldModel.latitude, FieldModel.longitude, ScheduleModel.date).join(
+            ScheduleModel, ScheduleModel.field_id == FieldModel.id
+        ).filter(
+            ScheduleModel.date >= today,
+            ScheduleModel.date <= today + timedelta(days=WEATHER_PREFETCH_DAYS_AHEAD),
+            FieldModel.latitude.isnot(None),
+            FieldModel.longitude.isnot(None)
+        ).distinct().all()
+
+        # 同じバケットに属する畑は1回の取得でまとめて賄う（当番予定の日ごとに対象日を集める）
+        locations = {}
+        for lat, lon, schedule_date in rows:
+            key = generate_cache_key(lat, lon, today_str)
+            _, _, dates = locations.setdefault(key, (lat, lon, set()))
+            dates.add(schedule_date.isoformat())
+        result["locations"] = len(locations)
+
+        points = [(lat, lon, date_str) for lat, lon, dates in locations.values() for date_str in dates]
+        entries = get_cached_weather_entries(db, points, refresh_duration_minutes, STALE_TTL_MINUTES)
+    finally:
+        db.close()
+
+    targets = []
+    for lat, lon, dates in locations.values():
+        stale_dates = []
+        for date_str in sorted(dates):
+            entry = entries.get(generate_cache_key(lat, lon, date_str))
+            if entry is not None and not entry[1]:
+                result["skipped"] += 1
+            else:
+                stale_dates.append(date_str)
+        if stale_dates:
+            targets.append((lat, lon, stale_dates))
+    # 今日の分を含む地点から先に取得する
+    targets.sort(key=lambda target: target[2][0])
+
+    calls = 0
+    for index, (lat, lon, stale_dates) in enumerate(targets):
+        cost = CALLS_WITH_TODAY if stale_dates[0] == today_str else CALLS_FORECAST_ONLY
+        if max_calls is not None and calls + cost > max_calls:
+            result["deferred"] = len(targets) - index
+            break
+        if not weather_upstream_guard.available():
+            print("[weather_prefetch] 上流APIを呼び出せないためプリフェッチを中断します")
+            result["deferred"] = len(targets) - index
+            break
+        calls += cost
+        # 1地点の予報・現在の天気は日付間で共有し、日付ごとの取得は同時リクエストと1回にまとめる
+        ctx = WeatherContext(lat, lon, api_key)
+        for date_str in stale_dates:
+            if refresh_cached_weather(
+                lat,
+                lon,
+                date_str,
+                lambda date_str=date_str: ctx.build_weather_data_for_date(date_str),
+                refresh_duration_minutes,
+                STALE_TTL_MINUTES
+            ):
+                result["refreshed"] += 1
+            else:
+                result["failed"] += 1
+
+    return result
@@ -0,0 +1,282 @@
+"""
+天気データ提供元
+weather_serviceが呼び出す上流（OpenWeatherMap）を切り替え可能にする
+負荷試験・ベンチマーク用に、記録済みの応答を返すリプレイ提供元を持つ
+"""
+
+import asyncio
+import copy
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app.core.http_client import get_http_client, get_async_http_client
+
+# OpenWeatherMap API エンドポイント
+OPENWEATHERMAP_URL = "https://api.openweathermap.org/data/2.5/weather"
+OPENWEATHERMAP_FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
+OPENWEATHERMAP_HISTORY_URL = "https://api.openweathermap.org/data/2.5/onecall/timemachine"
+
+# 使用する提供元（openweathermap / replay）
+WEATHER_PROVIDER = os.getenv("WEATHER_PROVIDER", "openweathermap")
+# リプレイ提供元の設定
+# 記録済み応答のディレクトリ（current.json / forecast.json / timemachine.json）
+WEATHER_REPLAY_DIR = os.getenv(
+    "WEATHER_REPLAY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "weather_replay")
+)
+# 応答までの待ち時間（ミリ秒）とその揺らぎの上限（ミリ秒）
+WEATHER_REPLAY_LATENCY_MS = float(os.getenv("WEATHER_REPLAY_LATENCY_MS", "0"))
+WEATHER_REPLAY_JITTER_MS = float(os.getenv("WEATHER_REPLAY_JITTER_MS", "0"))
+# エラー応答を返す割合（0-1）と、そのときのHTTPステータス
+WEATHER_REPLAY_ERROR_RATE = float(os.getenv("WEATHER_REPLAY_ERROR_RATE", "0"))
+WEATHER_REPLAY_ERROR_STATUS = int(os.getenv("WEATHER_REPLAY_ERROR_STATUS", "503"))
+# 待ち時間・エラーの乱数シード（同じシードなら同じ順序で再現する）
+WEATHER_REPLAY_SEED = int(os.getenv("WEATHER_REPLAY_SEED", "0"))
+
+# 取得する天気データの種類
+KIND_CURRENT = "current"
+KIND_FORECAST = "forecast"
+KIND_TIMEMACHINE = "timemachine"
+
+class WeatherProviderError(Exception):
+    """提供元がエラー応答を返した場合の例外"""
+
+    def __init__(self, status_code: int, message: str):
+        """
+        Args:
+            status_code: HTTPステータス
+            message: エラー内容
+        """
+        super().__init__(f"{status_code} {message}")
+        self.status_code = status_code
+
+class WeatherProvider:
+    """
+    天気データ提供元の基底クラス
+
+    OpenWeatherMapと同じ形式の応答（dict）を返し、失敗時は例外を送出する。
+    paramsはOpenWeatherMapのクエリパラメータ（lat / lon / appid / units / lang、timemachineはdtも含む）。
+    """
+
+    # WEATHER_PROVIDERで指定する識別名
+    name = ""
+
+    def fetch(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        天気データを取得
+
+        Args:
+            kind: 取得する種類（current / forecast / timemachine）
+            params: クエリパラメータ
+
+        Returns:
+            Dict[str, Any]: 応答データ
+
+        Raises:
+            Exception: 取得に失敗した場合
+        """
+        raise NotImplementedError
+
+    async def fetch_async(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        天気データを取得（非同期版）
+
+        Args:
+            kind: 取得する種類（current / forecast / timemachine）
+            params: クエリパラメータ
+
+        Returns:
+            Dict[str, Any]: 応答データ
+
+        Raises:
+            Exception: 取得に失敗した場合
+        """
+        raise NotImplementedError
+
+class OpenWeatherMapProvider(WeatherProvider):
+    """OpenWeatherMap API（共有HTTPクライアント経由）"""
+
+    name = "openweathermap"
+
+    URLS = {
+        KIND_CURRENT: OPENWEATHERMAP_URL,
+        KIND_FORECAST: OPENWEATHERMAP_FORECAST_URL,
+        KIND_TIMEMACHINE: OPENWEATHERMAP_HISTORY_URL
+    }
+
+    def fetch(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        # 再試行は呼び出し回数の予算に数えられないため、上流保護のもとで1回だけ呼び出す
+        resp = get_http_client().get(self.URLS[kind], params=params, retry=False)
+        if resp.status_code != 200:
+            raise WeatherProviderError(resp.status_code, f"{kind} 応答異常")
+        return resp.json()
+
+    async def fetch_async(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        resp = await get_async_http_client().get(self.URLS[kind], params=params, retry=False)
+        if resp.status_code != 200:
+            raise WeatherProviderError(resp.status_code, f"{kind} 応答異常")
+        return resp.json()
+
+class ReplayWeatherProvider(WeatherProvider):
+    """
+    記録済みの応答を返す提供元（負荷試験・ベンチマーク用）
+
+    ディレクトリ内の {kind}.json を読み込み、時刻を現在に合わせて返す。
+    ファイルの中身が応答の一覧の場合は、緯度経度から決まる1件を返す（同じ地点には常に同じ応答）。
+    待ち時間とエラー応答はシード付きの乱数で注入し、実行ごとに同じ順序で再現する。
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        replay_dir: str = WEATHER_REPLAY_DIR,
+        latency_ms: float = WEATHER_REPLAY_LATENCY_MS,
+        jitter_ms: float = WEATHER_REPLAY_JITTER_MS,
+        error_rate: float = WEATHER_REPLAY_ERROR_RATE,
+        error_status: int = WEATHER_REPLAY_ERROR_STATUS,
+        seed: int = WEATHER_REPLAY_SEED
+    ):
+        """
+        Args:
+            replay_dir: 記録済み応答のディレクトリ
+            latency_ms: 応答までの待ち時間（ミリ秒）
+            jitter_ms: 待ち時間の揺らぎの上限（ミリ秒）
+            error_rate: エラー応答を返す割合（0-1）
+            error_status: エラー応答のHTTPステータス
+            seed: 乱数シード
+
+        Raises:
+            FileNotFoundError: 記録済み応答のファイルがない場合
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._recordings: Dict[str, Any] = {}
+        for kind in (KIND_CURRENT, KIND_FORECAST, KIND_TIMEMACHINE):
+            with open(os.path.join(replay_dir, f"{kind}.json"), "r", encoding="utf-8") as f:
+                self._recordings[kind] = json.load(f)
+
+    def _draw(self) -> tuple:
+        """この呼び出しの待ち時間（秒）とエラーにするかどうかを決める"""
+        with self._random_lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+        return (self.latency_ms + jitter) / 1000, fail
+
+    def _select(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """記録済み応答から1件を選ぶ（一覧の場合は緯度経度で決める）"""
+        recording = self._recordings[kind]
+        if isinstance(recording, list):
+            location = f"{float(params['lat']):.2f},{float(params['lon']):.2f}".encode("utf-8")
+            recording = recording[zlib.crc32(location) % len(recording)]
+        return copy.deepcopy(recording)
+
+    def _respond(self, kind: str, params: Dict[str, Any], fail: bool) -> Dict[str, Any]:
+        """記録済み応答の時刻を現在に合わせて返す"""
+        if fail:
+            raise WeatherProviderError(self.error_status, f"{kind} 注入されたエラー")
+        data = self._select(kind, params)
+        now = datetime.now()
+        if kind == KIND_CURRENT:
+            data["dt"] = int(now.timestamp())
+        elif kind == KIND_FORECAST:
+            _rebase_forecast(data.get("list", []), now)
+        elif kind == KIND_TIMEMACHINE:
+            requested = int(params.get("dt") or now.timestamp())
+            for offset, hourly in enumerate(data.get("hourly", [])):
+                hourly["dt"] = requested + offset * 3600
+        return data
+
+    def fetch(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        delay, fail = self._draw()
+        if delay > 0:
+            time.sleep(delay)
+        return self._respond(kind, params, fail)
+
+    async def fetch_async(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        delay, fail = self._draw()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self._respond(kind, params, fail)
+
+def _rebase_forecast(forecast_list: list, now: datetime) -> None:
+    """
+    記録済みの予報データの時刻を、最初の予報枠が現在の3時間枠になるようにずらす
+    3時間単位でずらすため、予報枠の時刻（0時・3時・…）の並びは変わらない
+
+    Args:
+        forecast_list: 予報データ一覧（その場で書き換える）
+        now: 基準時刻
+    """
+    if not forecast_list or not forecast_list[0].get("dt_txt"):
+        return
+    first = datetime.fromisoformat(forecast_list[0]["dt_txt"])
+    target = now.replace(hour=now.hour - now.hour % 3, minute=0, second=0, microsecond=0)
+    shift = timedelta(hours=round((target - first).total_seconds() / 3600 / 3) * 3)
+    for item in forecast_list:
+        if item.get("dt_txt"):
+            item["dt_txt"] = (datetime.fromisoformat(item["dt_txt"]) + shift).strftime("%Y-%m-%d %H:%M:%S")
+        if "dt" in item:
+            item["dt"] = int(item["dt"] + shift.total_seconds())
+
+_PROVIDER_CLASSES = {
+    OpenWeatherMapProvider.name: OpenWeatherMapProvider,
+    ReplayWeatherProvider.name: ReplayWeatherProvider
+}
+
+_provider: Optional[WeatherProvider] = None
+_provider_lock = threading.Lock()
+
+def create_weather_provider(name: str) -> WeatherProvider:
+    """
+    識別名から提供元を生成
+
+    Args:
+        name: 提供元の識別名（openweathermap / replay）
+
+    Returns:
+        WeatherProvider: 提供元
+
+    Raises:
+        ValueError: 未知の識別名の場合
+    """
+    provider_class = _PROVIDER_CLASSES.get(name)
+    if provider_class is None:
+        raise ValueError(f"使用できない天気データ提供元です: {name}")
+    return provider_class()
+
+def get_weather_provider() -> WeatherProvider:
+    """
+    使用中の提供元を取得（初回はWEATHER_PROVIDERから生成）
+
+    Returns:
+        WeatherProvider: 提供元
+    """
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = create_weather_provider(WEATHER_PROVIDER)
+                print(f"[weather_provider] 天気データ提供元: {_provider.name}")
+    return _provider
+
+def set_weather_provider(provider: Optional[WeatherProvider]) -> None:
+    """
+    使用する提供元を差し替える（ベンチマークなどから使う。NoneならWEATHER_PROVIDERに戻す）
+
+    Args:
+        provider: 提供元
+    """
+    global _provider
+    with _provider_lock:
+        _provider = provider
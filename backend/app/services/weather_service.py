@@ -1,18 +1,87 @@
 """
 天気サービス
 OpenWeatherMap APIを使用した天気情報取得サービス
+上流への通信は天気データ提供元（weather_provider）を経由し、WEATHER_PROVIDERで切り替えられる
 """
 
-import requests
-from typing import Optional, List
+from typing import Optional, List, Tuple, Union
 import os
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta
 
-# OpenWeatherMap API エンドポイント
-OPENWEATHERMAP_URL = "https://api.openweathermap.org/data/2.5/weather"
-OPENWEATHERMAP_FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
-OPENWEATHERMAP_HISTORY_URL = "https://api.openweathermap.org/data/2.5/onecall/timemachine"
+from app.services.forecast_frame import ForecastFrame
+from app.services.upstream_guard import weather_upstream_guard
+from app.services.weather_provider import (
+    get_weather_provider,
+    KIND_CURRENT,
+    KIND_FORECAST,
+    KIND_TIMEMACHINE
+)
 
+# History API 並列取得の設定
+# 1日分（最大8スロット）を同時に投げられるだけのワーカー数を確保する
+HISTORY_FETCH_MAX_WORKERS = int(os.getenv("WEATHER_HISTORY_MAX_WORKERS", "16"))
+# 1リクエスト内の全スロット取得の締め切り（秒）
+HISTORY_FETCH_DEADLINE_SECONDS = float(os.getenv("WEATHER_HISTORY_DEADLINE_SECONDS", "6"))
+
+_history_executor = ThreadPoolExecutor(
+    max_workers=HISTORY_FETCH_MAX_WORKERS,
+    thread_name_prefix="weather-history"
+)
+
+def simplify_weather_description(description: str) -> str:
+    """
+    OpenWeatherMapの天気説明を簡潔な一言に変換
+    
+    Args:
+        description: OpenWeatherMapの天気説明
+        
+    Returns:
+        str: 簡潔な天気説明
+    """
+    weather_map = {
+        # 晴れ系
+        "晴れ": "晴れ",
+        "晴天": "晴れ",
+        "快晴": "晴れ",
+        # 曇り系
+        "曇り": "曇り",
+        "薄い雲": "曇り",
+        "厚い雲": "曇り",
+        "雲": "曇り",
+        # 雨系
+        "雨": "雨",
+        "小雨": "雨",
+        "大雨": "雨",
+        "にわか雨": "雨",
+        "霧雨": "雨",
+        "雷雨": "雷雨",
+        "雷": "雷雨",
+        # 雪系
+        "雪": "雪",
+        "小雪": "雪",
+        "大雪": "雪",
+        "みぞれ": "雪",
+        # 霧・もや系
+        "霧": "霧",
+        "もや": "霧",
+        # その他
+        "不明": "不明"
+    }
+    
+    # 完全一致を優先
+    if description in weather_map:
+        return weather_map[description]
+    
+    # 部分一致で判定
+    for key, value in weather_map.items():
+        if key in description:
+            return value
+    
+    # デフォルト
+    return "曇り" if "雲" in description else "晴れ"
+
+@weather_upstream_guard.guard("current")
 def get_weather_by_latlon(lat: float, lon: float, api_key: str) -> Optional[dict]:
     """
     現在の天気情報を取得（OpenWeatherMap）
@@ -33,13 +102,12 @@ def get_weather_by_latlon(lat: float, lon: float, api_key: str) -> Optional[dict
         "lang": "ja"
     }
     try:
-        resp = requests.get(OPENWEATHERMAP_URL, params=params, timeout=5)
-        resp.raise_for_status()
-        return resp.json()
+        return get_weather_provider().fetch(KIND_CURRENT, params)
     except Exception as e:
         print(f"[weather_service] 天気取得失敗: {e}")
         return None
 
+@weather_upstream_guard.guard("yesterday")
 def get_yesterday_weather(lat: float, lon: float, api_key: str) -> Optional[dict]:
     """
     前日の天気情報取得（OpenWeatherMap History API）
@@ -65,14 +133,42 @@ def get_yesterday_weather(lat: float, lon: float, api_key: str) -> Optional[dict
         "dt": yesterday_timestamp
     }
     try:
-        resp = requests.get(OPENWEATHERMAP_HISTORY_URL, params=params, timeout=5)
-        resp.raise_for_status()
-        data = resp.json()
-        return data
+        return get_weather_provider().fetch(KIND_TIMEMACHINE, params)
     except Exception as e:
         print(f"[weather_service] History API取得失敗: {e}")
         return None
 
+@weather_upstream_guard.guard("history")
+def get_history_weather_at(lat: float, lon: float, api_key: str, timestamp: int) -> Optional[dict]:
+    """
+    History APIから指定時刻の1時間ごとの実績を取得
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        api_key: OpenWeatherMap APIキー
+        timestamp: 対象時刻のUNIXタイムスタンプ
+
+    Returns:
+        dict: 指定時刻の実績（hourlyの先頭要素）、取得失敗時はNone
+    """
+    params = {
+        "lat": lat,
+        "lon": lon,
+        "appid": api_key,
+        "units": "metric",
+        "lang": "ja",
+        "dt": timestamp
+    }
+    try:
+        data = get_weather_provider().fetch(KIND_TIMEMACHINE, params)
+        hourly = data.get("hourly") or []
+        return hourly[0] if hourly else {}
+    except Exception as e:
+        print(f"[weather_service] History API取得失敗 (dt={timestamp}): {e}")
+        return None
+
+@weather_upstream_guard.guard("forecast")
 def get_weather_forecast_by_latlon(lat: float, lon: float, api_key: str) -> Optional[List[dict]]:
     """
     5日間3時間ごと予報を取得（OpenWeatherMap）
@@ -93,15 +189,56 @@ def get_weather_forecast_by_latlon(lat: float, lon: float, api_key: str) -> Opti
         "lang": "ja"
     }
     try:
-        resp = requests.get(OPENWEATHERMAP_FORECAST_URL, params=params, timeout=5)
-        resp.raise_for_status()
-        data = resp.json()
+        data = get_weather_provider().fetch(KIND_FORECAST, params)
         return data.get("list", [])
     except Exception as e:
         print(f"[weather_service] 予報取得失敗: {e}")
         return None
 
-def get_daily_rainfall(lat: float, lon: float, api_key: str, target_date: datetime = None) -> float:
+def sum_forecast_rainfall(
+    forecast_data: Union[ForecastFrame, List[dict], None],
+    target_date: date,
+    after: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> float:
+    """
+    予報データから指定日の3時間降雨量を合計
+    
+    Args:
+        forecast_data: 予報データ一覧（get_weather_forecast_by_latlonの戻り値）またはForecastFrame
+        target_date: 対象日
+        after: 指定時刻より後（この時刻を含まない）の予報のみ集計
+        until: 指定時刻まで（この時刻を含む）の予報のみ集計
+        
+    Returns:
+        float: 累積降雨量（mm）
+    """
+    if not forecast_data:
+        return 0.0
+    return ForecastFrame.of(forecast_data).daily_rainfall(target_date, after=after, until=until)
+
+def get_forecast_pop(forecast_data: Union[ForecastFrame, List[dict], None], target_date: date) -> float:
+    """
+    予報データから指定日の降水確率を取得（その日の最初の予報枠の値）
+    
+    Args:
+        forecast_data: 予報データ一覧またはForecastFrame
+        target_date: 対象日
+        
+    Returns:
+        float: 降水確率（%）、該当データがない場合は0.0
+    """
+    if not forecast_data:
+        return 0.0
+    return ForecastFrame.of(forecast_data).first_pop(target_date)
+
+def get_daily_rainfall(
+    lat: float,
+    lon: float,
+    api_key: str,
+    target_date: datetime = None,
+    forecast_data: Union[ForecastFrame, List[dict], None] = None
+) -> float:
     """
     指定日の累積降雨量を取得
     OpenWeatherMapの予報データから3時間ごとの降雨量を合計して計算
@@ -111,6 +248,7 @@ def get_daily_rainfall(lat: float, lon: float, api_key: str, target_date: dateti
         lon: 経度
         api_key: OpenWeatherMap APIキー
         target_date: 対象日（デフォルトは今日）
+        forecast_data: 取得済みの予報データ（省略時はAPIから取得）
         
     Returns:
         float: 累積降雨量（mm）
@@ -119,26 +257,18 @@ def get_daily_rainfall(lat: float, lon: float, api_key: str, target_date: dateti
         target_date = datetime.now()
     
     # 予報データを取得
-    forecast_data = get_weather_forecast_by_latlon(lat, lon, api_key)
-    if not forecast_data:
-        return 0.0
+    if forecast_data is None:
+        forecast_data = get_weather_forecast_by_latlon(lat, lon, api_key)
     
     # 指定日の降雨量を合計
-    daily_rainfall = 0.0
-    target_date_str = target_date.date().isoformat()
-    
-    for forecast in forecast_data:
-        dt_txt = forecast.get("dt_txt")
-        if dt_txt:
-            forecast_date = datetime.strptime(dt_txt, "%Y-%m-%d %H:%M:%S")
-            if forecast_date.date().isoformat() == target_date_str:
-                # 3時間の降雨量を取得
-                rain_3h = forecast.get("rain", {}).get("3h", 0.0) or 0.0
-                daily_rainfall += rain_3h
-    
-    return daily_rainfall
+    return sum_forecast_rainfall(forecast_data, target_date.date())
 
-def get_today_rainfall_until_now(lat: float, lon: float, api_key: str) -> float:
+def get_today_rainfall_until_now(
+    lat: float,
+    lon: float,
+    api_key: str,
+    forecast_data: Union[ForecastFrame, List[dict], None] = None
+) -> float:
     """
     今日の累積降雨量を取得（現在時刻まで）
     過去の実績データと予報データを組み合わせて計算
@@ -147,100 +277,158 @@ def get_today_rainfall_until_now(lat: float, lon: float, api_key: str) -> float:
         lat: 緯度
         lon: 経度
         api_key: OpenWeatherMap APIキー
+        forecast_data: 取得済みの予報データ（省略時はAPIから取得）
         
     Returns:
         float: 今日の累積降雨量（mm）
     """
     now = datetime.now()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     
     # 予報データを取得
-    forecast_data = get_weather_forecast_by_latlon(lat, lon, api_key)
-    if not forecast_data:
-        return 0.0
+    if forecast_data is None:
+        forecast_data = get_weather_forecast_by_latlon(lat, lon, api_key)
     
+    # 今日のデータで、現在時刻より前のデータのみカウント
+    return sum_forecast_rainfall(forecast_data, now.date(), until=now)
+
+def _fetch_history_slot_rainfall(lat: float, lon: float, api_key: str, timestamp: int) -> Optional[float]:
+    """
+    History APIから指定時刻の1時間降雨量を取得
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        api_key: OpenWeatherMap APIキー
+        timestamp: 対象時刻のUNIXタイムスタンプ
+
+    Returns:
+        float: 降雨量（mm）、取得失敗時はNone
+    """
+    hourly = get_history_weather_at(lat, lon, api_key, timestamp)
+    if hourly is None:
+        return None
+    return (hourly.get("rain") or {}).get("1h", 0.0) or 0.0
+
+def get_history_rainfall_until_now(
+    lat: float,
+    lon: float,
+    api_key: str,
+    now: Optional[datetime] = None,
+    concurrent: bool = True,
+    deadline_seconds: float = None
+) -> Tuple[float, bool]:
+    """
+    今日の0時から現在時刻までの実績降雨量をHistory APIから取得
+    3時間ごとの各スロットを並列に取得し、全体の締め切り時間を超えたスロットは集計から除外する
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        api_key: OpenWeatherMap APIキー
+        now: 基準時刻（デフォルトは現在時刻）
+        concurrent: Trueの場合はスレッドプールで並列取得、Falseの場合は逐次取得
+        deadline_seconds: 全スロット取得の締め切り時間（秒）
+
+    Returns:
+        Tuple[float, bool]: (実績降雨量（mm）, 一部スロットが欠損したかどうか)
+    """
+    if now is None:
+        now = datetime.now()
+    if deadline_seconds is None:
+        deadline_seconds = HISTORY_FETCH_DEADLINE_SECONDS
+
+    # 3時間ごとのスロットのタイムスタンプを計算
+    timestamps = [
+        int(now.replace(hour=hour, minute=0, second=0, microsecond=0).timestamp())
+        for hour in range(0, now.hour, 3)
+    ]
+    if not timestamps:
+        return 0.0, False
+
+    if not concurrent:
+        results = [_fetch_history_slot_rainfall(lat, lon, api_key, ts) for ts in timestamps]
+        degraded = any(r is None for r in results)
+        return sum(r for r in results if r is not None), degraded
+
+    # 全スロットを同時に投げ、締め切りまでに揃った分だけを合計する
+    futures = [
+        _history_executor.submit(_fetch_history_slot_rainfall, lat, lon, api_key, ts)
+        for ts in timestamps
+    ]
+    done, not_done = wait(futures, timeout=deadline_seconds)
+    for future in not_done:
+        future.cancel()
+
     total_rainfall = 0.0
-    today_str = now.date().isoformat()
-    
-    for forecast in forecast_data:
-        dt_txt = forecast.get("dt_txt")
-        if dt_txt:
-            forecast_time = datetime.strptime(dt_txt, "%Y-%m-%d %H:%M:%S")
-            
-            # 今日のデータのみ処理
-            if forecast_time.date().isoformat() == today_str:
-                # 現在時刻より前のデータのみカウント
-                if forecast_time <= now:
-                    rain_3h = forecast.get("rain", {}).get("3h", 0.0) or 0.0
-                    total_rainfall += rain_3h
-    
-    return total_rainfall
+    degraded = len(not_done) > 0
+    for future in done:
+        rain = future.result()
+        if rain is None:
+            degraded = True
+            continue
+        total_rainfall += rain
+
+    if not_done:
+        print(f"[weather_service] History API締め切り超過: {len(not_done)}/{len(futures)}スロット")
+
+    return total_rainfall, degraded
 
-def get_accurate_daily_rainfall(lat: float, lon: float, api_key: str) -> float:
+def get_accurate_daily_rainfall_with_status(
+    lat: float,
+    lon: float,
+    api_key: str,
+    forecast_data: Union[ForecastFrame, List[dict], None] = None,
+    history_rainfall: Optional[Tuple[float, bool]] = None,
+    now: Optional[datetime] = None
+) -> Tuple[float, bool]:
+    """
+    その日の累積降雨量を取得し、欠損の有無も返す
+    History API（過去データ）と予報データを組み合わせて計算
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        api_key: OpenWeatherMap APIキー
+        forecast_data: 取得済みの予報データ（省略時はAPIから取得）
+        history_rainfall: 取得済みの実績降雨量（get_history_rainfall_until_nowの戻り値）
+        now: 基準時刻（デフォルトは現在時刻）
+
+    Returns:
+        Tuple[float, bool]: (その日の累積降雨量（mm）, 一部データが欠損したかどうか)
+    """
+    if now is None:
+        now = datetime.now()
+
+    # 1. 過去の実績データを取得（History API、並列取得）
+    if history_rainfall is None:
+        history_rainfall = get_history_rainfall_until_now(lat, lon, api_key, now=now)
+    total_rainfall, degraded = history_rainfall
+
+    # 2. 予報データから現在時刻以降のデータを取得
+    if forecast_data is None:
+        forecast_data = get_weather_forecast_by_latlon(lat, lon, api_key)
+    total_rainfall += sum_forecast_rainfall(forecast_data, now.date(), after=now)
+
+    return total_rainfall, degraded
+
+def get_accurate_daily_rainfall(
+    lat: float,
+    lon: float,
+    api_key: str,
+    forecast_data: Union[ForecastFrame, List[dict], None] = None
+) -> float:
     """
     その日の累積降雨量をより正確に取得
     History API（過去データ）と予報データを組み合わせて計算
-    
+
     Args:
         lat: 緯度
         lon: 経度
         api_key: OpenWeatherMap APIキー
-        
+        forecast_data: 取得済みの予報データ（省略時はAPIから取得）
+
     Returns:
         float: その日の累積降雨量（mm）
     """
-    now = datetime.now()
-    today_str = now.date().isoformat()
-    
-    total_rainfall = 0.0
-    
-    # 1. 過去の実績データを取得（History API）
-    # 今日の0時から現在時刻までの過去データを取得
-    current_hour = now.hour
-    
-    for hour in range(0, current_hour, 3):  # 3時間ごとに取得
-        if hour >= 24:
-            break
-            
-        # その時刻のタイムスタンプを計算
-        target_time = now.replace(hour=hour, minute=0, second=0, microsecond=0)
-        timestamp = int(target_time.timestamp())
-        
-        # History APIで過去データを取得
-        params = {
-            "lat": lat,
-            "lon": lon,
-            "appid": api_key,
-            "units": "metric",
-            "lang": "ja",
-            "dt": timestamp
-        }
-        
-        try:
-            resp = requests.get(OPENWEATHERMAP_HISTORY_URL, params=params, timeout=5)
-            if resp.status_code == 200:
-                data = resp.json()
-                if "hourly" in data and len(data["hourly"]) > 0:
-                    # その時刻の降雨量を取得
-                    hourly_data = data["hourly"][0]
-                    rain_1h = hourly_data.get("rain", {}).get("1h", 0.0) or 0.0
-                    total_rainfall += rain_1h
-        except Exception as e:
-            print(f"[get_accurate_daily_rainfall] History API取得失敗 (hour={hour}): {e}")
-            continue
-    
-    # 2. 予報データから現在時刻以降のデータを取得
-    forecast_data = get_weather_forecast_by_latlon(lat, lon, api_key)
-    if forecast_data:
-        for forecast in forecast_data:
-            dt_txt = forecast.get("dt_txt")
-            if dt_txt:
-                forecast_time = datetime.strptime(dt_txt, "%Y-%m-%d %H:%M:%S")
-                
-                # 今日のデータで、現在時刻以降のもののみ処理
-                if (forecast_time.date().isoformat() == today_str and 
-                    forecast_time > now):
-                    rain_3h = forecast.get("rain", {}).get("3h", 0.0) or 0.0
-                    total_rainfall += rain_3h
-    
-    return total_rainfall 
\ No newline at end of file
+    total_rainfall, _ = get_accurate_daily_rainfall_with_status(lat, lon, api_key, forecast_data=forecast_data)
+    return total_rainfall
@@ -0,0 +1,159 @@
+"""
+天気情報サービス（非同期版）
+天気データ提供元への通信をイベントループ上で行い、上流の待ち時間でワーカースレッドを占有しない
+降雨量の集計などの計算処理は同期版（weather_service）の関数をそのまま使う
+"""
+
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from app.services.upstream_guard import weather_upstream_guard
+from app.services.weather_provider import (
+    get_weather_provider,
+    KIND_CURRENT,
+    KIND_FORECAST,
+    KIND_TIMEMACHINE
+)
+from app.services.weather_service import HISTORY_FETCH_DEADLINE_SECONDS
+
+@weather_upstream_guard.guard("current")
+async def get_weather_by_latlon(lat: float, lon: float, api_key: str) -> Optional[dict]:
+    """
+    現在の天気情報を取得（OpenWeatherMap）
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        api_key: OpenWeatherMap APIキー
+
+    Returns:
+        dict: 天気情報、取得失敗時はNone
+    """
+    params = {
+        "lat": lat,
+        "lon": lon,
+        "appid": api_key,
+        "units": "metric",
+        "lang": "ja"
+    }
+    try:
+        return await get_weather_provider().fetch_async(KIND_CURRENT, params)
+    except Exception as e:
+        print(f"[weather_service_async] 天気取得失敗: {e}")
+        return None
+
+@weather_upstream_guard.guard("forecast")
+async def get_weather_forecast_by_latlon(lat: float, lon: float, api_key: str) -> Optional[List[dict]]:
+    """
+    5日間3時間ごとの天気予報を取得（OpenWeatherMap）
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        api_key: OpenWeatherMap APIキー
+
+    Returns:
+        List[dict]: 予報データのリスト、取得失敗時はNone
+    """
+    params = {
+        "lat": lat,
+        "lon": lon,
+        "appid": api_key,
+        "units": "metric",
+        "lang": "ja"
+    }
+    try:
+        data = await get_weather_provider().fetch_async(KIND_FORECAST, params)
+        return data.get("list", [])
+    except Exception as e:
+        print(f"[weather_service_async] 予報取得失敗: {e}")
+        return None
+
+@weather_upstream_guard.guard("history")
+async def _fetch_history_slot_rainfall(lat: float, lon: float, api_key: str, timestamp: int) -> Optional[float]:
+    """
+    History APIから指定時刻の1時間降雨量を取得
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        api_key: OpenWeatherMap APIキー
+        timestamp: 対象時刻のUNIXタイムスタンプ
+
+    Returns:
+        float: 降雨量（mm）、取得失敗時はNone
+    """
+    params = {
+        "lat": lat,
+        "lon": lon,
+        "appid": api_key,
+        "units": "metric",
+        "lang": "ja",
+        "dt": timestamp
+    }
+    try:
+        data = await get_weather_provider().fetch_async(KIND_TIMEMACHINE, params)
+        if "hourly" in data and len(data["hourly"]) > 0:
+            hourly_data = data["hourly"][0]
+            return hourly_data.get("rain", {}).get("1h", 0.0) or 0.0
+        return 0.0
+    except Exception as e:
+        print(f"[weather_service_async] History API取得失敗 (dt={timestamp}): {e}")
+        return None
+
+async def get_history_rainfall_until_now(
+    lat: float,
+    lon: float,
+    api_key: str,
+    now: Optional[datetime] = None,
+    deadline_seconds: float = None
+) -> Tuple[float, bool]:
+    """
+    今日の0時から現在時刻までの実績降雨量をHistory APIから取得
+    3時間ごとの各スロットを同時に取得し、全体の締め切り時間を超えたスロットは集計から除外する
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        api_key: OpenWeatherMap APIキー
+        now: 基準時刻（デフォルトは現在時刻）
+        deadline_seconds: 全スロット取得の締め切り時間（秒）
+
+    Returns:
+        Tuple[float, bool]: (実績降雨量（mm）, 一部スロットが欠損したかどうか)
+    """
+    if now is None:
+        now = datetime.now()
+    if deadline_seconds is None:
+        deadline_seconds = HISTORY_FETCH_DEADLINE_SECONDS
+
+    timestamps = [
+        int(now.replace(hour=hour, minute=0, second=0, microsecond=0).timestamp())
+        for hour in range(0, now.hour, 3)
+    ]
+    if not timestamps:
+        return 0.0, False
+
+    # 全スロットを同時に投げ、締め切りまでに揃った分だけを合計する
+    tasks = [
+        asyncio.create_task(_fetch_history_slot_rainfall(lat, lon, api_key, ts))
+        for ts in timestamps
+    ]
+    done, not_done = await asyncio.wait(tasks, timeout=deadline_seconds)
+    for task in not_done:
+        task.cancel()
+
+    total_rainfall = 0.0
+    degraded = len(not_done) > 0
+    for task in done:
+        rain = task.result()
+        if rain is None:
+            degraded = True
+            continue
+        total_rainfall += rain
+
+    if not_done:
+        print(f"[weather_service_async] History API締め切り超過: {len(not_done)}/{len(tasks)}スロット")
+
+    return total_rainfall, degraded
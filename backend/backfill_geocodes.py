@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+緯度経度のバックフィルスクリプト
+緯度・経度が未設定の畑について、住所から緯度経度を取得して保存します
+
+同じ住所はまとめて1回だけ問い合わせ、geocode_cacheにある住所はNominatimに問い合わせません。
+Nominatimへの問い合わせは1リクエスト/秒に制限されるため、未キャッシュの住所1件につき約1秒かかります。
+
+使い方:
+    python backfill_geocodes.py              # 未設定の畑をすべて処理
+    python backfill_geocodes.py --limit 100  # 先頭100件のみ処理
+    python backfill_geocodes.py --dry-run    # 取得のみ行い畑は更新しない
+"""
+
+import argparse
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal
+from app.models import Field, GeocodeStatus
+from app.services.geocoding_service import geocode_addresses
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="緯度経度が未設定の畑のバックフィル")
+    parser.add_argument("--limit", type=int, default=None, help="処理する畑の最大件数")
+    parser.add_argument("--dry-run", action="store_true", help="畑を更新せずに結果だけ表示する")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        query = session.query(Field).filter(
+            (Field.latitude.is_(None)) | (Field.longitude.is_(None))
+        ).order_by(Field.id)
+        if args.limit:
+            query = query.limit(args.limit)
+        fields = query.all()
+        if not fields:
+            print("緯度経度が未設定の畑はありません")
+            return
+
+        addresses = {field.location_text for field in fields}
+        print(f"対象の畑: {len(fields)}件（住所 {len(addresses)}件）")
+        results = geocode_addresses(addresses)
+
+        updated = 0
+        failed = 0
+        for field in fields:
+            lat, lon = results.get(field.location_text, (None, None))
+            if lat is None or lon is None:
+                failed += 1
+                print(f"  ❌ {field.id}: {field.name}（{field.location_text}）")
+                if not args.dry_run:
+                    # 取得中のままにならないよう失敗として記録する
+                    field.geocode_status = GeocodeStatus.FAILED
+                continue
+            updated += 1
+            if not args.dry_run:
+                field.latitude = lat
+                field.longitude = lon
+                field.geocode_status = GeocodeStatus.DONE
+
+        if args.dry_run:
+            session.rollback()
+        else:
+            session.commit()
+        print(f"\n更新: {updated}件 / 失敗: {failed}件{'（dry-run）' if args.dry_run else ''}")
+    except Exception as e:
+        print(f"\n❌ 予期しないエラーが発生しました: {e}")
+        session.rollback()
+        sys.exit(1)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
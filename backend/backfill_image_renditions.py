@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+画像レンディションのバックフィルスクリプト
+画像があってレンディション（サムネイル・中サイズ・原寸）が未生成の畑について、レンディションを生成して保存します
+
+画像本体はブロブストアから1件ずつ読み込むため、画像の多い環境でもメモリ使用量は画像1枚分に収まります。
+Pillowがインストールされていない環境では原寸のレンディションのみ生成されます。
+
+使い方:
+    python backfill_image_renditions.py              # 未生成の畑をすべて処理
+    python backfill_image_renditions.py --limit 100  # 先頭100件のみ処理
+    python backfill_image_renditions.py --all        # 生成済みの畑も作り直す（サイズ設定を変えた場合など）
+"""
+
+import argparse
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal
+from app.models import Field, FieldImageRendition
+from app.services.field_image_service import ImageFormatError, read_field_image, set_field_image
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="畑画像のレンディションのバックフィル")
+    parser.add_argument("--limit", type=int, default=None, help="処理する畑の最大件数")
+    parser.add_argument("--all", action="store_true", help="生成済みの畑も作り直す")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        query = session.query(Field.id).filter(Field.image_sha256.isnot(None))
+        if not args.all:
+            query = query.filter(~Field.image_renditions.any())
+        query = query.order_by(Field.id)
+        if args.limit:
+            query = query.limit(args.limit)
+        field_ids = [field_id for field_id, in query]
+        if not field_ids:
+            print("レンディションが未生成の畑はありません")
+            return
+
+        print(f"対象の畑: {len(field_ids)}件")
+        generated = 0
+        failed = 0
+        for field_id in field_ids:
+            field = session.query(Field).filter(Field.id == field_id).one()
+            image = read_field_image(field)
+            if image is None:
+                failed += 1
+                print(f"  ❌ {field.id}: {field.name}（画像がブロブストアにありません）")
+                continue
+            try:
+                set_field_image(field, image)
+            except ImageFormatError as e:
+                failed += 1
+                print(f"  ❌ {field.id}: {field.name}（{e}）")
+                session.rollback()
+                continue
+            session.commit()
+            generated += 1
+            sizes = session.query(FieldImageRendition.size, FieldImageRendition.byte_size).filter(
+                FieldImageRendition.field_id == field_id
+            ).order_by(FieldImageRendition.byte_size).all()
+            print(f"  ✅ {field_id}: " + " / ".join(f"{size} {byte_size:,}B" for size, byte_size in sizes))
+            # 読み込んだ画像をセッションから外してメモリを解放する
+            session.expunge_all()
+
+        print(f"\n生成: {generated}件 / 失敗: {failed}件")
+    except Exception as e:
+        print(f"\n❌ 予期しないエラーが発生しました: {e}")
+        session.rollback()
+        sys.exit(1)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+キャッシュシリアライザのベンチマーク
+天気キャッシュに保存するデータについて、形式ごとのエンコード・デコード時間と保存サイズを比較します
+
+使い方:
+    python benchmarks/cache_serialization.py [--iterations 20000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.cache_serializer import available_serializers
+
+# /api/weather のレスポンス1件（weather_cacheに保存される形）
+SAMPLE_WEATHER = {
+    "date": "2025-07-16",
+    "weather": "晴れ",
+    "rain_mm": 1.25,
+    "pop": 40.0,
+    "temperature": 28.4,
+    "humidity": 72,
+    "icon": "01d",
+    "degraded": False
+}
+
+# 5日間3時間ごと予報（40枠）。予報キャッシュなど大きめのデータの目安
+SAMPLE_FORECAST = [
+    {
+        "dt": 1752624000 + i * 10800,
+        "dt_txt": f"2025-07-{16 + i // 8:02d} {(i % 8) * 3:02d}:00:00",
+        "main": {"temp": 25.0 + (i % 8), "humidity": 60 + (i % 20)},
+        "weather": [{"description": "小雨", "icon": "10d"}],
+        "rain": {"3h": round(0.1 * (i % 5), 2)},
+        "pop": round((i % 10) / 10, 1)
+    }
+    for i in range(40)
+]
+
+def _time_per_call(func: Callable[[], Any], iterations: int) -> float:
+    """
+    1回あたりの実行時間（マイクロ秒）を計測
+
+    Args:
+        func: 計測する処理
+        iterations: 実行回数
+
+    Returns:
+        float: 1回あたりの実行時間（マイクロ秒）
+    """
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+def run_benchmark(data: Any, iterations: int) -> Dict[str, Dict[str, float]]:
+    """
+    使用可能な全シリアライザでデータのエンコード・デコードを計測
+
+    Args:
+        data: 計測対象のデータ
+        iterations: 実行回数
+
+    Returns:
+        Dict[str, Dict[str, float]]: 形式ごとの計測結果
+    """
+    results = {}
+
+    # 従来方式（json.dumps(ensure_ascii=False) のTEXT列 + json.loads）
+    legacy_text = json.dumps(data, ensure_ascii=False)
+    results["legacy_text"] = {
+        "encode_us": _time_per_call(lambda: json.dumps(data, ensure_ascii=False), iterations),
+        "decode_us": _time_per_call(lambda: json.loads(legacy_text), iterations),
+        "size_bytes": len(legacy_text.encode("utf-8"))
+    }
+
+    for name, serializer in available_serializers().items():
+        payload = serializer.encode(data)
+        assert serializer.decode(payload) == data
+        results[name] = {
+            "encode_us": _time_per_call(lambda: serializer.encode(data), iterations),
+            "decode_us": _time_per_call(lambda: serializer.decode(payload), iterations),
+            "size_bytes": len(payload)
+        }
+    return results
+
+def print_results(title: str, results: Dict[str, Dict[str, float]]) -> None:
+    """
+    計測結果を表形式で表示
+
+    Args:
+        title: 表のタイトル
+        results: run_benchmarkの結果
+    """
+    print(f"\n## {title}")
+    print(f"{'format':<12} {'encode(us)':>11} {'decode(us)':>11} {'size(bytes)':>12}")
+    for name, result in results.items():
+        print(f"{name:<12} {result['encode_us']:>11.2f} {result['decode_us']:>11.2f} {result['size_bytes']:>12}")
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="キャッシュシリアライザのベンチマーク")
+    parser.add_argument("--iterations", type=int, default=20000, help="1計測あたりの実行回数")
+    args = parser.parse_args()
+
+    print_results("天気情報（/api/weather 1件）", run_benchmark(SAMPLE_WEATHER, args.iterations))
+    print_results("5日間予報（40枠）", run_benchmark(SAMPLE_FORECAST, max(1, args.iterations // 20)))
+
+if __name__ == "__main__":
+    main()
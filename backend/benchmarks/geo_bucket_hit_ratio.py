@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+天気キャッシュのバケットサイズ別ヒット率の試算
+畑の座標から、バケット設定ごとに必要な上流取得回数とキャッシュヒット率を計算します
+
+全畑の天気を1回ずつ参照したとき、同じバケットの2件目以降はキャッシュにヒットするものとして試算します。
+
+使い方:
+    python benchmarks/geo_bucket_hit_ratio.py            # DATABASE_URLの畑を対象
+    python benchmarks/geo_bucket_hit_ratio.py --json data/fields.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Tuple
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.geo_bucket import location_bucket, bucket_label
+
+# 比較するバケット設定 (方式, 格子間隔（度）, geohash桁数)
+BUCKET_CONFIGS = [
+    ("none", None, None),
+    ("grid", 0.001, None),
+    ("grid", 0.005, None),
+    ("grid", 0.01, None),
+    ("grid", 0.05, None),
+    ("geohash", None, 7),
+    ("geohash", None, 6),
+    ("geohash", None, 5),
+]
+
+def load_coordinates_from_json(file_path: str) -> List[Tuple[float, float]]:
+    """
+    JSONファイル（data/fields.json形式）から座標を読み込む
+
+    Args:
+        file_path: JSONファイルのパス
+
+    Returns:
+        List[Tuple[float, float]]: (緯度, 経度) の一覧
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        fields = json.load(f)
+    return [
+        (field["latitude"], field["longitude"])
+        for field in fields
+        if field.get("latitude") is not None and field.get("longitude") is not None
+    ]
+
+def load_coordinates_from_db() -> List[Tuple[float, float]]:
+    """
+    データベースの畑テーブルから座標を読み込む
+
+    Returns:
+        List[Tuple[float, float]]: (緯度, 経度) の一覧
+    """
+    from app.database import SessionLocal
+    from app.models import Field
+
+    db = SessionLocal()
+    try:
+        return db.query(Field.latitude, Field.longitude).filter(
+            Field.latitude.isnot(None),
+            Field.longitude.isnot(None)
+        ).all()
+    finally:
+        db.close()
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="バケットサイズ別のキャッシュヒット率の試算")
+    parser.add_argument("--json", help="座標を読み込むJSONファイル（省略時はデータベース）")
+    args = parser.parse_args()
+
+    coordinates = load_coordinates_from_json(args.json) if args.json else load_coordinates_from_db()
+    if not coordinates:
+        print("座標が登録された畑がありません")
+        return
+
+    print(f"畑の数: {len(coordinates)}")
+    print(f"{'bucket':<14} {'upstream':>9} {'hit_ratio':>10}")
+    for mode, grid_degrees, geohash_precision in BUCKET_CONFIGS:
+        buckets = {
+            location_bucket(lat, lon, mode, grid_degrees, geohash_precision)
+            for lat, lon in coordinates
+        }
+        hit_ratio = 1 - len(buckets) / len(coordinates)
+        label = bucket_label(mode, grid_degrees, geohash_precision)
+        print(f"{label:<14} {len(buckets):>9} {hit_ratio:>10.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -16,8 +16,9 @@ from typing import Optional
 # プロジェクトルートをパスに追加
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.models import User, Field, Schedule, History, ScheduleStatus, UserRole
+from app.models import User, Field, Schedule, History, ScheduleStatus, UserRole, GeocodeStatus
 from app.core.config import DATABASE_URL
+from app.services.field_image_service import set_field_image
 
 def load_json_data(file_path: str) -> Optional[list]:
     """
@@ -157,11 +158,13 @@ def seed_fields(session, data_dir: str) -> bool:
                 location_text=field_data["location_text"],
                 latitude=field_data.get("latitude"),
                 longitude=field_data.get("longitude"),
-                image=image_binary,
+                # 緯度経度がない畑は定期ジョブで取得する
+                geocode_status=GeocodeStatus.DONE if field_data.get("latitude") is not None else GeocodeStatus.PENDING,
                 created_by=field_data["created_by"],
                 created_at=created_at,
                 updated_at=updated_at
             )
+            set_field_image(field, image_binary)
             session.add(field)
             session.commit()
             print(f"  畑追加: {field.name}")
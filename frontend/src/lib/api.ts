@@ -49,6 +49,9 @@ export interface Field {
   latitude: number;
   longitude: number;
   image_url?: string;
+  thumbnail_url?: string;
+  image_etag?: string;
+  image_size?: number;
   created_by: number;
   created_at: string;
   updated_at?: string;
@@ -476,23 +479,25 @@ export async function fetchWeatherForecast(fieldId: number, days: number = 7): P
 // ==================== 画像関連API ====================
 
 /**
- * 畑の画像をアップロード
+ * 畑の画像をアップロード（ファイルをそのまま本体で送り、サーバー側で少しずつ保存させる）
  */
 export async function uploadFieldImage(fieldId: number, file: File): Promise<{ message: string }> {
-  const formData = new FormData();
-  formData.append('file', file);
   const res = await fetchWithAuth(`${API_BASE}/api/fields/${fieldId}/image`, {
     method: 'PUT',
-    body: formData,
+    headers: { 'Content-Type': file.type || 'application/octet-stream' },
+    body: file,
   });
   return handleResponse<{ message: string }>(res);
 }
 
 /**
- * 畑の画像を取得
+ * 畑の画像を取得（一覧ではthumbnailを使う）
  */
-export async function fetchFieldImage(fieldId: number): Promise<Blob> {
-  const res = await fetchWithAuth(`${API_BASE}/api/fields/${fieldId}/image`);
+export async function fetchFieldImage(
+  fieldId: number,
+  size: 'thumbnail' | 'medium' | 'original' = 'original'
+): Promise<Blob> {
+  const res = await fetchWithAuth(`${API_BASE}/api/fields/${fieldId}/image?size=${size}`);
   if (!res.ok) throw new Error('画像取得に失敗しました');
   return res.blob();
 } 
\ No newline at end of file